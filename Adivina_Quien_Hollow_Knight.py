@@ -1,10 +1,28 @@
+import time
+# Inicio del arranque, para el informe de tiempos (ver INFORME_ARRANQUE)
+INICIO_ARRANQUE = time.perf_counter()
+
 import os
 import sys
 import json
+import sqlite3
+import threading
+import multiprocessing
 import customtkinter as ctk
 from tkinter import messagebox
 from PIL import Image
-import pyglet
+from motor_inferencia import BaseClases, PuntuadorMatricial, OPCIONES_RESPUESTA, rasgos_conocidos
+from formato_binario import abrir_si_mas_reciente, crear_motor, crear_puntuador
+from arbol_decision import cargar_arbol, guardar_arbol, huella_base
+from motor_juego import MotorJuego
+from almacenamiento import DiarioConocimiento, GuardadoEnSegundoPlano, LectorIncremental, escribir_json_atomico
+from almacen_sqlite import AlmacenSQLite, leer_nombres, migrar_desde_json
+from puntuacion_paralela import PuntuadorParalelo
+from motor_bayesiano import MotorBayesiano
+from instrumentacion import instrumentar_diario, instrumentar_juego, medir
+from catalogo import cargar_catalogo
+from base_compacta import BaseCompacta
+from indice_nombres import IndiceNombres
 
 # ==============================
 # CONFIGURACIÓN GLOBAL DE CUSTOMTKINTER
@@ -57,27 +75,110 @@ def get_writable_path(relative_path):
 # ARCHIVO_CONOCIMIENTO usa la ruta ESCRIBIBLE
 # Se creará/guardará junto al .exe
 ARCHIVO_CONOCIMIENTO = get_writable_path("hollow_knight_data.json")
+# Versión binaria (mmap) de la base; se usa si es más nueva que el JSON
+ARCHIVO_BINARIO = get_writable_path("hollow_knight_data.hkb")
+# Árbol de decisión compilado (caché) junto a la base de conocimiento
+ARCHIVO_ARBOL = get_writable_path("hollow_knight_arbol.json")
+# Registro de solo-añadir con los personajes aprendidos desde la última compactación
+ARCHIVO_DIARIO = get_writable_path("hollow_knight_data.log")
+DIARIO = instrumentar_diario(DiarioConocimiento(ARCHIVO_CONOCIMIENTO, ARCHIVO_DIARIO))
+# Cada cuántos personajes leídos se actualiza el progreso de carga
+INTERVALO_PROGRESO = 5000
+# Los aprendizajes se escriben en un hilo aparte; los que llegan dentro de
+# VENTANA_GUARDADO segundos se juntan en una sola escritura
+VENTANA_GUARDADO = 0.5
+# Cada cuántos milisegundos se miran los errores del hilo de guardado
+INTERVALO_REVISION_GUARDADO = 1000
+
+# Almacén SQLite opcional: con USAR_SQLITE = True la base no se carga en
+# memoria y la eliminación/puntuación se hacen con consultas indexadas.
+USAR_SQLITE = False
+ARCHIVO_SQLITE = get_writable_path("hollow_knight_data.sqlite3")
+
+# Puntuación final en paralelo (opcional): con muchos candidatos ambiguos
+# se reparten entre varios procesos; por debajo del umbral se hace en serie.
+PUNTUACION_PARALELA = False
+UMBRAL_PARALELO = 200000
+
+# Modo probabilístico (opcional): "Probablemente" y "No lo se" también
+# cuentan, una respuesta equivocada no descarta al personaje y la partida
+# termina en cuanto el líder alcanza UMBRAL_CONFIANZA.
+MODO_BAYESIANO = False
+UMBRAL_CONFIANZA = 0.95
+
+# Con HK_MEDIR_CUADROS=1 se mide cuánto tarda la interfaz en redibujarse
+# tras cada respuesta y se imprime un resumen al salir.
+MEDIR_CUADROS = bool(os.environ.get("HK_MEDIR_CUADROS"))
 
 # FONDO_PATH y FUENTE_PATH usan la ruta de RECURSO
 # Los leerá desde dentro del .exe
 FONDO_PATH = get_resource_path("fondo.jpg")
 FUENTE_PATH = get_resource_path("CinzelDecorative-Regular.ttf")
 
+TAM_VENTANA = (1280, 768)
+# Fondo ya decodificado y escalado (PPM sin comprimir); el nombre lleva el
+# tamaño del JPEG original para detectar si cambió
+ARCHIVO_FONDO_CACHE = get_writable_path(
+    f"fondo_{TAM_VENTANA[0]}x{TAM_VENTANA[1]}_{os.path.getsize(FONDO_PATH) if os.path.exists(FONDO_PATH) else 0}.ppm")
+
+# Arranque rápido: la ventana se muestra con la fuente de respaldo y sin
+# fondo, y la fuente y el fondo se cargan en un hilo y se aplican al estar listos
+ARRANQUE_RAPIDO = True
+# Con HK_INFORME_ARRANQUE=1 se imprimen los tiempos de arranque
+INFORME_ARRANQUE = bool(os.environ.get("HK_INFORME_ARRANQUE"))
+
+FUENTE_RESPALDO = "Arial"
+
+
 # --- Carga de la Fuente Personalizada ---
-try:
-    if os.path.exists(FUENTE_PATH):
-        # Le dice a pyglet que cargue este archivo de fuente
-        pyglet.font.add_file(FUENTE_PATH)
-        # Este es el nombre "interno" de la fuente, que usaremos más abajo
-        FONT_FAMILY = "Cinzel Decorative"
-        print(f"Fuente '{FONT_FAMILY}' cargada exitosamente.")
-    else:
-        # Si no encuentra el archivo, usa una fuente de respaldo
-        raise FileNotFoundError
-except Exception as e:
-    print(f"Advertencia: No se pudo cargar la fuente desde {FUENTE_PATH}. Error: {e}")
-    print("Usando fuente 'Arial' por defecto.")
-    FONT_FAMILY = "Arial"  # Fuente de respaldo
+def cargar_fuente():
+    # Devuelve el nombre de la familia a usar (la personalizada o la de respaldo)
+    try:
+        if os.path.exists(FUENTE_PATH):
+            # pyglet tarda en importarse: sólo se importa aquí
+            import pyglet
+            # Le dice a pyglet que cargue este archivo de fuente
+            pyglet.font.add_file(FUENTE_PATH)
+            # Este es el nombre "interno" de la fuente, que usaremos más abajo
+            familia = "Cinzel Decorative"
+            print(f"Fuente '{familia}' cargada exitosamente.")
+            return familia
+        else:
+            # Si no encuentra el archivo, usa una fuente de respaldo
+            raise FileNotFoundError
+    except Exception as e:
+        print(f"Advertencia: No se pudo cargar la fuente desde {FUENTE_PATH}. Error: {e}")
+        print(f"Usando fuente '{FUENTE_RESPALDO}' por defecto.")
+        return FUENTE_RESPALDO
+
+
+def cargar_fondo():
+    # Devuelve el fondo (imagen PIL) ya escalado al tamaño de la ventana, o None.
+    # La primera vez decodifica el JPEG y guarda el resultado en ARCHIVO_FONDO_CACHE.
+    if not os.path.exists(FONDO_PATH):
+        print(f"Advertencia: No se encontró la imagen de fondo en {FONDO_PATH}")
+        return None
+    if os.path.exists(ARCHIVO_FONDO_CACHE):
+        try:
+            imagen = Image.open(ARCHIVO_FONDO_CACHE)
+            imagen.load()
+            if imagen.size == TAM_VENTANA:
+                return imagen
+        except Exception as e:
+            print(f"Advertencia: Caché del fondo inválida, se regenera. Error: {e}")
+    try:
+        imagen = Image.open(FONDO_PATH).convert("RGB").resize(TAM_VENTANA, Image.LANCZOS)
+    except Exception as e:
+        print(f"Error al cargar imagen de fondo: {e}")
+        return None
+    try:
+        imagen.save(ARCHIVO_FONDO_CACHE, format="PPM")
+    except (IOError, ValueError) as e:
+        print(f"Advertencia: No se pudo guardar la caché del fondo. Error: {e}")
+    return imagen
+
+
+FONT_FAMILY = FUENTE_RESPALDO if ARRANQUE_RAPIDO else cargar_fuente()
 
 # --- Base de Conocimiento Inicial ---
 # (El resto de tu código de constantes sigue igual)
@@ -91,14 +192,10 @@ BASE_INICIAL = {
 }
 
 # --- Preguntas y Claves ---
-PREGUNTAS = [
-    "¿El arma que utiliza es un aguijón?",
-    "¿El arma que utiliza es parte de la infección?",
-    "¿El rol del personaje es de Jefe?",
-    "¿Tu personaje es un enemigo?",
-    "¿Tu personaje aparece múltiples veces en el juego?"
-]
-CLAVES = ["arma_aguijon", "arma_infeccion", "rol_jefe", "es_enemigo", "aparece_multiples"]
+# Se leen del catálogo (preguntas.json); se empaqueta junto al resto de recursos
+ARCHIVO_PREGUNTAS = get_resource_path("preguntas.json")
+CLAVES, PREGUNTAS = cargar_catalogo(ARCHIVO_PREGUNTAS)
+PREGUNTA_POR_CLAVE = dict(zip(CLAVES, PREGUNTAS))
 
 # =========================================
 # FUNCIONES DE UTILIDAD (Manejo de Archivos y Lógica)
@@ -110,37 +207,73 @@ y la lógica de comparación de respaldo.
 
 
 def guardar_conocimiento(base):
+    # Temporal + renombrado, con el candado que comparten todas las instancias
     try:
-        with open(ARCHIVO_CONOCIMIENTO, "w", encoding="utf-8") as f:
-            json.dump(base, f, indent=4, ensure_ascii=False)
+        with medir("guardar", personajes=len(base)) as medicion, DIARIO.candado:
+            escribir_json_atomico(ARCHIVO_CONOCIMIENTO, base)
+            medicion.anotar(bytes=os.path.getsize(ARCHIVO_CONOCIMIENTO))
     except IOError as e:
         messagebox.showerror("Error al guardar", f"No se pudo guardar el archivo de conocimiento:\n{e}")
 
 
-def cargar_conocimiento():
-    if not os.path.exists(ARCHIVO_CONOCIMIENTO):
-        guardar_conocimiento(BASE_INICIAL)
+def cargar_conocimiento(al_leer=None, progreso=None):
+    # Instantánea + cambios del diario, leídos personaje a personaje.
+    # - al_leer(nombre, rasgos): recibe cada personaje en cuanto se lee.
+    # - progreso(lector): se llama cada INTERVALO_PROGRESO personajes.
+    # Si el archivo está truncado se conserva lo leído antes del daño.
+    # Se lee con el candado tomado para que ninguna otra instancia compacte
+    # en medio; los avisos se muestran después de soltarlo.
+    # Un byte por rasgo en columnas; los rasgos leídos no se conservan
+    base = BaseCompacta(CLAVES)
+    error = None
+    with DIARIO.candado:
+        if not os.path.exists(ARCHIVO_CONOCIMIENTO):
+            guardar_conocimiento(BASE_INICIAL)
+        try:
+            lector = LectorIncremental(ARCHIVO_CONOCIMIENTO)
+            for nombre, rasgos in lector:
+                base[nombre] = rasgos = rasgos_conocidos(rasgos)
+                if al_leer is not None:
+                    al_leer(nombre, rasgos)
+                if progreso is not None and lector.leidos % INTERVALO_PROGRESO == 0:
+                    progreso(lector)
+            if lector.truncado and not base:
+                raise ValueError("no se encontró ningún personaje válido")
+            base = DIARIO.reproducir(base, al_leer)
+        except (IOError, ValueError) as e:
+            error = e
+
+    if error is None:
+        if lector.truncado:
+            messagebox.showwarning("Archivo dañado",
+                                   f"El archivo de conocimiento está dañado o incompleto.\n"
+                                   f"Se recuperaron {len(base)} personajes.")
+        return base
+    if base:
+        # 'al_leer' ya recibió estos personajes: se conservan
+        messagebox.showwarning("Archivo dañado",
+                               f"No se pudo terminar de leer el archivo de conocimiento:\n{error}\n"
+                               f"Se recuperaron {len(base)} personajes.")
+        return base
+    messagebox.showerror("Error al cargar",
+                         f"No se pudo cargar el archivo de conocimiento:\n{error}\nSe usará la base inicial.")
+    base = BASE_INICIAL.copy()
+    if al_leer is not None:
+        for nombre, rasgos in base.items():
+            al_leer(nombre, rasgos)
+    return base
+
+
+def abrir_almacen_sqlite():
+    # Abre la base SQLite; la primera vez migra el JSON (o BASE_INICIAL)
     try:
-        with open(ARCHIVO_CONOCIMIENTO, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (IOError, json.JSONDecodeError) as e:
+        almacen = AlmacenSQLite(ARCHIVO_SQLITE, CLAVES)
+        migrar_desde_json(almacen, ARCHIVO_CONOCIMIENTO, BASE_INICIAL, DIARIO)
+        return almacen
+    except (sqlite3.Error, IOError, json.JSONDecodeError) as e:
         messagebox.showerror("Error al cargar",
-                             f"No se pudo cargar el archivo de conocimiento:\n{e}\nSe usará la base inicial.")
-        return BASE_INICIAL.copy()
-
-
-def comparar_personaje(respuestas_usuario, caracteristicas_personaje):
-    coincidencias = 0
-    for clave in CLAVES:
-        if clave not in caracteristicas_personaje:
-            caracteristicas_personaje[clave] = "No lo se"
-
-    for clave in respuestas_usuario:
-        if respuestas_usuario[clave] == caracteristicas_personaje[clave]:
-            coincidencias += 1
-        elif respuestas_usuario[clave] in ["Probablemente", "No lo se"]:
-            coincidencias += 0.5
-    return coincidencias / len(respuestas_usuario)
+                             f"No se pudo abrir la base SQLite:\n{e}\nSe usará el archivo JSON.")
+        return None
 
 
 # =========================================
@@ -152,6 +285,9 @@ Gestiona la GUI, el estado del juego y el motor de inferencia.
 """
 
 
+FIN_IMPORTACION = time.perf_counter()
+
+
 class JuegoHollowKnight(ctk.CTk):
 
     def __init__(self):
@@ -159,16 +295,14 @@ class JuegoHollowKnight(ctk.CTk):
         Constructor de la clase.
         - Configura la ventana principal.
         - Define las fuentes y estilos.
-        - Carga la base de conocimiento e inicializa variables de estado.
-        - Define la 'Memoria de Trabajo' (self.personajes_posibles).
-        - Define el estado de 'fallo_logico' para el nuevo flujo de aprendizaje.
         - Crea todos los widgets de la interfaz.
+        - Carga la base de conocimiento en el motor sin interfaz (self.juego),
+          que guarda la 'Memoria de Trabajo' y el estado 'fallo_logico'.
         """
         super().__init__()
 
         self.title("Adivina Quién - Hollow Knight Edition")
-        ancho_ventana = 1280
-        alto_ventana = 768
+        ancho_ventana, alto_ventana = TAM_VENTANA
         self.geometry(f"{ancho_ventana}x{alto_ventana}")
         self.resizable(False, False)
 
@@ -189,32 +323,21 @@ class JuegoHollowKnight(ctk.CTk):
             "font": self.button_font
         }
 
-        self.base = cargar_conocimiento()
-        self.respuestas = {}
-        self.indice_pregunta = 0
+        # El motor (self.juego) se crea en 'cargar_base', ya con la ventana visible
+        self.juego = None
         self.personaje_predicho = ""
-
-        self.personajes_posibles = {}
-
-        # --- NUEVA VARIABLE DE ESTADO ---
-        # Registra si el motor se quedó sin opciones
-        self.fallo_logico = False
+        # Índice de nombres (con tildes y erratas) para avisar de duplicados al aprender
+        self.indice_nombres = IndiceNombres()
 
         # --- CREACIÓN DE WIDGETS ---
 
+        # Tiempos de arranque (segundos desde INICIO_ARRANQUE)
+        self.marcas_arranque = {"importación": FIN_IMPORTACION - INICIO_ARRANQUE}
+        self.recursos_cargados = None
+
         self.bg_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.bg_frame.place(relx=0, rely=0, relwidth=1, relheight=1)
 
-        if os.path.exists(FONDO_PATH):
-            try:
-                self.bg_image = ctk.CTkImage(Image.open(FONDO_PATH), size=(1280, 768))
-                self.bg_label = ctk.CTkLabel(self.bg_frame, image=self.bg_image, text="")
-                self.bg_label.place(relx=0.5, rely=0.5, anchor="center")
-            except Exception as e:
-                print(f"Error al cargar imagen de fondo: {e}")
-        else:
-            print(f"Advertencia: No se encontró la imagen de fondo en {FONDO_PATH}")
-
         PANEL_COLOR = "#21232A"
         PANEL_WIDTH = 700
         PANEL_HEIGHT = 300
@@ -249,7 +372,269 @@ class JuegoHollowKnight(ctk.CTk):
                                              command=self.aprender_personaje,
                                              **self.button_style)
 
+        # Reserva de botones: se crean una sola vez y cada pantalla sólo
+        # muestra u oculta los que necesita (crearlos es lo más lento al redibujar)
+        self.boton_jugar = ctk.CTkButton(self.frame_principal, text="Jugar",
+                                         command=self.iniciar_juego, **self.button_style)
+        self.boton_salir = ctk.CTkButton(self.frame_principal, text="Salir",
+                                         command=self.salir, **self.button_style)
+        self.botones_respuesta = [
+            ctk.CTkButton(self.frame_botones, text=opcion,
+                          command=lambda o=opcion: self.registrar_respuesta(o),
+                          **self.button_style)
+            for opcion in OPCIONES_RESPUESTA
+        ]
+        self.botones_confirmar = [
+            ctk.CTkButton(self.frame_botones, text="Sí",
+                          command=self.confirmar_acierto, **self.button_style),
+            ctk.CTkButton(self.frame_botones, text="No",
+                          command=self.no_acerto, **self.button_style),
+        ]
+        self.botones_visibles = []
+
+        # Medición del tiempo de redibujado por respuesta (ver MEDIR_CUADROS)
+        self.inicio_cuadro = None
+        self.tiempos_cuadro = []
+        self.protocol("WM_DELETE_WINDOW", self.salir)
+
+        if ARRANQUE_RAPIDO:
+            # Fuente y fondo en segundo plano; se aplican en 'aplicar_recursos'
+            threading.Thread(target=self.cargar_recursos, daemon=True).start()
+            self.after(30, self.aplicar_recursos)
+        else:
+            self.poner_fondo(cargar_fondo())
+            self.marcas_arranque["fuente y fondo"] = time.perf_counter() - INICIO_ARRANQUE
+
+        with medir("carga") as medicion:
+            self.cargar_base()
+            medicion.anotar(sqlite=self.juego.almacen is not None)
+        # Todas las escrituras del diario pasan por este hilo (ver 'salir')
+        self.guardado = GuardadoEnSegundoPlano(DIARIO, VENTANA_GUARDADO)
+        self.after(INTERVALO_REVISION_GUARDADO, self.revisar_guardado)
+
         self.crear_menu_principal()
+        self.after_idle(self.marcar_menu_visible)
+
+    # =========================================
+    # MÉTODOS: ARRANQUE
+    # =========================================
+    """
+    Carga diferida de la fuente y el fondo, y el informe de tiempos.
+    - cargar_recursos: Se ejecuta en un hilo (sin tocar Tk).
+    - aplicar_recursos: En el hilo de Tk, cambia la fuente y pone el fondo.
+    """
+
+    def cargar_recursos(self):
+        self.recursos_cargados = (cargar_fuente(), cargar_fondo())
+
+    def aplicar_recursos(self):
+        if self.recursos_cargados is None:
+            self.after(30, self.aplicar_recursos)
+            return
+        familia, imagen = self.recursos_cargados
+        for fuente in (self.title_font, self.label_font, self.button_font):
+            fuente.configure(family=familia)
+        self.poner_fondo(imagen)
+        self.marcas_arranque["fuente y fondo"] = time.perf_counter() - INICIO_ARRANQUE
+        self.informar_arranque()
+
+    def poner_fondo(self, imagen):
+        if imagen is None:
+            return
+        self.bg_image = ctk.CTkImage(imagen, size=TAM_VENTANA)
+        self.bg_label = ctk.CTkLabel(self.bg_frame, image=self.bg_image, text="")
+        self.bg_label.place(relx=0.5, rely=0.5, anchor="center")
+        # Detrás del panel aunque se cree después
+        self.bg_label.lower()
+
+    def marcar_menu_visible(self):
+        self.marcas_arranque["listo para jugar"] = time.perf_counter() - INICIO_ARRANQUE
+        self.informar_arranque()
+
+    def informar_arranque(self):
+        # Se imprime una vez, cuando ya están el menú y los recursos
+        marcas = self.marcas_arranque
+        if not INFORME_ARRANQUE or "listo para jugar" not in marcas or "fuente y fondo" not in marcas:
+            return
+        print("Arranque: " + ", ".join(f"{nombre} {segundos * 1000:.0f} ms"
+                                       for nombre, segundos in sorted(marcas.items(), key=lambda m: m[1])))
+
+    def cargar_base(self, recarga=False):
+        """
+        Carga la base de conocimiento y construye las estructuras del motor.
+        - SQLite (opcional): no se carga nada en memoria.
+        - Binario (.hkb) más nuevo que el JSON: se mapea sin parsear.
+        - JSON: se lee personaje a personaje, alimentando directamente las
+          máscaras y la matriz, y mostrando el progreso en self.label.
+        Con recarga=True (ver 'sincronizar_base') no se toca la pantalla y el
+        índice de nombres ya construido sólo recibe los nombres nuevos.
+        """
+        # Con SQLite las consultas se derivan de las respuestas y no hace
+        # falta ninguna estructura en memoria
+        almacen = abrir_almacen_sqlite() if USAR_SQLITE else None
+        if almacen is not None:
+            self.juego = MotorJuego(CLAVES, almacen=almacen)
+            # Sólo hace algo con la variable de entorno HK_TRAZA
+            instrumentar_juego(self.juego)
+            self.indexar_nombres(lambda: leer_nombres(almacen.ruta))
+            return
+
+        if not recarga:
+            self.label.configure(text="Cargando personajes...")
+            self.update()
+            self.marcas_arranque["primer cuadro"] = time.perf_counter() - INICIO_ARRANQUE
+
+        # Con el candado, ninguna otra instancia compacta entre abrir y reproducir
+        with DIARIO.candado:
+            binaria = abrir_si_mas_reciente(ARCHIVO_BINARIO, ARCHIVO_CONOCIMIENTO)
+            if binaria is not None:
+                binaria = DIARIO.reproducir(binaria)
+        if binaria is not None:
+            base = binaria
+            # Máscaras y matriz salen directamente del archivo mapeado
+            motor = crear_motor(base, CLAVES)
+            puntuador = crear_puntuador(base, CLAVES)
+        else:
+            # Máscaras de bits por perfil distinto (motor de inferencia): los
+            # personajes con el mismo perfil se eliminan juntos
+            motor = BaseClases({}, CLAVES)
+            # Matriz densa para puntuar a todos los candidatos de una sola pasada
+            puntuador = PuntuadorMatricial({}, CLAVES)
+
+            def agregar_al_motor(nombre, rasgos):
+                motor.agregar(nombre, rasgos)
+                puntuador.agregar(nombre, rasgos)
+
+            progreso = None if recarga else self.mostrar_progreso_carga
+            base = cargar_conocimiento(agregar_al_motor, progreso)
+
+        # Lee la matriz del puntuador en serie (antes de repartirlo en procesos)
+        bayesiano = MotorBayesiano(puntuador) if MODO_BAYESIANO else None
+        if PUNTUACION_PARALELA:
+            puntuador = PuntuadorParalelo(puntuador, umbral=UMBRAL_PARALELO)
+
+        # Árbol de decisión precompilado: cada respuesta es seguir un puntero
+        arbol = cargar_arbol(ARCHIVO_ARBOL, motor, base, CLAVES)
+        # Con tabla=True cada vector de respuestas se resuelve una sola vez;
+        # con indice=True las bases grandes buscan al más parecido en un BK-tree
+        # (salvo que haya candidatos de sobra para la puntuación paralela)
+        self.juego = MotorJuego(CLAVES, base=base, motor=motor, puntuador=puntuador, arbol=arbol,
+                                bayesiano=bayesiano, umbral_confianza=UMBRAL_CONFIANZA,
+                                tabla=True, indice=True)
+        # Sólo hace algo con la variable de entorno HK_TRAZA
+        instrumentar_juego(self.juego)
+        if recarga:
+            # Se espera a que termine el de la carga y se salta lo ya indexado
+            self.indice_nombres.construir(base)
+            return
+        nombres = list(base)
+        self.indexar_nombres(lambda: nombres)
+
+    def indexar_nombres(self, leer):
+        # El índice se construye en segundo plano; si se aprende antes de que
+        # termine, la consulta de parecidos espera a que esté listo
+        threading.Thread(target=lambda: self.indice_nombres.construir(leer()), daemon=True).start()
+
+    def sincronizar_base(self):
+        """
+        Incorpora los personajes que otras instancias (quioscos, versión de
+        texto, servidor) aprendieron desde la última vez. Si nadie escribió
+        sólo cuesta un stat del diario; si el diario rotó varias veces entre
+        medias se vuelve a cargar la base.
+        """
+        if self.juego.almacen is not None:
+            # SQLite ya comparte la base entre procesos
+            return
+        try:
+            cambios = DIARIO.pendientes()
+        except IOError as e:
+            messagebox.showwarning("Error al sincronizar",
+                                   f"No se pudieron leer los cambios de otras instancias:\n{e}")
+            return
+        if cambios is None:
+            # Lo aprendido aquí tiene que estar en disco antes de recargar
+            self.guardado.vaciar()
+            anterior = self.juego
+            self.cargar_base(recarga=True)
+            if isinstance(anterior.puntuador, PuntuadorParalelo):
+                anterior.puntuador.cerrar()
+            return
+        for nombre, rasgos in cambios:
+            if self.guardado.pendiente(nombre):
+                # Lo que aprendimos aquí se escribirá después: es el más reciente
+                continue
+            self.juego.aprender(nombre, rasgos_conocidos(rasgos))
+            self.indice_nombres.agregar(nombre)
+
+    def mostrar_progreso_carga(self, lector):
+        self.label.configure(text=f"Cargando personajes... {lector.leidos} "
+                                  f"({lector.fraccion():.0%})")
+        self.update()
+
+    # =========================================
+    # MÉTODOS: RESERVA DE WIDGETS
+    # =========================================
+    """
+    Las pantallas reutilizan los botones creados en __init__.
+    - mostrar_botones: Cambia qué botones de frame_botones están visibles.
+    - medir_cuadro / informe_cuadros: Tiempo de redibujado por respuesta.
+    - revisar_guardado: Muestra los errores del hilo de guardado.
+    - salir: Cierra la ventana (botón "Salir" o la X) tras escribir lo pendiente.
+    """
+
+    def mostrar_botones(self, botones, **opciones_pack):
+        # Muestra sólo 'botones' dentro de frame_botones. Si ya son los
+        # visibles (una pregunta tras otra) no se toca la disposición.
+        if botones == self.botones_visibles:
+            return
+        for boton in self.botones_visibles:
+            boton.pack_forget()
+        for boton in botones:
+            boton.pack(**opciones_pack)
+        self.botones_visibles = botones
+
+    def medir_cuadro(self):
+        # Cuando Tk queda libre la pantalla ya se redibujó: se anota el tiempo
+        # desde que se pulsó el botón
+        if MEDIR_CUADROS and self.inicio_cuadro is not None:
+            inicio, self.inicio_cuadro = self.inicio_cuadro, None
+            self.after_idle(lambda: self.tiempos_cuadro.append(time.perf_counter() - inicio))
+
+    def informe_cuadros(self):
+        if not self.tiempos_cuadro:
+            return
+        tiempos = sorted(self.tiempos_cuadro)
+        print(f"Tiempo de cuadro por respuesta ({len(tiempos)} muestras): "
+              f"media {sum(tiempos) / len(tiempos) * 1000:.1f} ms, "
+              f"p95 {tiempos[int(len(tiempos) * 0.95)] * 1000:.1f} ms, "
+              f"máx {tiempos[-1] * 1000:.1f} ms")
+
+    def revisar_guardado(self):
+        self.mostrar_errores_guardado()
+        self.after(INTERVALO_REVISION_GUARDADO, self.revisar_guardado)
+
+    def mostrar_errores_guardado(self):
+        # Los errores del hilo de guardado se muestran desde el hilo de Tk
+        while self.guardado.errores:
+            nombres, error = self.guardado.errores.popleft()
+            messagebox.showerror("Error al guardar",
+                                 f"No se pudo guardar {', '.join(nombres)} en el archivo de conocimiento:\n{error}")
+
+    def salir(self):
+        if MEDIR_CUADROS:
+            self.informe_cuadros()
+        if self.juego.almacen is None:
+            # El árbol es sólo una caché: basta con guardarlo al salir (el
+            # hilo lo escribe mientras éste espera, así que nadie lo toca)
+            juego = self.juego
+            self.guardado.encargar("árbol de decisión", lambda: guardar_arbol(
+                ARCHIVO_ARBOL, juego.arbol, huella_base(juego.base, CLAVES)))
+        # No se cierra hasta que todo lo aprendido está en disco
+        self.guardado.cerrar()
+        self.mostrar_errores_guardado()
+        if isinstance(self.juego.puntuador, PuntuadorParalelo):
+            self.juego.puntuador.cerrar()
+        self.destroy()
 
     # =========================================
     # MÉTODOS: NAVEGACIÓN Y MENÚ
@@ -257,8 +642,7 @@ class JuegoHollowKnight(ctk.CTk):
     """
     Gestionan la visualización de las pantallas principales y la
     preparación de una nueva partida.
-    - iniciar_juego: Reinicia todas las variables de estado para
-      una nueva partida, incluyendo 'self.fallo_logico'.
+    - iniciar_juego: Empieza una partida nueva en el motor (self.juego).
     """
 
     def crear_menu_principal(self):
@@ -269,23 +653,16 @@ class JuegoHollowKnight(ctk.CTk):
                              font=self.title_font)
         self.label.pack(pady=(40, 30))
 
-        ctk.CTkButton(self.frame_principal, text="Jugar",
-                      command=self.iniciar_juego, **self.button_style
-                      ).pack(pady=10, ipadx=10, ipady=5)
-
-        ctk.CTkButton(self.frame_principal, text="Salir",
-                      command=self.destroy, **self.button_style
-                      ).pack(pady=10, ipadx=10, ipady=5)
+        self.boton_jugar.pack(pady=10, ipadx=10, ipady=5)
+        self.boton_salir.pack(pady=10, ipadx=10, ipady=5)
 
     def iniciar_juego(self):
         for widget in self.frame_principal.winfo_children():
             widget.pack_forget()
 
         # --- Inicialización de Hechos y Estado ---
-        self.personajes_posibles = self.base.copy()
-        self.respuestas = {}
-        self.indice_pregunta = 0
-        self.fallo_logico = False  # <--- CAMBIO: Reinicia el estado de fallo
+        self.sincronizar_base()
+        self.juego.iniciar()
 
         self.label.configure(font=self.label_font)
         self.label.pack(pady=(20, 10))
@@ -298,52 +675,32 @@ class JuegoHollowKnight(ctk.CTk):
     # =========================================
     """
     Esta sección es el corazón del sistema experto (Modus Ponens).
-    - registrar_respuesta: Es el motor de inferencia.
-      1. Recibe un HECHO (la respuesta del usuario).
-      2. Aplica MODUS PONENS para eliminar personajes incompatibles
-         de la 'Memoria de Trabajo' (self.personajes_posibles).
-      3. Llama a 'siguiente_paso_logico' para continuar el ciclo.
+    - registrar_respuesta: Entrega el HECHO (la respuesta del usuario) al
+      motor (self.juego), que aplica MODUS PONENS para eliminar personajes
+      incompatibles de la 'Memoria de Trabajo'. Luego llama a
+      'siguiente_paso_logico' para continuar el ciclo.
     """
 
     def mostrar_pregunta(self):
-        self.label.configure(text=PREGUNTAS[self.indice_pregunta])
+        # El motor elige la pregunta que mejor divide a los candidatos
+        clave = self.juego.pregunta_actual()
+        self.label.configure(text=PREGUNTA_POR_CLAVE[clave])
 
-        for widget in self.frame_botones.winfo_children():
-            widget.destroy()
-
-        opciones = ["Si", "No", "No lo se", "Probablemente"]
-        for opcion in opciones:
-            ctk.CTkButton(
-                self.frame_botones,
-                text=opcion,
-                command=lambda o=opcion: self.registrar_respuesta(o),
-                **self.button_style
-            ).pack(pady=5, ipadx=5, ipady=2)
+        # Los cuatro botones de respuesta ya existen: sólo cambia el texto de la pregunta
+        self.mostrar_botones(self.botones_respuesta, pady=5, ipadx=5, ipady=2)
+        self.medir_cuadro()
 
     def registrar_respuesta(self, respuesta):
-        # 1. Guardar el hecho (respuesta) para el aprendizaje futuro
-        clave_actual = CLAVES[self.indice_pregunta]
-        self.respuestas[clave_actual] = respuesta
-
-        # 2. MOTOR DE INFERENCIA (Aplicación de Modus Ponens)
-        # Solo se aplica la regla si la respuesta es definitiva (Si/No)
-        # y si el fallo lógico no ha ocurrido ya (optimiz.)
-        if respuesta in ["Si", "No"] and not self.fallo_logico:
-            personajes_a_eliminar = []
-            for nombre, rasgos in self.personajes_posibles.items():
-                rasgo_personaje = rasgos.get(clave_actual, "No lo se")
-
-                # REGLA: Si el rasgo guardado contradice la respuesta...
-                if rasgo_personaje != "No lo se" and rasgo_personaje != respuesta:
-                    # ...DEDUCE: El personaje es imposible
-                    personajes_a_eliminar.append(nombre)
-
-            # 3. Actualizar la memoria de trabajo con los nuevos hechos
-            for nombre in personajes_a_eliminar:
-                del self.personajes_posibles[nombre]
-
-        # 4. Pasar al siguiente estado del ciclo lógico
-        self.indice_pregunta += 1
+        self.inicio_cuadro = time.perf_counter()
+        # MOTOR DE INFERENCIA (Aplicación de Modus Ponens)
+        # REGLA: Si el rasgo guardado contradice la respuesta, el personaje
+        # es imposible. El motor avanza en el árbol de decisión.
+        if self.juego.responder(respuesta):
+            # Solo se avisa la primera vez que se queda sin candidatos
+            messagebox.showinfo("¡Personaje nuevo!",
+                                "No conozco ese personaje. Déjame terminar las preguntas para aprender.")
+
+        # Pasar al siguiente estado del ciclo lógico
         self.siguiente_paso_logico()
 
     # =========================================
@@ -351,86 +708,40 @@ class JuegoHollowKnight(ctk.CTk):
     # =========================================
     """
     Gestionan el estado del juego después de un ciclo de inferencia.
-    - siguiente_paso_logico: ¡LÓGICA CRÍTICA MODIFICADA!
-      1. Revisa si la 'Memoria de Trabajo' se vació (num_posibles == 0).
-      2. Si es así, activa el flag 'self.fallo_logico' e informa al usuario.
-      3. Revisa si quedan preguntas (índice < total).
-      4. SI QUEDAN PREGUNTAS: Llama a 'mostrar_pregunta' y sale.
-         (Esto asegura que se sigan haciendo preguntas incluso si 'fallo_logico' es True).
-      5. SI NO QUEDAN PREGUNTAS (fin del juego):
-         - Si 'fallo_logico' es True -> Llama a 'no_acerto' (aprender).
-         - Si 'num_posibles == 1' -> Llama a 'mostrar_resultado_prediccion' (éxito).
-         - Si 'num_posibles > 1' -> Llama a 'mostrar_resultado_puntaje' (ambiguo).
+    - siguiente_paso_logico:
+      1. Si el motor no ha terminado (quedan preguntas y no hay un único
+         candidato), muestra la siguiente pregunta. Esto sigue ocurriendo
+         tras un fallo lógico, para recopilar datos.
+      2. Si terminó, pide el resultado al motor:
+         - Sin predicción (fallo lógico o puntaje bajo) -> 'no_acerto' (aprender).
+         - Con predicción -> 'mostrar_resultado_prediccion'.
+      3. 'no_acerto' hace antes las preguntas que falten (la partida pudo
+         terminar con un solo candidato), para aprender un perfil completo.
     """
 
     def siguiente_paso_logico(self):
-        # --- LÓGICA MODIFICADA ---
-
-        num_posibles = len(self.personajes_posibles)
-
-        # 1. Revisa el estado de fallo lógico
-        if num_posibles == 0:
-            if not self.fallo_logico:  # Solo se activa la primera vez
-                self.fallo_logico = True
-                messagebox.showinfo("¡Personaje nuevo!",
-                                    "No conozco ese personaje. Déjame terminar las preguntas para aprender.")
-
-        # 2. Revisa si quedan preguntas
-        if self.indice_pregunta < len(PREGUNTAS):
-            # Si quedan preguntas, SIEMPRE las muestra,
-            # incluso si ya falló (para recopilar datos)
+        if not self.juego.terminado():
             self.mostrar_pregunta()
-            return  # Sale de la función aquí
-
-        # --- FIN DEL JUEGO (Solo se llega aquí si no quedan preguntas) ---
-
-        # 3. Decide el resultado final
-        if self.fallo_logico:
-            # Si falló en cualquier punto, pasa a aprender
+            return
+        if self.juego.completando:
+            # La predicción ya se descartó: sólo faltaban estas respuestas
             self.no_acerto()
+            return
 
-        elif num_posibles == 1:
-            # CONCLUSIÓN LÓGICA (Hecho final deducido)
-            self.personaje_predicho = list(self.personajes_posibles.keys())[0]
+        # --- FIN DEL JUEGO ---
+        # El motor decide: deducción única o mejor puntaje entre los candidatos
+        nombre, _puntaje = self.juego.resultado()
+        if nombre is None:
+            self.no_acerto()
+        else:
+            self.personaje_predicho = nombre
             self.mostrar_resultado_prediccion()
 
-        else:  # num_posibles > 1
-            # FIN DE PREGUNTAS (Ambigüedad)
-            self.mostrar_resultado_puntaje()
-
     def mostrar_resultado_prediccion(self):
         # Muestra la deducción final (caso 1 posible)
-        for widget in self.frame_botones.winfo_children():
-            widget.destroy()
-
         self.label.configure(text=f"¡Lo tengo! Tu personaje es: {self.personaje_predicho}")
-
-        ctk.CTkButton(self.frame_botones, text="Sí",
-                      command=self.confirmar_acierto, **self.button_style
-                      ).pack(pady=5, side="left", padx=10)
-
-        ctk.CTkButton(self.frame_botones, text="No",
-                      command=self.no_acerto, **self.button_style
-                      ).pack(pady=5, side="left", padx=10)
-
-    def mostrar_resultado_puntaje(self):
-        # Muestra el resultado por puntaje (caso >1 posible)
-        if not self.personajes_posibles:
-            # Este caso no debería ocurrir con la nueva lógica,
-            # pero es un buen seguro.
-            self.no_acerto()
-            return
-
-        puntajes = {nombre: comparar_personaje(self.respuestas, caract)
-                    for nombre, caract in self.personajes_posibles.items()}
-
-        self.personaje_predicho = max(puntajes, key=puntajes.get)
-        mejor_puntaje = puntajes[self.personaje_predicho]
-
-        if mejor_puntaje < 0.5:
-            self.no_acerto()
-        else:
-            self.mostrar_resultado_prediccion()
+        self.mostrar_botones(self.botones_confirmar, pady=5, side="left", padx=10)
+        self.medir_cuadro()
 
     def confirmar_acierto(self):
         # Si el usuario confirma la deducción
@@ -440,15 +751,22 @@ class JuegoHollowKnight(ctk.CTk):
             self.crear_menu_principal()
 
     def no_acerto(self):
+        # Primero se responden las preguntas que no se hicieron
+        self.juego.completar()
+        if not self.juego.terminado():
+            messagebox.showinfo("Vaya, no acerté", "Déjame terminar las preguntas para aprender.")
+            self.mostrar_pregunta()
+            return
+
         # Muestra la UI para aprender un personaje nuevo
-        for widget in self.frame_botones.winfo_children():
-            widget.destroy()
+        self.mostrar_botones([])
         self.frame_botones.pack_forget()
 
         self.label.configure(text="Vaya, no acerté. ¿Cuál era tu personaje?")
 
         self.button_aprender.pack(side="bottom", pady=(5, 20))
         self.entry_nombre.pack(side="bottom", pady=5)
+        self.medir_cuadro()
 
     def aprender_personaje(self):
         # Guarda el nuevo personaje en el JSON
@@ -457,13 +775,46 @@ class JuegoHollowKnight(ctk.CTk):
             messagebox.showerror("Error", "Debes ingresar un nombre.")
             return
 
-        if nombre in self.base:
+        # Otra instancia pudo aprender este mismo nombre durante la partida
+        respuestas = dict(self.juego.respuestas)
+        self.sincronizar_base()
+
+        if self.juego.existe(nombre):
             if not messagebox.askyesno("Confirmar",
                                        f"'{nombre}' ya existe. ¿Deseas sobrescribir sus características con las respuestas actuales?"):
                 return
+        else:
+            # Mismo nombre con otras tildes o con una errata: se ofrece el existente
+            parecidos = self.indice_nombres.parecidos(nombre)
+            if parecidos:
+                lista = "\n".join(f"- {otro}" for otro, _similitud in parecidos)
+                eleccion = messagebox.askyesnocancel(
+                    "Nombre parecido",
+                    f"Ya conozco personajes con un nombre parecido a '{nombre}':\n{lista}\n\n"
+                    f"¿Es '{parecidos[0][0]}'? (Sí: sobrescribirlo, No: guardar '{nombre}' como nuevo)")
+                if eleccion is None:
+                    return
+                if eleccion:
+                    nombre = parecidos[0][0]
+
+        # Con el mismo perfil que otro personaje no se les podrá distinguir
+        gemelos = [otro for otro in self.juego.gemelos(respuestas) if otro != nombre]
+        if gemelos:
+            if not messagebox.askyesno("Personajes indistinguibles",
+                                       f"'{nombre}' tendría exactamente las mismas características que "
+                                       f"{', '.join(gemelos[:3])}{' y otros' if len(gemelos) > 3 else ''}, "
+                                       f"así que no podré diferenciarlos.\n¿Deseas guardarlo de todos modos?"):
+                return
 
-        self.base[nombre] = self.respuestas
-        guardar_conocimiento(self.base)
+        try:
+            self.juego.aprender(nombre, respuestas)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error al guardar", f"No se pudo guardar en la base SQLite:\n{e}")
+            return
+        self.indice_nombres.agregar(nombre)
+        if self.juego.almacen is None:
+            # Sólo se encola: el hilo de guardado lo añade al diario
+            self.guardado.registrar(nombre, self.juego.base[nombre])
 
         messagebox.showinfo("Aprendido", f"¡He aprendido sobre {nombre}! Gracias.")
 
@@ -478,5 +829,7 @@ class JuegoHollowKnight(ctk.CTk):
 # EJECUCIÓN DEL PROGRAMA
 # ==============================
 if __name__ == "__main__":
+    # Necesario para el grupo de procesos cuando el juego va empaquetado en un .exe
+    multiprocessing.freeze_support()
     app = JuegoHollowKnight()
     app.mainloop()
\ No newline at end of file
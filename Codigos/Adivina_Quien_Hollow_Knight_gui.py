@@ -6,6 +6,11 @@ from tkinter import messagebox  # De tkinter, usamos los pop-ups para mensajes y
 from PIL import Image  # (Pillow) Para cargar y gestionar la imagen de fondo.
 import pyglet  # Para cargar fuentes personalizadas (.ttf) sin necesidad de instalarlas.
 
+# El catálogo de preguntas y el motor están en la raíz del repositorio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from catalogo import cargar_catalogo  # Lee las preguntas y claves de preguntas.json.
+from motor_inferencia import rasgos_conocidos  # Quita los "No lo se" de un personaje.
+
 # ==============================
 # CONFIGURACIÓN GLOBAL DE CUSTOMTKINTER
 # ==============================
@@ -25,7 +30,7 @@ Define todas las variables globales y constantes. Esto incluye:
 - Definir las rutas a los archivos (JSON, fondo, fuente).
 - Cargar la fuente personalizada (pyglet) o usar una de respaldo.
 - Establecer la base de conocimiento inicial (BASE_INICIAL) si el JSON no existe.
-- Listar las preguntas (PREGUNTAS) y sus claves (CLAVES) asociadas.
+- Leer las preguntas (PREGUNTAS) y sus claves (CLAVES) del catálogo preguntas.json.
 """
 if getattr(sys, 'frozen', False):
     BASE_DIR = os.path.dirname(sys.executable)
@@ -57,14 +62,7 @@ BASE_INICIAL = {
                        "aparece_multiples": "No"}
 }
 
-PREGUNTAS = [
-    "¿El arma que utiliza es un aguijón?",
-    "¿El arma que utiliza es parte de la infección?",
-    "¿El rol del personaje es de Jefe?",
-    "¿Tu personaje es un enemigo?",
-    "¿Tu personaje aparece múltiples veces en el juego?"
-]
-CLAVES = ["arma_aguijon", "arma_infeccion", "rol_jefe", "es_enemigo", "aparece_multiples"]
+CLAVES, PREGUNTAS = cargar_catalogo()
 
 
 # =========================================
@@ -102,13 +100,10 @@ def cargar_conocimiento():
 
 
 def comparar_personaje(respuestas_usuario, caracteristicas_personaje):
+    # Las claves ausentes cuentan como "No lo se" sin escribirlas en el personaje
     coincidencias = 0
-    for clave in CLAVES:
-        if clave not in caracteristicas_personaje:
-            caracteristicas_personaje[clave] = "No lo se"
-
     for clave in respuestas_usuario:
-        if respuestas_usuario[clave] == caracteristicas_personaje[clave]:
+        if respuestas_usuario[clave] == caracteristicas_personaje.get(clave, "No lo se"):
             coincidencias += 1
         elif respuestas_usuario[clave] in ["Probablemente", "No lo se"]:
             coincidencias += 0.5
@@ -357,7 +352,7 @@ class JuegoHollowKnight(ctk.CTk):
                                        f"'{nombre}' ya existe. ¿Deseas sobrescribir sus características con las respuestas actuales?"):
                 return
 
-        self.base[nombre] = self.respuestas
+        self.base[nombre] = rasgos_conocidos(self.respuestas)
         guardar_conocimiento(self.base)
 
         messagebox.showinfo("Aprendido", f"¡He aprendido sobre {nombre}! Gracias.")
@@ -3,14 +3,25 @@ import os
 import time
 import sys
 
+# Raíz del repositorio: motor de inferencia y base compartidos con la versión gráfica
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
 # Si el programa está "empaquetado" en un .exe, usa la ruta temporal
 if getattr(sys, 'frozen', False):
     BASE_DIR = os.path.dirname(sys.executable)
 else:
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    # El mismo archivo que la versión gráfica y el servidor
+    BASE_DIR = RAIZ
 
 ARCHIVO_CONOCIMIENTO = os.path.join(BASE_DIR, "hollow_knight_data.json")
 
+sys.path.insert(0, RAIZ)
+from motor_juego import MotorJuego
+from instrumentacion import instrumentar_juego
+from motor_inferencia import rasgos_conocidos
+from catalogo import cargar_catalogo
+from almacenamiento import DiarioConocimiento, escribir_json_atomico
+
 
 # =========================================
 # CONFIGURACIÓN
@@ -55,32 +66,52 @@ base_inicial = {
     }
 }
 
-# Preguntas y sus claves asociadas
-preguntas = [
-    "¿El arma que utiliza es un aguijón?",
-    "¿El arma que utiliza es parte de la infección?",
-    "¿El rol del personaje es de Jefe?",
-    "¿Tu personaje es un enemigo?",
-    "¿Tu personaje aparece múltiples veces en el juego?"
-]
-claves = ["arma_aguijon", "arma_infeccion", "rol_jefe", "es_enemigo", "aparece_multiples"]
+# Diario compartido con las demás instancias: cada una sólo añade lo que
+# aprende y las escrituras van con candado entre procesos
+DIARIO = DiarioConocimiento(ARCHIVO_CONOCIMIENTO)
+
+# Preguntas y sus claves asociadas (catálogo preguntas.json, en la raíz)
+claves, preguntas = cargar_catalogo()
+pregunta_por_clave = dict(zip(claves, preguntas))
 
 # ======================================================
 # FUNCIONES DE UTILIDAD
 # ======================================================
 
 def guardar_conocimiento(base):
-    """Guarda la base de conocimiento en el archivo JSON."""
-    with open(ARCHIVO_CONOCIMIENTO, "w", encoding="utf-8") as f:
-        json.dump(base, f, indent=4, ensure_ascii=False)
+    """Guarda la base de conocimiento en el archivo JSON (temporal + renombrado, con el candado)."""
+    with DIARIO.candado:
+        escribir_json_atomico(ARCHIVO_CONOCIMIENTO, base)
 
 def cargar_conocimiento():
-    """Carga la base de conocimiento desde el archivo.
-    Si no existe, crea el archivo con la base inicial."""
-    if not os.path.exists(ARCHIVO_CONOCIMIENTO):
-        guardar_conocimiento(base_inicial)
-    with open(ARCHIVO_CONOCIMIENTO, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Carga la base de conocimiento desde el archivo y su diario.
+    Si no existe, crea el archivo con la base inicial.
+    Sólo se conservan los rasgos conocidos de cada personaje."""
+    with DIARIO.candado:
+        if not os.path.exists(ARCHIVO_CONOCIMIENTO):
+            guardar_conocimiento(base_inicial)
+        with open(ARCHIVO_CONOCIMIENTO, "r", encoding="utf-8") as f:
+            base = {nombre: rasgos_conocidos(rasgos) for nombre, rasgos in json.load(f).items()}
+        return DIARIO.reproducir(base)
+
+def guardar_aprendido(juego, nombre):
+    """Añade sólo este personaje al diario (lo comparten todas las instancias)."""
+    DIARIO.registrar(nombre, juego.base[nombre])
+    if DIARIO.necesita_compactar():
+        DIARIO.compactar(juego.base)
+
+def crear_juego():
+    """Motor con la base del archivo y su diario."""
+    return instrumentar_juego(MotorJuego.desde_base(cargar_conocimiento(), claves, tabla=True))
+
+def sincronizar(juego):
+    """Incorpora lo que otras instancias aprendieron; devuelve el motor (nuevo si hubo que recargar)."""
+    cambios = DIARIO.pendientes()
+    if cambios is None:
+        return crear_juego()
+    for nombre, rasgos in cambios:
+        juego.aprender(nombre, rasgos_conocidos(rasgos))
+    return juego
 
 # ======================================================
 # FUNCIONES DE INTERACCIÓN
@@ -127,53 +158,41 @@ def menu_confirmacion(pregunta):
         except ValueError:
             print(" Debes ingresar un número (1 o 2).")
 
-def obtener_respuestas():
-    """Realiza las 5 preguntas al usuario y devuelve sus respuestas."""
-    respuestas = {}
-    for i, pregunta in enumerate(preguntas):
-        respuesta = mostrar_menu_respuesta(pregunta)
-        respuestas[claves[i]] = respuesta
-    return respuestas
-
-def comparar_personaje(respuestas_usuario, caracteristicas_personaje):
-    """Devuelve un puntaje de coincidencia (0 a 1) entre las respuestas del usuario y un personaje."""
-    coincidencias = 0
-    for clave in respuestas_usuario:
-        if respuestas_usuario[clave] == caracteristicas_personaje[clave]:
-            coincidencias += 1
-        elif respuestas_usuario[clave] in ["Probablemente", "No lo se"]:
-            coincidencias += 0.5
-    return coincidencias / len(respuestas_usuario)
+def jugar_partida(juego):
+    """Hace las preguntas que elija el motor hasta que pueda dar un resultado."""
+    juego.iniciar()
+    while not juego.terminado():
+        clave = juego.pregunta_actual()
+        if juego.responder(mostrar_menu_respuesta(pregunta_por_clave[clave])):
+            print("\n No conozco ese personaje. Déjame terminar las preguntas para aprender.")
+    return juego.resultado()[0]
 
 # ======================================================
 # LÓGICA PRINCIPAL DEL JUEGO
 # ======================================================
 
-while True:
-    base = cargar_conocimiento()
+juego = crear_juego()
 
+while True:
     print("\n Bienvenido a '¿Adivina quien? - Hollow Knight Edition' ")
     input("Presiona ENTER cuando estés listo...\n")
+    juego = sincronizar(juego)
 
-    # El jugador responde las 5 preguntas
-    respuestas = obtener_respuestas()
-
-    # Calcular coincidencias con la base de conocimiento
-    puntajes = {}
-    for nombre, caracteristicas in base.items():
-        puntajes[nombre] = comparar_personaje(respuestas, caracteristicas)
-
-    # Obtener el personaje más probable
-    mejor = max(puntajes, key=puntajes.get)
+    # El jugador responde las preguntas que elige el motor
+    mejor = jugar_partida(juego)
 
     print("\n Estoy pensando...")
     time.sleep(1.5)
 
-    # Mostrar resultado sin porcentaje
-    print(f"\nCreo que tu personaje es: {mejor}")
+    if mejor is None:
+        # El motor no tiene ningún candidato convincente
+        confirmacion = "No"
+    else:
+        # Mostrar resultado sin porcentaje
+        print(f"\nCreo que tu personaje es: {mejor}")
 
-    # Confirmación del usuario con menú
-    confirmacion = menu_confirmacion("¿Adiviné tu personaje?")
+        # Confirmación del usuario con menú
+        confirmacion = menu_confirmacion("¿Adiviné tu personaje?")
 
     if confirmacion == "Si":
         # Si adivina correctamente, preguntar si desea jugar otra vez
@@ -193,8 +212,12 @@ while True:
         for clave, pregunta in zip(claves, preguntas):
             nuevo_info[clave] = mostrar_menu_respuesta(pregunta)
 
-        base[nombre_nuevo] = nuevo_info
-        guardar_conocimiento(base)
+        juego = sincronizar(juego)
+        gemelos = [otro for otro in juego.gemelos(nuevo_info) if otro != nombre_nuevo]
+        if gemelos:
+            print(f"\n Aviso: tiene las mismas características que {', '.join(gemelos)}; no podré diferenciarlos.")
+        juego.aprender(nombre_nuevo, nuevo_info)
+        guardar_aprendido(juego, nombre_nuevo)
         print(f"\n He aprendido sobre {nombre_nuevo} para la próxima vez.")
 
         jugar_nuevamente = menu_confirmacion("\n¿Quieres jugar otra vez?")
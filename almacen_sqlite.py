@@ -0,0 +1,190 @@
+"""
+Almacén opcional de la base de conocimiento en SQLite.
+
+Una fila por personaje y una columna por cada clave de CLAVES, con un índice
+por columna. La eliminación de 'registrar_respuesta' y la puntuación de
+'mostrar_resultado_puntaje' se resuelven como consultas indexadas, sin
+cargar toda la base en memoria.
+
+'migrar_desde_json' hace la migración única desde hollow_knight_data.json
+(o desde BASE_INICIAL si el JSON no existe).
+"""
+
+import json
+import os
+import sqlite3
+
+from motor_inferencia import (RESPUESTA_SI, RESPUESTA_NO, RESPUESTA_DESCONOCIDA,
+                              RESPUESTA_PROBABLE, elegir_clave_por_conteos, rasgos_conocidos)
+
+
+def columna(clave):
+    """Nombre de columna entre comillas (las claves vienen de CLAVES)."""
+    return '"' + clave.replace('"', '""') + '"'
+
+
+class AlmacenSQLite:
+    """
+    Acceso a la tabla 'personajes':
+        id (orden de inserción), nombre (único), una columna TEXT por clave.
+    El 'id' se conserva al sobrescribir un personaje, así que el orden de
+    desempate es el mismo que el de un diccionario de Python.
+    """
+
+    def __init__(self, ruta, claves):
+        self.ruta = ruta
+        self.claves = list(claves)
+        self.conexion = sqlite3.connect(ruta)
+        self.crear_tablas()
+
+    def crear_tablas(self):
+        columnas = ", ".join(f"{columna(clave)} TEXT NOT NULL DEFAULT '{RESPUESTA_DESCONOCIDA}'"
+                             for clave in self.claves)
+        with self.conexion:
+            self.conexion.execute(
+                f"CREATE TABLE IF NOT EXISTS personajes ("
+                f"id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE, {columnas})")
+            # Claves nuevas en CLAVES: se añaden como columnas desconocidas
+            existentes = {fila[1] for fila in self.conexion.execute("PRAGMA table_info(personajes)")}
+            for clave in self.claves:
+                if clave not in existentes:
+                    self.conexion.execute(
+                        f"ALTER TABLE personajes ADD COLUMN {columna(clave)} "
+                        f"TEXT NOT NULL DEFAULT '{RESPUESTA_DESCONOCIDA}'")
+                self.conexion.execute(
+                    f"CREATE INDEX IF NOT EXISTS {columna('idx_' + clave)} ON personajes ({columna(clave)})")
+
+    def cerrar(self):
+        self.conexion.close()
+
+    # --- Escritura ---
+
+    def _filas(self, base):
+        for nombre, rasgos in base.items():
+            yield [nombre] + [rasgos.get(clave, RESPUESTA_DESCONOCIDA) for clave in self.claves]
+
+    def guardar_varios(self, base):
+        columnas = ", ".join(columna(clave) for clave in self.claves)
+        marcas = ", ".join("?" for _ in range(len(self.claves) + 1))
+        actualizacion = ", ".join(f"{columna(clave)} = excluded.{columna(clave)}" for clave in self.claves)
+        with self.conexion:
+            self.conexion.executemany(
+                f"INSERT INTO personajes (nombre, {columnas}) VALUES ({marcas}) "
+                f"ON CONFLICT(nombre) DO UPDATE SET {actualizacion}",
+                self._filas(base))
+
+    def guardar(self, nombre, rasgos):
+        """Inserta o sobrescribe un personaje (conserva su posición)."""
+        self.guardar_varios({nombre: rasgos})
+
+    # --- Lectura ---
+
+    def existe(self, nombre):
+        fila = self.conexion.execute("SELECT 1 FROM personajes WHERE nombre = ?", (nombre,)).fetchone()
+        return fila is not None
+
+    def total(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM personajes").fetchone()[0]
+
+    def cargar_base(self):
+        """Devuelve toda la base como diccionario (para exportar a JSON)."""
+        columnas = ", ".join(columna(clave) for clave in self.claves)
+        base = {}
+        for fila in self.conexion.execute(f"SELECT nombre, {columnas} FROM personajes ORDER BY id"):
+            base[fila[0]] = rasgos_conocidos(dict(zip(self.claves, fila[1:])))
+        return base
+
+    def _condicion(self, respuestas):
+        """
+        WHERE que aplica Modus Ponens: para cada respuesta Si/No el rasgo debe
+        coincidir o ser desconocido ("Probablemente" queda descartado).
+        """
+        partes = []
+        parametros = []
+        for clave, respuesta in respuestas.items():
+            if respuesta in (RESPUESTA_SI, RESPUESTA_NO):
+                partes.append(f"{columna(clave)} IN (?, ?)")
+                parametros.extend([respuesta, RESPUESTA_DESCONOCIDA])
+        condicion = " AND ".join(partes) if partes else "1"
+        return condicion, parametros
+
+    def contar_candidatos(self, respuestas):
+        condicion, parametros = self._condicion(respuestas)
+        return self.conexion.execute(
+            f"SELECT COUNT(*) FROM personajes WHERE {condicion}", parametros).fetchone()[0]
+
+    def candidatos(self, respuestas, limite=None):
+        condicion, parametros = self._condicion(respuestas)
+        consulta = f"SELECT nombre FROM personajes WHERE {condicion} ORDER BY id"
+        if limite is not None:
+            consulta += f" LIMIT {int(limite)}"
+        return [fila[0] for fila in self.conexion.execute(consulta, parametros)]
+
+    def elegir_clave(self, respuestas):
+        """Misma elección de pregunta que BaseBits.elegir_clave, con un solo SELECT."""
+        libres = [clave for clave in self.claves if clave not in respuestas]
+        if not libres:
+            return None
+        condicion, parametros = self._condicion(respuestas)
+        sumas = [f"TOTAL({columna(clave)} = ?)" for clave in libres for _ in range(3)]
+        valores = [valor for _ in libres for valor in (RESPUESTA_SI, RESPUESTA_NO, RESPUESTA_DESCONOCIDA)]
+        fila = self.conexion.execute(
+            f"SELECT {', '.join(sumas)} FROM personajes WHERE {condicion}",
+            valores + parametros).fetchone()
+        conteos = {clave: tuple(int(n) for n in fila[3 * i:3 * i + 3]) for i, clave in enumerate(libres)}
+        return elegir_clave_por_conteos(self.claves, respuestas, conteos.__getitem__)
+
+    def mejores(self, respuestas, k=1):
+        """
+        Los k mejores (nombre, puntaje) entre los candidatos compatibles, con
+        los pesos de motor_inferencia.comparar_personaje (1 / 0.5 / 0). Los
+        empates se resuelven por orden de inserción, como max() sobre un
+        diccionario.
+        """
+        if not respuestas:
+            return []
+        terminos = []
+        valores = []
+        for clave, respuesta in respuestas.items():
+            # Medios puntos: 2 si coincide, 1 si la respuesta es ambigua
+            ambigua = 1 if respuesta in (RESPUESTA_DESCONOCIDA, RESPUESTA_PROBABLE) else 0
+            terminos.append(f"CASE WHEN {columna(clave)} = ? THEN 2 ELSE {ambigua} END")
+            valores.append(respuesta)
+        condicion, parametros = self._condicion(respuestas)
+        filas = self.conexion.execute(
+            f"SELECT nombre, {' + '.join(terminos)} AS medios FROM personajes "
+            f"WHERE {condicion} ORDER BY medios DESC, id ASC LIMIT {int(k)}",
+            valores + parametros).fetchall()
+        divisor = 2 * len(respuestas)
+        return [(nombre, medios / divisor) for nombre, medios in filas]
+
+
+def leer_nombres(ruta):
+    """
+    Nombres de todos los personajes por orden de inserción. Abre su propia
+    conexión para poder llamarse desde un hilo en segundo plano.
+    """
+    conexion = sqlite3.connect(ruta)
+    try:
+        return [nombre for (nombre,) in conexion.execute("SELECT nombre FROM personajes ORDER BY id")]
+    finally:
+        conexion.close()
+
+
+def migrar_desde_json(almacen, ruta_json, base_inicial, diario=None):
+    """
+    Migración única: si la tabla está vacía la llena con el JSON existente
+    (más los cambios de su diario, si se indica) o con 'base_inicial' si el
+    JSON no existe. Devuelve cuántos personajes se migraron.
+    """
+    if almacen.total() > 0:
+        return 0
+    if os.path.exists(ruta_json):
+        with open(ruta_json, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        if diario is not None:
+            base = diario.reproducir(base)
+    else:
+        base = dict(base_inicial)
+    almacen.guardar_varios(base)
+    return len(base)
@@ -0,0 +1,585 @@
+"""
+Persistencia de la base de conocimiento.
+
+Modo diario (journal): la base completa se guarda como una instantánea
+(hollow_knight_data.json) y cada personaje aprendido o sobrescrito se
+añade como una línea JSON a un registro aparte (hollow_knight_data.log).
+Aprender cuesta así una escritura pequeña en lugar de reescribir todo el
+archivo. Cuando el registro crece, 'compactar' lo vuelca en una nueva
+instantánea y empieza un registro nuevo.
+
+Varios procesos (quioscos, versión de texto, servidor) pueden compartir los
+mismos archivos:
+- Toda lectura o escritura del registro y de la instantánea se hace con
+  'CandadoArchivo' (un .lock exclusivo entre procesos y entre hilos).
+- Cada proceso sólo añade sus cambios (su delta) al registro, nunca
+  reescribe la base entera con lo que tiene en memoria.
+- Al compactar, la nueva instantánea es la base en memoria más lo que otros
+  hayan añadido al registro, y el registro se rota: empieza una nueva
+  generación (primera línea {"generacion": n}) y el anterior se conserva
+  como .anterior para que los demás puedan terminar de leerlo.
+- 'pendientes' devuelve los personajes que otros procesos aprendieron desde
+  la última lectura; 'hay_cambios' lo decide con un stat (tamaño y fecha
+  e inodo del registro), sin candado ni lectura.
+
+Guardado en segundo plano: 'GuardadoEnSegundoPlano' es un hilo que hace
+todas las escrituras. La interfaz sólo encola el cambio y sigue; los que
+llegan seguidos se juntan en una sola escritura.
+
+Carga incremental: 'LectorIncremental' recorre la instantánea personaje a
+personaje, leyendo el archivo por bloques, así que no hace falta tener el
+texto completo y el diccionario parseado en memoria a la vez. Si el archivo
+está truncado se conservan todos los personajes válidos leídos antes del
+daño.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: bloqueo de rangos con msvcrt
+    fcntl = None
+    import msvcrt
+
+# Número de líneas en el registro a partir del cual conviene compactar
+UMBRAL_COMPACTACION = 200
+
+# Tamaño de cada lectura del lector incremental (en caracteres)
+TAM_BLOQUE = 1 << 16
+
+# Segundos que el hilo de guardado espera para juntar varios cambios en una escritura
+VENTANA_GUARDADO = 0.5
+
+
+def escribir_json_atomico(ruta, datos, indent=4):
+    """Escribe en un temporal y lo renombra, para no dejar el archivo a medias."""
+    # Un temporal por proceso: dos procesos nunca escriben el mismo
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=indent, ensure_ascii=False, default=dict)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+class CandadoArchivo:
+    """
+    Candado exclusivo sobre 'ruta' entre procesos (flock / msvcrt.locking)
+    y entre los hilos del mismo proceso. Es reentrante en el mismo hilo:
+        with candado:
+            ...
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._hilos = threading.RLock()
+        self._archivo = None
+        self._profundidad = 0
+
+    def __enter__(self):
+        self._hilos.acquire()
+        if self._profundidad == 0:
+            try:
+                self._archivo = self._bloquear()
+            except OSError:
+                self._hilos.release()
+                raise
+        self._profundidad += 1
+        return self
+
+    def __exit__(self, *excepcion):
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            archivo, self._archivo = self._archivo, None
+            try:
+                if fcntl is not None:
+                    fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+                else:
+                    archivo.seek(0)
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                archivo.close()
+        self._hilos.release()
+
+    def _bloquear(self):
+        archivo = open(self.ruta, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+            else:
+                archivo.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK reintenta durante 10 s y luego falla: se sigue esperando
+                        msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+        except OSError:
+            archivo.close()
+            raise
+        return archivo
+
+
+def _firma(ruta):
+    """(tamaño, fecha de modificación, inodo) del archivo, o None si no existe."""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    # El inodo distingue un registro recién rotado con el mismo tamaño
+    return estado.st_size, estado.st_mtime_ns, estado.st_ino
+
+
+class DiarioConocimiento:
+    """
+    Registro de cambios de la base, una línea JSON por personaje:
+        {"nombre": "...", "rasgos": {...}}
+    precedidas, desde la primera compactación, por {"generacion": n}.
+    - ruta_instantanea: archivo JSON con la base completa.
+    - ruta_diario: registro de solo-añadir (por defecto, mismo nombre con .log).
+    - sincronizar: si es True hace fsync tras cada línea (más seguro, más lento).
+    - candado: CandadoArchivo compartido por todos los procesos (ruta_diario + .lock).
+    Lo leído hasta ahora se recuerda como (generacion, posicion) en el
+    registro; las líneas que escribió este proceso por delante de esa
+    posición se anotan en 'propias' para no devolverlas en 'pendientes'.
+    """
+
+    def __init__(self, ruta_instantanea, ruta_diario=None, sincronizar=False,
+                 umbral_compactacion=UMBRAL_COMPACTACION):
+        self.ruta_instantanea = ruta_instantanea
+        self.ruta_diario = ruta_diario or os.path.splitext(ruta_instantanea)[0] + ".log"
+        self.ruta_anterior = self.ruta_diario + ".anterior"
+        self.sincronizar = sincronizar
+        self.umbral_compactacion = umbral_compactacion
+        self.candado = CandadoArchivo(self.ruta_diario + ".lock")
+        self.entradas = 0
+        self.generacion = 0
+        self.posicion = 0
+        self.firma = None
+        # (generacion, posición) de las líneas propias aún no alcanzadas
+        self.propias = set()
+        # Cambios leídos al compactar que aún no se han entregado
+        self._sin_aplicar = []
+
+    # --- Lectura ---
+
+    @staticmethod
+    def _generacion(ruta):
+        """Generación de un registro (0 sin cabecera), o None si no existe."""
+        try:
+            with open(ruta, "rb") as f:
+                primera = f.readline()
+        except FileNotFoundError:
+            return None
+        try:
+            cabecera = json.loads(primera.decode("utf-8"))
+            return int(cabecera["generacion"])
+        except (ValueError, KeyError, TypeError):
+            return 0
+
+    def _leer(self, ruta, desde, generacion, recortar=False):
+        """
+        Líneas desde la posición 'desde' como [(nombre, rasgos, propia)], y la
+        posición tras la última línea completa. Con recortar=True se quita
+        una última línea sin terminar (un proceso que se cerró a medias).
+        """
+        cambios = []
+        fin_valido = desde
+        if not os.path.exists(ruta):
+            return cambios, fin_valido
+        with open(ruta, "rb") as f:
+            f.seek(desde)
+            inicio = desde
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                fin_valido = f.tell()
+                propia = (generacion, inicio) in self.propias
+                self.propias.discard((generacion, inicio))
+                inicio = fin_valido
+                try:
+                    entrada = json.loads(linea.decode("utf-8"))
+                    if "generacion" in entrada and "nombre" not in entrada:
+                        continue
+                    cambios.append((entrada["nombre"], entrada["rasgos"], propia))
+                except (ValueError, KeyError, TypeError):
+                    print(f"Advertencia: Línea inválida en {ruta}, se ignora.")
+
+        # Recorta una última línea sin terminar para que la siguiente
+        # escritura no quede pegada a ella
+        if recortar and fin_valido < os.path.getsize(ruta):
+            with open(ruta, "r+b") as f:
+                f.truncate(fin_valido)
+        return cambios, fin_valido
+
+    def reproducir(self, base, al_aplicar=None):
+        """
+        Aplica sobre 'base' los cambios del registro, en orden.
+        Si se indica, 'al_aplicar(nombre, rasgos)' se llama con cada cambio.
+        Una última línea incompleta (p. ej. por un cierre inesperado) se ignora.
+        Debe llamarse con la instantánea recién leída (mejor con el candado
+        tomado durante toda la carga, para que nadie compacte en medio).
+        """
+        with self.candado:
+            self.generacion = self._generacion(self.ruta_diario) or 0
+            self.propias.clear()
+            self._sin_aplicar = []
+            cambios, self.posicion = self._leer(self.ruta_diario, 0, self.generacion, recortar=True)
+            self.firma = _firma(self.ruta_diario)
+            self.entradas = len(cambios)
+        for nombre, rasgos, _propia in cambios:
+            base[nombre] = rasgos
+            if al_aplicar is not None:
+                al_aplicar(nombre, rasgos)
+        return base
+
+    def hay_cambios(self):
+        """Comprobación barata (un stat): ¿alguien escribió en el registro desde la última lectura?"""
+        return bool(self._sin_aplicar) or _firma(self.ruta_diario) != self.firma
+
+    def _siguientes(self):
+        # Líneas posteriores a lo ya leído como (del registro anterior, del
+        # actual, generación, posición final), o None si el registro rotó
+        # más de una vez desde entonces. No avanza la posición.
+        generacion = self._generacion(self.ruta_diario) or 0
+        if generacion == self.generacion:
+            cambios, fin = self._leer(self.ruta_diario, self.posicion, generacion, recortar=True)
+            return [], cambios, generacion, fin
+        # Otro proceso compactó: se termina el registro anterior y se lee el nuevo
+        if self._generacion(self.ruta_anterior) != self.generacion:
+            return None
+        anteriores, _fin = self._leer(self.ruta_anterior, self.posicion, self.generacion)
+        cambios, fin = self._leer(self.ruta_diario, 0, generacion, recortar=True)
+        return anteriores, cambios, generacion, fin
+
+    def pendientes(self):
+        """
+        Personajes que otros procesos aprendieron o sobrescribieron desde la
+        última lectura, como [(nombre, rasgos)] (el último cambio de cada
+        uno). Devuelve None si el registro rotó más de una vez entretanto:
+        hay que volver a cargar la base entera.
+        """
+        if not self.hay_cambios():
+            return []
+        with self.candado:
+            siguientes = self._siguientes()
+            if siguientes is None:
+                return None
+            anteriores, cambios, generacion, self.posicion = siguientes
+            if generacion != self.generacion:
+                self.generacion = generacion
+                self.entradas = 0
+            self.entradas += len(cambios)
+            self.firma = _firma(self.ruta_diario)
+            cambios = self._sin_aplicar + anteriores + cambios
+            self._sin_aplicar = []
+        # Orden de primera aparición (el de la instantánea), último valor
+        ultimos = {}
+        for nombre, rasgos, propia in cambios:
+            ultimos[nombre] = (rasgos, propia)
+        # Si el último cambio de un personaje es propio, la memoria ya lo tiene
+        return [(nombre, rasgos) for nombre, (rasgos, propia) in ultimos.items() if not propia]
+
+    # --- Escritura ---
+
+    def registrar(self, nombre, rasgos):
+        """Añade un personaje aprendido/sobrescrito al final del registro."""
+        self.registrar_varios([(nombre, rasgos)])
+
+    def registrar_varios(self, cambios):
+        """Añade varios (nombre, rasgos) con una sola escritura."""
+        lineas = [(json.dumps({"nombre": nombre, "rasgos": rasgos}, ensure_ascii=False, default=dict)
+                   + "\n").encode("utf-8") for nombre, rasgos in cambios]
+        if not lineas:
+            return
+        with self.candado:
+            with open(self.ruta_diario, "ab") as f:
+                inicio = f.tell()
+                # Una sola escritura: las líneas quedan enteras o no quedan
+                f.write(b"".join(lineas))
+                f.flush()
+                if self.sincronizar:
+                    os.fsync(f.fileno())
+            generacion = self._generacion(self.ruta_diario) or 0
+            if generacion == self.generacion and inicio == self.posicion:
+                # Nadie escribió desde la última lectura: se sigue al día
+                self.posicion = inicio + sum(len(linea) for linea in lineas)
+                self.firma = _firma(self.ruta_diario)
+            else:
+                for linea in lineas:
+                    self.propias.add((generacion, inicio))
+                    inicio += len(linea)
+            self.entradas += len(lineas)
+
+    def necesita_compactar(self):
+        return self.entradas >= self.umbral_compactacion
+
+    def compactar(self, base=None):
+        """
+        Guarda como nueva instantánea la base más lo que otros procesos hayan
+        añadido al registro, y empieza una nueva generación del registro.
+        'base' no se modifica: esos cambios los devolverá 'pendientes'. Sin
+        'base' (p. ej. desde un hilo que no debe tocar la de la interfaz) se
+        parte de la instantánea y el registro que hay en disco.
+        Devuelve False si no hizo falta porque otro proceso ya compactó
+        desde la última lectura.
+        """
+        with self.candado:
+            siguientes = self._siguientes()
+            if siguientes is None or siguientes[2] != self.generacion:
+                return False
+            cambios = siguientes[1]
+            if base is not None:
+                datos = dict(base)
+                encima = cambios
+            else:
+                datos = self._leer_disco()
+                if datos is None:
+                    return False
+                encima, _fin = self._leer(self.ruta_diario, 0, self.generacion)
+            for nombre, rasgos, _propia in encima:
+                datos[nombre] = rasgos
+            escribir_json_atomico(self.ruta_instantanea, datos)
+
+            generacion = self.generacion + 1
+            temporal = f"{self.ruta_diario}.{os.getpid()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write((json.dumps({"generacion": generacion}) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.ruta_diario):
+                os.replace(self.ruta_diario, self.ruta_anterior)
+            os.replace(temporal, self.ruta_diario)
+
+            # Lo leído queda a la espera de 'pendientes' y se sigue desde la
+            # cabecera del registro nuevo
+            self._sin_aplicar.extend(cambios)
+            self.generacion = generacion
+            self.posicion = os.path.getsize(self.ruta_diario)
+            self.firma = _firma(self.ruta_diario)
+            self.propias.clear()
+            self.entradas = 0
+        return True
+
+    def _leer_disco(self):
+        # Instantánea completa como diccionario; None si está dañada (no se
+        # compacta para no perder a los personajes que no se pudieron leer)
+        if not os.path.exists(self.ruta_instantanea):
+            return {}
+        lector = LectorIncremental(self.ruta_instantanea)
+        datos = dict(lector)
+        if lector.truncado:
+            print(f"Advertencia: {self.ruta_instantanea} está dañado; no se compacta.")
+            return None
+        return datos
+
+
+class GuardadoEnSegundoPlano:
+    """
+    Hilo dueño de las escrituras de un DiarioConocimiento.
+    - registrar(nombre, rasgos): encola un personaje y vuelve en seguida.
+    - encargar(clave, tarea): encola otra escritura (p. ej. la caché del
+      árbol); de cada clave sólo se hace la última.
+    Lo que llega dentro de 'ventana' segundos desde el primer cambio se
+    escribe junto: un personaje repetido sólo con su último valor y todos
+    con una sola escritura en el diario. 'vaciar' espera a que todo esté en
+    disco y 'cerrar' además termina el hilo.
+    Los errores no se muestran desde el hilo: se dejan en 'errores' como
+    (nombres, excepción) para que la interfaz los recoja.
+    """
+
+    def __init__(self, diario, ventana=VENTANA_GUARDADO):
+        self.diario = diario
+        self.ventana = ventana
+        self.errores = deque()
+        self._condicion = threading.Condition()
+        # nombre -> rasgos por escribir, en orden de llegada
+        self._personajes = {}
+        self._tareas = {}
+        # Nombres de la escritura en curso (siguen contando como pendientes)
+        self._escribiendo = set()
+        self._ocupado = False
+        self._urgente = False
+        self._cerrando = False
+        self._hilo = threading.Thread(target=self._trabajar, name="guardado", daemon=True)
+        self._hilo.start()
+
+    # --- Desde la interfaz ---
+
+    def registrar(self, nombre, rasgos):
+        # Se copian: 'rasgos' puede ser una vista de la base que cambiará
+        with self._condicion:
+            self._personajes[nombre] = dict(rasgos)
+            self._condicion.notify_all()
+
+    def encargar(self, clave, tarea):
+        with self._condicion:
+            self._tareas[clave] = tarea
+            self._condicion.notify_all()
+
+    def pendiente(self, nombre):
+        """True si el personaje aún no está escrito en el diario."""
+        with self._condicion:
+            return nombre in self._personajes or nombre in self._escribiendo
+
+    def vaciar(self):
+        """Escribe ya lo pendiente (sin esperar la ventana) y espera a que termine."""
+        with self._condicion:
+            self._urgente = True
+            self._condicion.notify_all()
+            while self._personajes or self._tareas or self._ocupado:
+                self._condicion.wait()
+            self._urgente = False
+
+    def cerrar(self):
+        self.vaciar()
+        with self._condicion:
+            self._cerrando = True
+            self._condicion.notify_all()
+        self._hilo.join()
+
+    # --- Hilo de guardado ---
+
+    def _trabajar(self):
+        while True:
+            with self._condicion:
+                while not (self._personajes or self._tareas or self._cerrando):
+                    self._condicion.wait()
+                if self._cerrando:
+                    return
+                # Ventana: se esperan más cambios para escribirlos juntos
+                limite = time.monotonic() + self.ventana
+                while not self._urgente:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicion.wait(restante)
+                personajes, self._personajes = self._personajes, {}
+                tareas, self._tareas = self._tareas, {}
+                self._escribiendo = set(personajes)
+                self._ocupado = True
+            try:
+                self._escribir(personajes, tareas)
+            except Exception as e:
+                # El hilo no puede morir: 'vaciar' y 'cerrar' esperarían para siempre
+                self.errores.append((list(personajes) + list(tareas), e))
+            finally:
+                with self._condicion:
+                    self._escribiendo = set()
+                    self._ocupado = False
+                    self._condicion.notify_all()
+
+    def _escribir(self, personajes, tareas):
+        if personajes:
+            try:
+                self.diario.registrar_varios(list(personajes.items()))
+                if self.diario.necesita_compactar():
+                    # Sin la base: este hilo no toca la de la interfaz
+                    self.diario.compactar()
+            except Exception as e:
+                # No sólo IOError: un rasgo que no se puede escribir o el candado
+                self.errores.append((list(personajes), e))
+        for clave, tarea in tareas.items():
+            try:
+                tarea()
+            except Exception as e:
+                self.errores.append(([clave], e))
+
+
+class LectorIncremental:
+    """
+    Recorre un JSON con la forma {"nombre": {rasgos}, ...} devolviendo
+    (nombre, rasgos) de uno en uno.
+    - leidos: personajes entregados hasta ahora.
+    - fraccion(): parte del archivo ya leída (0 a 1), para mostrar el progreso.
+    - truncado: True si el archivo terminó (o se dañó) antes de cerrar el objeto.
+    """
+
+    def __init__(self, ruta, tam_bloque=TAM_BLOQUE):
+        self.ruta = ruta
+        self.tam_bloque = tam_bloque
+        self.tam_total = os.path.getsize(ruta)
+        self.leidos = 0
+        self.truncado = False
+        self._decodificador = json.JSONDecoder()
+        self._archivo = None
+        self._texto = ""
+        self._pos = 0
+        self._fin = False
+
+    def fraccion(self):
+        if self._archivo is None or not self.tam_total:
+            return 1.0
+        return min(self._archivo.buffer.tell() / self.tam_total, 1.0)
+
+    def _leer_mas(self):
+        # Descarta lo ya consumido y añade el siguiente bloque
+        bloque = self._archivo.read(self.tam_bloque)
+        if not bloque:
+            self._fin = True
+            return False
+        self._texto = self._texto[self._pos:] + bloque
+        self._pos = 0
+        return True
+
+    def _saltar_espacios(self):
+        while True:
+            while self._pos < len(self._texto) and self._texto[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._texto) or not self._leer_mas():
+                return
+
+    def _simbolo(self):
+        """Siguiente carácter significativo (sin consumirlo), o None al final."""
+        self._saltar_espacios()
+        return self._texto[self._pos] if self._pos < len(self._texto) else None
+
+    def _valor(self):
+        """Decodifica el siguiente valor JSON, leyendo más bloques si hace falta."""
+        self._saltar_espacios()
+        while True:
+            try:
+                valor, fin = self._decodificador.raw_decode(self._texto, self._pos)
+                self._pos = fin
+                return valor
+            except json.JSONDecodeError:
+                if not self._leer_mas():
+                    raise
+
+    def __iter__(self):
+        with open(self.ruta, "r", encoding="utf-8") as self._archivo:
+            try:
+                if self._simbolo() != "{":
+                    raise ValueError("no empieza con '{'")
+                self._pos += 1
+                if self._simbolo() == "}":
+                    return
+                while True:
+                    nombre = self._valor()
+                    if self._simbolo() != ":":
+                        raise ValueError("falta ':'")
+                    self._pos += 1
+                    rasgos = self._valor()
+                    if not isinstance(nombre, str) or not isinstance(rasgos, dict):
+                        raise ValueError(f"entrada inválida cerca de {nombre!r}")
+
+                    self.leidos += 1
+                    yield nombre, rasgos
+
+                    separador = self._simbolo()
+                    if separador == "}":
+                        return
+                    if separador != ",":
+                        raise ValueError("falta ','")
+                    self._pos += 1
+            except (ValueError, UnicodeDecodeError) as e:
+                # json.JSONDecodeError también es ValueError
+                print(f"Advertencia: {self.ruta} está dañado o truncado tras "
+                      f"{self.leidos} personajes. Error: {e}")
+                self.truncado = True
@@ -0,0 +1,229 @@
+"""
+Árbol de decisión compilado a partir de la base de conocimiento.
+
+Cada nodo guarda sólo la clave que se pregunta en ese punto y sus hijos.
+Las ramas son tres: "Si", "No" y "otro" ("No lo se"/"Probablemente", que
+no eliminan a nadie). Así elegir la siguiente pregunta es un recorrido de
+punteros. Los candidatos vivos no se guardan en los nodos: son la
+intersección de las máscaras de BaseBits a lo largo del camino, y cada
+partida la va calculando (un AND por respuesta Si/No), así que el árbol no
+ocupa memoria proporcional al tamaño de la base por cada nodo.
+
+El árbol se guarda junto a la base (hollow_knight_arbol.json) con una
+huella SHA-256 del contenido; si la base cambia por fuera del juego la
+huella no coincide y se recompila. Al aprender un personaje sólo se
+parchean los nodos por los que pasa, en lugar de recompilar todo.
+"""
+
+import hashlib
+import json
+import os
+
+from motor_inferencia import RESPUESTA_SI, RESPUESTA_NO, RESPUESTA_DESCONOCIDA
+
+# Índices de las ramas dentro de la lista de hijos de cada nodo
+RAMA_SI = 0
+RAMA_NO = 1
+RAMA_OTRO = 2
+
+# Hijo todavía no compilado (se compila al recorrerlo por primera vez)
+SIN_COMPILAR = -1
+
+# Con muchas claves el árbol completo crece como 3^profundidad; por encima
+# de este número de nodos el resto se compila bajo demanda.
+LIMITE_NODOS = 50000
+
+
+def rama_de(respuesta):
+    if respuesta == RESPUESTA_SI:
+        return RAMA_SI
+    if respuesta == RESPUESTA_NO:
+        return RAMA_NO
+    return RAMA_OTRO
+
+
+def huella_base(base, claves):
+    """Huella del contenido de la base (el orden importa: fija los bits)."""
+    if hasattr(base, "huella"):
+        # Las bases binarias y compactas la calculan sin decodificar los rasgos
+        return base.huella(claves)
+    contenido = json.dumps({"claves": list(claves), "base": base}, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class ArbolDecision:
+    """
+    Nodos guardados en listas paralelas (índice = id del nodo):
+    - claves_nodo: clave preguntada en el nodo, o None si es terminal.
+    - hijos: [hijo_si, hijo_no, hijo_otro] para los nodos internos.
+    El nodo 0 es la raíz. Los métodos que necesitan los candidatos de un
+    nodo reciben su máscara (la de la partida que llega a él).
+    """
+
+    raiz = 0
+
+    def __init__(self, motor, limite_nodos=LIMITE_NODOS):
+        self.motor = motor
+        self.limite_nodos = limite_nodos
+        self.claves_nodo = []
+        self.hijos = []
+
+    # --- Compilación ---
+
+    def compilar(self):
+        self.claves_nodo, self.hijos = [], []
+        self._nuevo_nodo()
+        # Recorrido en anchura para que el límite corte las ramas más profundas
+        pendientes = [(self.raiz, frozenset(), self.motor.mascara_todos)]
+        while pendientes:
+            siguientes = []
+            for nodo, preguntadas, mascara in pendientes:
+                siguientes.extend(self._expandir(nodo, preguntadas, mascara))
+            pendientes = siguientes
+
+    def _nuevo_nodo(self):
+        self.claves_nodo.append(None)
+        self.hijos.append(None)
+        return len(self.hijos) - 1
+
+    def _expandir(self, nodo, preguntadas, mascara, recursivo=False):
+        """
+        Decide la pregunta del nodo (con candidatos 'mascara') y crea sus tres
+        hijos. Devuelve los hijos creados (con sus claves ya preguntadas y sus
+        candidatos) para seguir expandiéndolos, o una lista vacía si el nodo
+        es terminal.
+        """
+        if self.motor.contar(mascara) <= 1:
+            return []
+        clave = self.motor.elegir_clave(mascara, preguntadas)
+        if clave is None:
+            return []
+
+        self.claves_nodo[nodo] = clave
+        if len(self.hijos) + 3 > self.limite_nodos:
+            self.hijos[nodo] = [SIN_COMPILAR, SIN_COMPILAR, SIN_COMPILAR]
+            return []
+
+        self.hijos[nodo] = [self._nuevo_nodo(), self._nuevo_nodo(), self._nuevo_nodo()]
+        preguntadas = preguntadas | {clave}
+        mascaras = [self.motor.filtrar(mascara, clave, RESPUESTA_SI),
+                    self.motor.filtrar(mascara, clave, RESPUESTA_NO),
+                    mascara]
+        expandidos = [(hijo, preguntadas, mascara_hijo)
+                      for hijo, mascara_hijo in zip(self.hijos[nodo], mascaras)]
+        if recursivo:
+            while expandidos:
+                expandidos.extend(self._expandir(*expandidos.pop()))
+            return []
+        return expandidos
+
+    # --- Recorrido ---
+
+    def clave(self, nodo):
+        return self.claves_nodo[nodo]
+
+    def avanzar(self, nodo, respuesta, preguntadas, mascara):
+        """
+        Sigue la rama de la respuesta y devuelve el nodo hijo.
+        'preguntadas' son las claves ya respondidas (incluida la del nodo) y
+        'mascara' los candidatos tras la respuesta; sólo se usan si el hijo
+        hay que compilarlo en este momento.
+        """
+        rama = rama_de(respuesta)
+        hijo = self.hijos[nodo][rama]
+        if hijo == SIN_COMPILAR:
+            hijo = self._nuevo_nodo()
+            self.hijos[nodo][rama] = hijo
+            self._expandir_perezoso(hijo, frozenset(preguntadas), mascara)
+        return hijo
+
+    def _expandir_perezoso(self, nodo, preguntadas, mascara):
+        # Sólo se decide la pregunta; los nietos quedan sin compilar
+        if self.motor.contar(mascara) <= 1:
+            return
+        clave = self.motor.elegir_clave(mascara, preguntadas)
+        if clave is not None:
+            self.claves_nodo[nodo] = clave
+            self.hijos[nodo] = [SIN_COMPILAR, SIN_COMPILAR, SIN_COMPILAR]
+
+    # --- Actualización incremental ---
+
+    def agregar(self, nombre, rasgos, sobrescribe=False):
+        """
+        Parchea el árbol tras 'motor.agregar(nombre, rasgos)'.
+        Sólo se recorren los nodos compatibles con sus rasgos; un nodo
+        terminal que pasa a tener varios candidatos se expande. Al
+        sobrescribir no hay nada que quitar: los nodos no guardan candidatos.
+        """
+        pendientes = [(self.raiz, frozenset(), self.motor.mascara_todos)]
+        while pendientes:
+            nodo, preguntadas, mascara = pendientes.pop()
+            clave = self.claves_nodo[nodo]
+
+            if clave is None:
+                if self.hijos[nodo] is None:
+                    # Nodo terminal: compila su subárbol si ahora es ambiguo
+                    self._expandir(nodo, preguntadas, mascara, recursivo=True)
+                continue
+
+            rasgo = rasgos.get(clave, RESPUESTA_DESCONOCIDA)
+            if rasgo == RESPUESTA_SI:
+                ramas = [RAMA_SI, RAMA_OTRO]
+            elif rasgo == RESPUESTA_NO:
+                ramas = [RAMA_NO, RAMA_OTRO]
+            elif rasgo == RESPUESTA_DESCONOCIDA:
+                ramas = [RAMA_SI, RAMA_NO, RAMA_OTRO]
+            else:
+                ramas = [RAMA_OTRO]
+
+            preguntadas = preguntadas | {clave}
+            for rama in ramas:
+                hijo = self.hijos[nodo][rama]
+                if hijo != SIN_COMPILAR:
+                    respuesta = (RESPUESTA_SI, RESPUESTA_NO, None)[rama]
+                    pendientes.append((hijo, preguntadas, self.motor.filtrar(mascara, clave, respuesta)))
+
+    # --- Persistencia ---
+
+    def a_dict(self, huella):
+        return {
+            "huella": huella,
+            "claves": self.claves_nodo,
+            "hijos": self.hijos,
+        }
+
+    def desde_dict(self, datos):
+        self.claves_nodo = datos["claves"]
+        self.hijos = datos["hijos"]
+
+
+def guardar_arbol(ruta, arbol, huella):
+    try:
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(arbol.a_dict(huella), f, ensure_ascii=False, separators=(",", ":"))
+    except IOError as e:
+        # El árbol es sólo una caché: si no se puede guardar se recompila luego
+        print(f"Advertencia: No se pudo guardar el árbol de decisión en {ruta}. Error: {e}")
+
+
+def cargar_arbol(ruta, motor, base, claves):
+    """
+    Devuelve el árbol compilado de la base. Usa el archivo guardado si su
+    huella coincide con el contenido actual; si no, compila y lo guarda.
+    """
+    arbol = ArbolDecision(motor)
+    huella = huella_base(base, claves)
+
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            if datos.get("huella") == huella:
+                arbol.desde_dict(datos)
+                return arbol
+        except (IOError, ValueError, KeyError) as e:
+            print(f"Advertencia: Árbol de decisión inválido en {ruta}, se recompila. Error: {e}")
+
+    arbol.compilar()
+    guardar_arbol(ruta, arbol, huella)
+    return arbol
@@ -0,0 +1,152 @@
+"""
+Base de conocimiento compacta en memoria.
+
+En lugar de un diccionario de diccionarios (nombre -> {clave: "Si"/"No"...}),
+'BaseCompacta' guarda:
+- nombres: lista de nombres internados; la posición es la fila del personaje.
+- columnas: un bytearray por clave, un byte por personaje con el código del
+  rasgo (CODIGOS_RESPUESTA; 0 = desconocido).
+- extra: los pocos rasgos que no caben en las columnas (claves fuera de
+  CLAVES o valores no reconocidos), para no perder nada al guardar.
+
+Se usa como el diccionario de siempre: base[nombre] devuelve una vista de
+sólo lectura de los rasgos conocidos (RasgosCompactos) y base[nombre] = rasgos
+codifica el personaje. Para escribirla como JSON basta con json.dump(...,
+default=dict): el archivo resultante es el mismo que con diccionarios.
+"""
+
+import hashlib
+import json
+import sys
+from collections.abc import Mapping
+
+from motor_inferencia import CODIGOS_RESPUESTA
+
+VALOR_POR_CODIGO = {codigo: valor for valor, codigo in CODIGOS_RESPUESTA.items()}
+
+
+class RasgosCompactos(Mapping):
+    """Vista de los rasgos conocidos de un personaje (sin copiar nada)."""
+
+    __slots__ = ("base", "fila")
+
+    def __init__(self, base, fila):
+        self.base = base
+        self.fila = fila
+
+    def __getitem__(self, clave):
+        j = self.base.posiciones.get(clave)
+        if j is not None:
+            codigo = self.base.columnas[j][self.fila]
+            if codigo:
+                return VALOR_POR_CODIGO[codigo]
+        return self.base.extra[self.fila][clave]
+
+    def __iter__(self):
+        for clave, columna in zip(self.base.claves, self.base.columnas):
+            if columna[self.fila]:
+                yield clave
+        yield from self.base.extra.get(self.fila, ())
+
+    def __len__(self):
+        conocidos = sum(1 for columna in self.base.columnas if columna[self.fila])
+        return conocidos + len(self.base.extra.get(self.fila, ()))
+
+    def get(self, clave, defecto=None):
+        # Sin pasar por KeyError: el motor consulta así cada clave al cargar
+        j = self.base.posiciones.get(clave)
+        if j is not None:
+            codigo = self.base.columnas[j][self.fila]
+            if codigo:
+                return VALOR_POR_CODIGO[codigo]
+        extra = self.base.extra.get(self.fila)
+        if extra is not None and clave in extra:
+            return extra[clave]
+        return defecto
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class BaseCompacta(Mapping):
+    """
+    Mapping nombre -> rasgos con almacenamiento por columnas.
+    Como BaseBinaria, admite base[nombre] = rasgos para añadir o sobrescribir.
+    """
+
+    def __init__(self, claves, base=None):
+        self.claves = list(claves)
+        self.posiciones = {clave: j for j, clave in enumerate(self.claves)}
+        self.columnas = [bytearray() for _ in self.claves]
+        self.nombres = []
+        self.indices = {}
+        # fila -> {clave: valor} de lo que no se puede codificar en las columnas
+        self.extra = {}
+        if base is not None:
+            for nombre, rasgos in base.items():
+                self[nombre] = rasgos
+
+    # --- Interfaz de diccionario ---
+
+    def __getitem__(self, nombre):
+        return RasgosCompactos(self, self.indices[nombre])
+
+    def __setitem__(self, nombre, rasgos):
+        # Se codifica la fila entera antes de tocar nada: rasgos puede ser la
+        # vista de este mismo personaje, y un valor que no se pueda codificar
+        # (TypeError) no debe dejar una fila a medias
+        codigos = {}
+        extra = {}
+        for clave, valor in rasgos.items():
+            j = self.posiciones.get(clave)
+            codigo = CODIGOS_RESPUESTA.get(valor)
+            if j is not None and codigo is not None:
+                codigos[j] = codigo
+            elif codigo != 0:
+                # "No lo se" fuera de las columnas no hace falta guardarlo
+                extra[clave] = valor
+
+        fila = self.indices.get(nombre)
+        if fila is None:
+            fila = len(self.nombres)
+            nombre = sys.intern(nombre)
+            self.nombres.append(nombre)
+            self.indices[nombre] = fila
+            for columna in self.columnas:
+                columna.append(0)
+        else:
+            for columna in self.columnas:
+                columna[fila] = 0
+            self.extra.pop(fila, None)
+
+        for j, codigo in codigos.items():
+            self.columnas[j][fila] = codigo
+        if extra:
+            self.extra[fila] = extra
+
+    def __contains__(self, nombre):
+        return nombre in self.indices
+
+    def __iter__(self):
+        return iter(self.nombres)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    # --- Utilidades ---
+
+    def codigo(self, fila, clave):
+        """Código del rasgo (0 si es desconocido o no está en las columnas)."""
+        j = self.posiciones.get(clave)
+        return self.columnas[j][fila] if j is not None else 0
+
+    def huella(self, claves):
+        """Huella del contenido, calculada sobre las columnas sin decodificar."""
+        resumen = hashlib.sha256(json.dumps({"claves": list(claves), "columnas": self.claves},
+                                            ensure_ascii=False).encode("utf-8"))
+        for nombre in self.nombres:
+            resumen.update(nombre.encode("utf-8") + b"\0")
+        for columna in self.columnas:
+            resumen.update(columna)
+        resumen.update(json.dumps(sorted(self.extra.items()), ensure_ascii=False).encode("utf-8"))
+        return resumen.hexdigest()
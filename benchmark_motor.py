@@ -0,0 +1,328 @@
+"""
+Banco de pruebas de rendimiento del motor.
+
+Genera bases sintéticas (con semilla, mismo esquema que hollow_knight_data.json)
+de 10^2 a 10^7 personajes y mide, para cada tamaño:
+- carga: lectura incremental del JSON alimentando máscaras y matriz.
+- compilar_arbol: compilación del árbol de decisión.
+- por_respuesta: latencia media de MotorJuego.responder.
+- puntaje_final: puntuar a toda la base con un vector de respuestas completo.
+- guardar: reescritura completa del JSON y un apunte en el diario.
+- rss_pico_kb: memoria residente máxima del proceso.
+
+Cada tamaño se mide en un proceso aparte para que el pico de memoria sea
+el de ese tamaño. El JSON sintético lo escribe antes el proceso principal,
+personaje a personaje, así que el pico medido es sólo el de cargar y jugar. Los resultados se guardan en JSON y se pueden comparar
+con una ejecución anterior para detectar regresiones.
+
+Con --vecinos se compara en cambio la búsqueda del más parecido por fuerza
+bruta (PuntuadorMatricial) con IndicePerfiles, y se informa a partir de qué
+tamaño compensa el índice (incluida su construcción, repartida entre las
+consultas).
+
+Uso:
+    python benchmark_motor.py --exp-max 5 --salida resultados.json
+    python benchmark_motor.py --comparar anterior.json --salida nuevo.json
+    python benchmark_motor.py --vecinos --claves 12
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from motor_inferencia import (BaseClases, PuntuadorMatricial, OPCIONES_RESPUESTA,
+                              RESPUESTA_SI, RESPUESTA_NO, RESPUESTA_DESCONOCIDA)
+from arbol_decision import ArbolDecision
+from almacenamiento import DiarioConocimiento, LectorIncremental, escribir_json_atomico
+from motor_juego import MotorJuego
+from indice_perfiles import IndicePerfiles
+
+try:
+    import resource
+except ImportError:
+    # En Windows no existe 'resource': no se informa el pico de memoria
+    resource = None
+
+# Si una métrica empeora más que este factor respecto a la anterior, se marca
+FACTOR_REGRESION = 1.2
+
+
+def claves_sinteticas(num_claves):
+    return [f"rasgo_{i:03d}" for i in range(num_claves)]
+
+
+def personajes_sinteticos(num_personajes, claves, densidad_desconocido=0.1, semilla=0):
+    """
+    (nombre, rasgos) de la base sintética de uno en uno, reproducibles con
+    'semilla'. 'densidad_desconocido' es la fracción de rasgos "No lo se".
+    """
+    azar = random.Random(semilla)
+    for i in range(num_personajes):
+        rasgos = {}
+        for clave in claves:
+            if azar.random() < densidad_desconocido:
+                rasgos[clave] = RESPUESTA_DESCONOCIDA
+            else:
+                rasgos[clave] = RESPUESTA_SI if azar.random() < 0.5 else RESPUESTA_NO
+        yield f"Personaje {i}", rasgos
+
+
+def generar_base(num_personajes, num_claves=5, densidad_desconocido=0.1, semilla=0):
+    """Base sintética {nombre: {clave: valor}} en memoria (ver 'personajes_sinteticos')."""
+    claves = claves_sinteticas(num_claves)
+    return dict(personajes_sinteticos(num_personajes, claves, densidad_desconocido, semilla)), claves
+
+
+def escribir_base(ruta, num_personajes, num_claves=5, densidad_desconocido=0.1, semilla=0):
+    """
+    Escribe la misma base que 'generar_base' como JSON sin tenerla entera
+    en memoria (hasta 10^7 personajes no cabría como diccionario).
+    """
+    claves = claves_sinteticas(num_claves)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("{")
+        separador = "\n"
+        for nombre, rasgos in personajes_sinteticos(num_personajes, claves, densidad_desconocido, semilla):
+            f.write(f"{separador}    {json.dumps(nombre, ensure_ascii=False)}: "
+                    f"{json.dumps(rasgos, ensure_ascii=False)}")
+            separador = ",\n"
+        f.write("\n}\n")
+    return claves
+
+
+def generar_vectores(base, claves, cantidad, semilla=0, ruido=0.1):
+    """Vectores de respuestas de personajes al azar, con un poco de ruido."""
+    azar = random.Random(semilla + 1)
+    nombres = list(base)
+    vectores = []
+    for _ in range(cantidad):
+        rasgos = base[azar.choice(nombres)]
+        vector = {}
+        for clave in claves:
+            vector[clave] = azar.choice(OPCIONES_RESPUESTA) if azar.random() < ruido else rasgos[clave]
+        vectores.append(vector)
+    return vectores
+
+
+def rss_pico_kb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS lo informa en bytes; Linux en KiB
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+
+def medir_tamano(ruta_json, num_personajes, num_claves, semilla, partidas):
+    """
+    Mide todas las métricas para la base de 'ruta_json' (escrita antes con
+    'escribir_base'). Devuelve un diccionario.
+    """
+    claves = claves_sinteticas(num_claves)
+
+    # --- Carga ---
+    inicio = time.perf_counter()
+    motor = BaseClases({}, claves)
+    puntuador = PuntuadorMatricial({}, claves)
+    cargada = {}
+    for nombre, rasgos in LectorIncremental(ruta_json):
+        cargada[nombre] = rasgos
+        motor.agregar(nombre, rasgos)
+        puntuador.agregar(nombre, rasgos)
+    carga = time.perf_counter() - inicio
+    # Los mismos vectores que con la base generada en memoria
+    vectores = generar_vectores(cargada, claves, partidas, semilla)
+
+    inicio = time.perf_counter()
+    arbol = ArbolDecision(motor)
+    arbol.compilar()
+    compilar = time.perf_counter() - inicio
+
+    juego = MotorJuego(claves, base=cargada, motor=motor, puntuador=puntuador, arbol=arbol)
+
+    # --- Latencia por respuesta ---
+    respuestas_totales = 0
+    tiempo_respuestas = 0.0
+    for vector in vectores:
+        juego.iniciar()
+        while not juego.terminado():
+            clave = juego.pregunta_actual()
+            inicio = time.perf_counter()
+            juego.responder(vector[clave])
+            tiempo_respuestas += time.perf_counter() - inicio
+            respuestas_totales += 1
+        juego.resultado()
+
+    # --- Puntuación final sobre toda la base (peor caso) ---
+    inicio = time.perf_counter()
+    for vector in vectores:
+        puntuador.mejores(vector)
+    puntaje_final = (time.perf_counter() - inicio) / max(len(vectores), 1)
+
+    # --- Guardado ---
+    inicio = time.perf_counter()
+    escribir_json_atomico(ruta_json, cargada)
+    guardar_completo = time.perf_counter() - inicio
+
+    diario = DiarioConocimiento(ruta_json)
+    inicio = time.perf_counter()
+    diario.registrar("Personaje Nuevo", vectores[0] if vectores else {})
+    guardar_diario = time.perf_counter() - inicio
+
+    return {
+        "personajes": num_personajes,
+        "claves": num_claves,
+        "carga_s": carga,
+        "compilar_arbol_s": compilar,
+        "por_respuesta_s": tiempo_respuestas / max(respuestas_totales, 1),
+        "preguntas_por_partida": respuestas_totales / max(len(vectores), 1),
+        "puntaje_final_s": puntaje_final,
+        "guardar_completo_s": guardar_completo,
+        "guardar_diario_s": guardar_diario,
+        "rss_pico_kb": rss_pico_kb(),
+    }
+
+
+def medir_vecinos(num_personajes, num_claves, densidad_desconocido, semilla, consultas):
+    """Fuerza bruta frente a IndicePerfiles para un tamaño (segundos por consulta)."""
+    base, claves = generar_base(num_personajes, num_claves, densidad_desconocido, semilla)
+    vectores = generar_vectores(base, claves, consultas, semilla)
+    puntuador = PuntuadorMatricial(base, claves)
+    del base
+
+    inicio = time.perf_counter()
+    for vector in vectores:
+        esperado = puntuador.mejores(vector)
+    fuerza_bruta = (time.perf_counter() - inicio) / consultas
+
+    indice = IndicePerfiles(puntuador)
+    inicio = time.perf_counter()
+    indice._construir()
+    construccion = time.perf_counter() - inicio
+    visitados = 0
+    inicio = time.perf_counter()
+    for vector in vectores:
+        obtenido = indice.mejores(vector)
+        visitados += indice.visitados
+    por_consulta = (time.perf_counter() - inicio) / consultas
+    if obtenido != esperado:
+        raise AssertionError(f"el índice no coincide con la fuerza bruta: {obtenido} != {esperado}")
+
+    return {
+        "personajes": num_personajes,
+        "perfiles": len(indice.perfiles_nodo),
+        "fuerza_bruta_s": fuerza_bruta,
+        "indice_s": por_consulta,
+        "indice_con_construccion_s": por_consulta + construccion / consultas,
+        "perfiles_visitados": visitados / consultas,
+    }
+
+
+def comparar(anteriores, actuales, factor=FACTOR_REGRESION):
+    """Lista de textos con las métricas que empeoraron más que 'factor'."""
+    por_tamano = {fila["personajes"]: fila for fila in anteriores}
+    regresiones = []
+    for fila in actuales:
+        anterior = por_tamano.get(fila["personajes"])
+        if anterior is None:
+            continue
+        for metrica, valor in fila.items():
+            previo = anterior.get(metrica)
+            if metrica == "personajes" or not isinstance(valor, (int, float)) or not previo:
+                continue
+            if valor > previo * factor:
+                regresiones.append(f"{fila['personajes']} personajes, {metrica}: "
+                                   f"{previo:.6g} -> {valor:.6g} (x{valor / previo:.2f})")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de Adivina Quién")
+    parser.add_argument("--exp-min", type=int, default=2, help="tamaño mínimo como potencia de 10")
+    parser.add_argument("--exp-max", type=int, default=5, help="tamaño máximo como potencia de 10 (hasta 7)")
+    parser.add_argument("--claves", type=int, default=5, help="número de atributos por personaje")
+    parser.add_argument("--desconocido", type=float, default=0.1, help="densidad de rasgos 'No lo se'")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--partidas", type=int, default=200, help="partidas simuladas por tamaño")
+    parser.add_argument("--salida", default="benchmark_resultados.json")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    parser.add_argument("--vecinos", action="store_true",
+                        help="compara fuerza bruta e índice de perfiles en el caso ambiguo")
+    parser.add_argument("--un-tamano", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--archivo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.un_tamano is not None:
+        # Proceso hijo: mide la base de --archivo y escribe el resultado por stdout
+        fila = medir_tamano(args.archivo, args.un_tamano, args.claves, args.semilla, args.partidas)
+        print(json.dumps(fila))
+        return
+
+    if args.vecinos:
+        filas = []
+        for exponente in range(args.exp_min, args.exp_max + 1):
+            fila = medir_vecinos(10 ** exponente, args.claves, args.desconocido, args.semilla, args.partidas)
+            filas.append(fila)
+            print(f"{fila['personajes']:>10} personajes ({fila['perfiles']} perfiles) | "
+                  f"fuerza bruta {fila['fuerza_bruta_s'] * 1e6:.1f}µs | "
+                  f"índice {fila['indice_s'] * 1e6:.1f}µs "
+                  f"({fila['indice_con_construccion_s'] * 1e6:.1f}µs con construcción, "
+                  f"{fila['perfiles_visitados']:.0f} perfiles visitados)")
+        # Menor tamaño a partir del cual el índice gana en todos los mayores
+        cruce = None
+        for fila in reversed(filas):
+            if fila["indice_con_construccion_s"] >= fila["fuerza_bruta_s"]:
+                break
+            cruce = fila["personajes"]
+        print(f"El índice compensa a partir de {cruce} personajes." if cruce
+              else "El índice no compensa en los tamaños medidos.")
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "vecinos": filas, "cruce": cruce}, f, indent=4)
+        return
+
+    resultados = []
+    for exponente in range(args.exp_min, args.exp_max + 1):
+        tamano = 10 ** exponente
+        directorio = tempfile.mkdtemp(prefix="benchmark_hk_")
+        try:
+            # Se escribe aquí para que el hijo sólo mida cargar y jugar
+            ruta_json = os.path.join(directorio, "hollow_knight_data.json")
+            escribir_base(ruta_json, tamano, args.claves, args.desconocido, args.semilla)
+            comando = [sys.executable, os.path.abspath(__file__), "--un-tamano", str(tamano),
+                       "--archivo", ruta_json, "--claves", str(args.claves),
+                       "--semilla", str(args.semilla), "--partidas", str(args.partidas)]
+            salida = subprocess.run(comando, capture_output=True, text=True, check=True).stdout
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+        fila = json.loads(salida.strip().splitlines()[-1])
+        resultados.append(fila)
+        print(f"{tamano:>10} personajes | carga {fila['carga_s']:.3f}s | "
+              f"árbol {fila['compilar_arbol_s']:.3f}s | "
+              f"respuesta {fila['por_respuesta_s'] * 1e6:.1f}µs | "
+              f"puntaje {fila['puntaje_final_s'] * 1e3:.2f}ms | "
+              f"guardar {fila['guardar_completo_s']:.3f}s / diario {fila['guardar_diario_s'] * 1e6:.0f}µs | "
+              f"RSS {fila['rss_pico_kb']} KiB")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump({"parametros": vars(args), "resultados": resultados}, f, indent=4)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anteriores = json.load(f)["resultados"]
+        regresiones = comparar(anteriores, resultados)
+        if regresiones:
+            print("Posibles regresiones:")
+            for linea in regresiones:
+                print("  " + linea)
+            sys.exit(1)
+        print("Sin regresiones respecto a la ejecución anterior.")
+
+
+if __name__ == "__main__":
+    main()
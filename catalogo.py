@@ -0,0 +1,60 @@
+"""
+Catálogo de preguntas del juego, leído de un archivo de datos.
+
+preguntas.json es una lista, en el orden en que se prefieren las preguntas:
+    [{"clave": "arma_aguijon", "pregunta": "¿El arma que utiliza es un aguijón?"}, ...]
+Añadir un atributo es añadir una entrada; los personajes que no lo tengan
+lo tratan como desconocido ("No lo se") sin necesidad de tocar la base.
+"""
+
+import json
+import os
+
+ARCHIVO_PREGUNTAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preguntas.json")
+
+# Respaldo si el archivo no existe o no es válido
+CATALOGO_POR_DEFECTO = [
+    ("arma_aguijon", "¿El arma que utiliza es un aguijón?"),
+    ("arma_infeccion", "¿El arma que utiliza es parte de la infección?"),
+    ("rol_jefe", "¿El rol del personaje es de Jefe?"),
+    ("es_enemigo", "¿Tu personaje es un enemigo?"),
+    ("aparece_multiples", "¿Tu personaje aparece múltiples veces en el juego?"),
+]
+
+
+def leer_catalogo(ruta):
+    """Lista de (clave, pregunta) del archivo. Lanza ValueError si no es válido."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    if not isinstance(datos, list) or not datos:
+        raise ValueError("se esperaba una lista de preguntas no vacía")
+    catalogo = []
+    vistas = set()
+    for entrada in datos:
+        try:
+            clave, pregunta = entrada["clave"], entrada["pregunta"]
+        except (TypeError, KeyError):
+            raise ValueError(f"entrada inválida: {entrada!r}")
+        if not isinstance(clave, str) or not isinstance(pregunta, str) or not clave or not pregunta:
+            raise ValueError(f"entrada inválida: {entrada!r}")
+        if clave in vistas:
+            raise ValueError(f"clave repetida: {clave}")
+        vistas.add(clave)
+        catalogo.append((clave, pregunta))
+    return catalogo
+
+
+def cargar_catalogo(ruta=ARCHIVO_PREGUNTAS):
+    """
+    Devuelve (CLAVES, PREGUNTAS) como listas paralelas. Si el archivo no se
+    puede leer se usa CATALOGO_POR_DEFECTO.
+    """
+    try:
+        catalogo = leer_catalogo(ruta)
+    except (IOError, ValueError) as e:
+        print(f"Advertencia: No se pudo leer el catálogo de preguntas {ruta}. Error: {e}")
+        print("Usando las preguntas por defecto.")
+        catalogo = CATALOGO_POR_DEFECTO
+    claves = [clave for clave, _ in catalogo]
+    preguntas = [pregunta for _, pregunta in catalogo]
+    return claves, preguntas
@@ -0,0 +1,356 @@
+"""
+Formato binario compacto de la base de conocimiento (.hkb).
+
+Para bases con millones de personajes, 'json.load' crea un objeto de Python
+por cada nombre y cada "Si"/"No". Este formato se lee con mmap, sin copiar:
+
+    cabecera   | magia, versión, nº de claves, nº de personajes y los
+               | desplazamientos de cada sección (little-endian)
+    claves     | cada clave como longitud (u16) + UTF-8
+    matriz     | nº personajes x nº claves, un byte por rasgo (CODIGOS_RESPUESTA)
+    offsets    | nº personajes + 1 enteros u64 dentro de la tabla de nombres
+    nombres    | nombres en UTF-8, uno detrás de otro
+
+Uso como script:
+    python formato_binario.py a-binario [json] [hkb]
+    python formato_binario.py a-json [hkb] [json]
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+
+from catalogo import cargar_catalogo
+from motor_inferencia import (BaseBits, BaseClases, PuntuadorMatricial, CODIGOS_RESPUESTA,
+                              RESPUESTA_SI, RESPUESTA_NO, RESPUESTA_DESCONOCIDA, np)
+
+MAGIA = b"HKB1"
+VERSION = 1
+CABECERA = struct.Struct("<4sHHQQQQQ")
+VALOR_POR_CODIGO = {codigo: valor for valor, codigo in CODIGOS_RESPUESTA.items()}
+
+
+def _alinear(f):
+    # Alinea la siguiente sección a 8 bytes (para leer los u64 directamente)
+    relleno = (-f.tell()) % 8
+    f.write(b"\0" * relleno)
+    return f.tell()
+
+
+def escribir_binario(ruta, base, claves):
+    """Escribe 'base' (diccionario o Mapping) en formato binario."""
+    claves = list(claves)
+    matriz = bytearray()
+    nombres = bytearray()
+    offsets = [0]
+    for nombre, rasgos in base.items():
+        matriz += bytes(CODIGOS_RESPUESTA.get(rasgos.get(clave, RESPUESTA_DESCONOCIDA), 0)
+                        for clave in claves)
+        nombres += nombre.encode("utf-8")
+        offsets.append(len(nombres))
+
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(b"\0" * CABECERA.size)
+        off_claves = _alinear(f)
+        for clave in claves:
+            codificada = clave.encode("utf-8")
+            f.write(struct.pack("<H", len(codificada)) + codificada)
+        off_matriz = _alinear(f)
+        f.write(matriz)
+        off_offsets = _alinear(f)
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        off_nombres = _alinear(f)
+        f.write(nombres)
+
+        f.seek(0)
+        f.write(CABECERA.pack(MAGIA, VERSION, len(claves), len(offsets) - 1,
+                              off_claves, off_matriz, off_offsets, off_nombres))
+    os.replace(temporal, ruta)
+
+
+class NombresBinarios:
+    """Lista de nombres sobre el archivo mapeado; los añadidos van en memoria."""
+
+    def __init__(self, binaria):
+        self.binaria = binaria
+        self.extra = []
+
+    def __len__(self):
+        return len(self.binaria.offsets) - 1 + len(self.extra)
+
+    def __getitem__(self, i):
+        total = len(self.binaria.offsets) - 1
+        return self.binaria.nombre(i) if i < total else self.extra[i - total]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, nombre):
+        self.extra.append(nombre)
+
+
+class IndiceDiferido:
+    """Diccionario nombre -> índice que sólo se construye al consultarlo."""
+
+    def __init__(self, nombres):
+        self.nombres = nombres
+        self.datos = None
+
+    def _datos(self):
+        if self.datos is None:
+            self.datos = {nombre: i for i, nombre in enumerate(self.nombres)}
+        return self.datos
+
+    def get(self, nombre, defecto=None):
+        return self._datos().get(nombre, defecto)
+
+    def __getitem__(self, nombre):
+        return self._datos()[nombre]
+
+    def __setitem__(self, nombre, indice):
+        self._datos()[nombre] = indice
+
+    def __contains__(self, nombre):
+        return nombre in self._datos()
+
+
+class FilasBinarias:
+    """Filas de la matriz como memoryview (sin copiar); las escritas van en memoria."""
+
+    def __init__(self, binaria):
+        self.binaria = binaria
+        self.cambios = {}
+        self.extra = []
+
+    def __len__(self):
+        return len(self.binaria.offsets) - 1 + len(self.extra)
+
+    def __getitem__(self, i):
+        total = len(self.binaria.offsets) - 1
+        if i >= total:
+            return self.extra[i - total]
+        fila = self.cambios.get(i)
+        return fila if fila is not None else self.binaria.fila(i)
+
+    def __setitem__(self, i, fila):
+        total = len(self.binaria.offsets) - 1
+        if i >= total:
+            self.extra[i - total] = fila
+        else:
+            self.cambios[i] = fila
+
+    def append(self, fila):
+        self.extra.append(fila)
+
+
+class BaseBinaria(Mapping):
+    """
+    Base de conocimiento leída de un .hkb mapeado en memoria.
+    Se comporta como el diccionario de 'cargar_conocimiento' (nombre -> rasgos),
+    decodificando cada personaje sólo cuando se pide. Los personajes
+    aprendidos o sobrescritos se guardan aparte, en 'cambios'.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        vista = memoryview(self.mapa)
+
+        (magia, version, num_claves, num_personajes,
+         off_claves, off_matriz, off_offsets, off_nombres) = CABECERA.unpack_from(vista)
+        if magia != MAGIA or version != VERSION:
+            raise ValueError(f"{ruta} no es una base binaria válida")
+
+        self.claves = []
+        posicion = off_claves
+        for _ in range(num_claves):
+            (longitud,) = struct.unpack_from("<H", vista, posicion)
+            self.claves.append(bytes(vista[posicion + 2:posicion + 2 + longitud]).decode("utf-8"))
+            posicion += 2 + longitud
+
+        self.ancho = num_claves
+        self.matriz = vista[off_matriz:off_matriz + num_personajes * num_claves]
+        self.offsets = vista[off_offsets:off_offsets + 8 * (num_personajes + 1)].cast("Q")
+        self.cadenas = vista[off_nombres:]
+        self.cambios = {}
+        self._indice = None
+
+    def nombre(self, i):
+        return bytes(self.cadenas[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def fila(self, i):
+        return self.matriz[i * self.ancho:(i + 1) * self.ancho]
+
+    def _indice_nombres(self):
+        if self._indice is None:
+            self._indice = {self.nombre(i): i for i in range(len(self.offsets) - 1)}
+        return self._indice
+
+    # --- Interfaz de diccionario ---
+
+    def __getitem__(self, nombre):
+        if nombre in self.cambios:
+            return self.cambios[nombre]
+        fila = self.fila(self._indice_nombres()[nombre])
+        # Los rasgos desconocidos (código 0) no se materializan
+        return {clave: VALOR_POR_CODIGO[codigo] for clave, codigo in zip(self.claves, fila) if codigo}
+
+    def __setitem__(self, nombre, rasgos):
+        self.cambios[nombre] = rasgos
+
+    def __contains__(self, nombre):
+        return nombre in self.cambios or nombre in self._indice_nombres()
+
+    def __iter__(self):
+        for i in range(len(self.offsets) - 1):
+            yield self.nombre(i)
+        indice = self._indice_nombres() if self.cambios else {}
+        for nombre in self.cambios:
+            if nombre not in indice:
+                yield nombre
+
+    def __len__(self):
+        total = len(self.offsets) - 1
+        if not self.cambios:
+            return total
+        indice = self._indice_nombres()
+        return total + sum(1 for nombre in self.cambios if nombre not in indice)
+
+    def huella(self, claves):
+        """Huella del archivo mapeado más los cambios (sin decodificar nada)."""
+        resumen = hashlib.sha256(self.mapa)
+        resumen.update(json.dumps({"claves": list(claves), "cambios": self.cambios},
+                                  ensure_ascii=False).encode("utf-8"))
+        return resumen.hexdigest()
+
+
+def abrir_si_mas_reciente(ruta_binario, ruta_json):
+    """Devuelve la BaseBinaria si el .hkb existe y es más nuevo que el JSON; si no, None."""
+    if not os.path.exists(ruta_binario):
+        return None
+    if os.path.exists(ruta_json) and os.path.getmtime(ruta_json) > os.path.getmtime(ruta_binario):
+        return None
+    try:
+        return BaseBinaria(ruta_binario)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Advertencia: No se pudo leer la base binaria {ruta_binario}. Error: {e}")
+        return None
+
+
+# --- Construcción del motor sin decodificar la base ---
+
+def _mascara_columna(columna, codigo):
+    # Entero cuyo bit i vale 1 si la fila i tiene 'codigo' en esa columna
+    if np is not None:
+        bits = np.packbits(columna == codigo, bitorder="little")
+        return int.from_bytes(bits.tobytes(), "little")
+    tabla = bytes(0x31 if b == codigo else 0x30 for b in range(256))
+    digitos = columna.translate(tabla)[::-1]
+    return int(digitos, 2) if digitos else 0
+
+
+def crear_motor(base, claves):
+    """
+    BaseClases de la base (un bit por perfil distinto); si es binaria,
+    BaseBits con las máscaras sacadas directo de la matriz.
+    """
+    if not isinstance(base, BaseBinaria) or base.claves != list(claves):
+        return BaseClases(base, claves)
+
+    motor = BaseBits({}, claves)
+    motor.nombres = NombresBinarios(base)
+    motor.indices = IndiceDiferido(motor.nombres)
+    total = len(base.offsets) - 1
+    motor.mascara_todos = (1 << total) - 1
+    if np is not None:
+        matriz = np.frombuffer(base.matriz, dtype=np.uint8).reshape(total, base.ancho)
+    for j, clave in enumerate(motor.claves):
+        columna = matriz[:, j] if np is not None else bytes(base.matriz[j::base.ancho])
+        motor.mascara_si[clave] = _mascara_columna(columna, CODIGOS_RESPUESTA[RESPUESTA_SI])
+        motor.mascara_no[clave] = _mascara_columna(columna, CODIGOS_RESPUESTA[RESPUESTA_NO])
+        motor.mascara_desconocido[clave] = _mascara_columna(columna, CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA])
+
+    for nombre, rasgos in base.cambios.items():
+        motor.agregar(nombre, rasgos)
+    return motor
+
+
+def crear_puntuador(base, claves):
+    """PuntuadorMatricial de la base; si es binaria, usa la matriz mapeada sin copiarla."""
+    if not isinstance(base, BaseBinaria) or base.claves != list(claves):
+        return PuntuadorMatricial(base, claves)
+
+    puntuador = PuntuadorMatricial({}, claves)
+    puntuador.nombres = NombresBinarios(base)
+    puntuador.indices = IndiceDiferido(puntuador.nombres)
+    total = len(base.offsets) - 1
+    if np is not None:
+        # Vista de sólo lectura; 'agregar' la copia la primera vez que escribe
+        puntuador.matriz = np.frombuffer(base.matriz, dtype=np.int8).reshape(total, base.ancho)
+    else:
+        puntuador.matriz = FilasBinarias(base)
+
+    for nombre, rasgos in base.cambios.items():
+        puntuador.agregar(nombre, rasgos)
+    return puntuador
+
+
+# --- Conversión JSON <-> binario ---
+
+def json_a_binario(ruta_json, ruta_binario, claves=None):
+    """
+    Sin 'claves' se usan las del catálogo, en su orden: sólo con ese orden
+    el juego usa la matriz mapeada sin decodificar la base (ver 'crear_puntuador').
+    """
+    with open(ruta_json, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    if claves is None:
+        claves = claves_con_catalogo(base, cargar_catalogo()[0])
+    escribir_binario(ruta_binario, base, claves)
+    return len(base)
+
+
+def binario_a_json(ruta_binario, ruta_json):
+    binaria = BaseBinaria(ruta_binario)
+    base = {nombre: binaria[nombre] for nombre in binaria}
+    with open(ruta_json, "w", encoding="utf-8") as f:
+        json.dump(base, f, indent=4, ensure_ascii=False)
+    return len(base)
+
+
+def claves_de_base(base):
+    """Claves en el orden en que aparecen por primera vez en la base."""
+    claves = {}
+    for rasgos in base.values():
+        claves.update(dict.fromkeys(rasgos))
+    return list(claves)
+
+
+def claves_con_catalogo(base, claves_catalogo):
+    """Las claves del catálogo en su orden, seguidas de las que sólo aparecen en la base."""
+    claves = list(claves_catalogo)
+    conocidas = set(claves)
+    return claves + [clave for clave in claves_de_base(base) if clave not in conocidas]
+
+
+if __name__ == "__main__":
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    ruta_json = os.path.join(directorio, "hollow_knight_data.json")
+    ruta_binario = os.path.join(directorio, "hollow_knight_data.hkb")
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "a-binario":
+        origen = sys.argv[2] if len(sys.argv) > 2 else ruta_json
+        destino = sys.argv[3] if len(sys.argv) > 3 else ruta_binario
+        print(f"{json_a_binario(origen, destino)} personajes escritos en {destino}")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "a-json":
+        origen = sys.argv[2] if len(sys.argv) > 2 else ruta_binario
+        destino = sys.argv[3] if len(sys.argv) > 3 else ruta_json
+        print(f"{binario_a_json(origen, destino)} personajes escritos en {destino}")
+    else:
+        print("Uso: python formato_binario.py a-binario|a-json [origen] [destino]")
@@ -0,0 +1,180 @@
+"""
+Índice de nombres para detectar personajes repetidos con otra escritura.
+
+"Receptaculo Roto" y "Receptáculo Roto", o un nombre con una errata, son
+el mismo personaje para el jugador pero distintos para la base. Antes de
+aprender un nombre nuevo se buscan los parecidos:
+
+- Los nombres se normalizan: sin tildes ni diéresis, en minúsculas y con
+  los signos convertidos en espacios ('normalizar').
+- Cada nombre normalizado se parte en trigramas ("  re", " rec", "rec"...)
+  y el índice guarda, para cada trigrama, los ids de los nombres que lo
+  tienen (array('I'), 4 bytes por aparición).
+- La similitud es la de Jaccard entre conjuntos de trigramas. Para llegar a
+  'umbral' un nombre debe compartir al menos ceil(umbral * |consulta|)
+  trigramas, así que basta con mirar las listas de los trigramas menos
+  frecuentes de la consulta (filtrado por prefijo). Esas se cuentan de
+  golpe (numpy.bincount o, sin numpy, Counter) y los candidatos se
+  comprueban en las listas largas con búsqueda binaria: las de trigramas
+  comunes, como los de "personaje", nunca se recorren enteras.
+
+Los nombres idénticos tras normalizar se encuentran en un diccionario.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from motor_inferencia import np
+
+# Similitud mínima (Jaccard de trigramas) para ofrecer un nombre parecido
+UMBRAL_PARECIDO = 0.5
+# Cuántos parecidos se ofrecen como máximo
+LIMITE_PARECIDOS = 5
+# Apariciones que se cuentan de golpe por consulta (ver 'parecidos'); con
+# numpy contar es mucho más barato que comprobar candidatos uno a uno
+PRESUPUESTO_CONTEO = 100000
+PRESUPUESTO_CONTEO_NUMPY = 4000000
+
+
+def normalizar(nombre):
+    """Nombre sin tildes, en minúsculas y con un solo espacio entre palabras."""
+    descompuesto = unicodedata.normalize("NFKD", nombre)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[\W_]+", " ", sin_tildes.casefold()).split())
+
+
+def trigramas(normalizado):
+    """Trigramas de un nombre ya normalizado, con relleno al principio y al final."""
+    relleno = f"  {normalizado} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _contiene(lista, id_nombre):
+    posicion = bisect_left(lista, id_nombre)
+    return posicion < len(lista) and lista[posicion] == id_nombre
+
+
+class IndiceNombres:
+    """
+    - nombres: lista de nombres; la posición es su id.
+    - por_normalizado: nombre normalizado -> ids.
+    - listas: trigrama -> array('I') de ids (en orden creciente).
+    - tamanos: número de trigramas de cada nombre (filtro por longitud).
+    Es seguro usarlo desde varios hilos: 'construir' puede ir en segundo
+    plano y las consultas esperan a que termine.
+    """
+
+    def __init__(self):
+        self.nombres = []
+        self.ids = {}
+        self.por_normalizado = {}
+        self.listas = {}
+        self.tamanos = array("H")
+        self._candado = threading.Lock()
+        self.listo = threading.Event()
+
+    def construir(self, nombres):
+        """Añade todos los nombres (p. ej. los de la base al cargar) y marca el índice como listo."""
+        with self._candado:
+            for nombre in nombres:
+                self._agregar(nombre)
+        self.listo.set()
+
+    def agregar(self, nombre):
+        with self._candado:
+            self._agregar(nombre)
+
+    def _agregar(self, nombre):
+        if nombre in self.ids:
+            return
+        id_nombre = len(self.nombres)
+        self.nombres.append(nombre)
+        self.ids[nombre] = id_nombre
+        normalizado = normalizar(nombre)
+        self.por_normalizado.setdefault(normalizado, []).append(id_nombre)
+        propios = trigramas(normalizado)
+        self.tamanos.append(min(len(propios), 0xFFFF))
+        for trigrama in propios:
+            lista = self.listas.get(trigrama)
+            if lista is None:
+                self.listas[trigrama] = lista = array("I")
+            lista.append(id_nombre)
+
+    def parecidos(self, nombre, umbral=UMBRAL_PARECIDO, limite=LIMITE_PARECIDOS):
+        """
+        Nombres del índice parecidos a 'nombre' (sin contarlo a él), como
+        [(nombre, similitud)] de mayor a menor similitud.
+        """
+        self.listo.wait()
+        with self._candado:
+            normalizado = normalizar(nombre)
+            consulta = trigramas(normalizado)
+            encontrados = {id_nombre: 1.0 for id_nombre in self.por_normalizado.get(normalizado, ())}
+
+            # Un parecido comparte al menos 'minimo' trigramas, así que está en
+            # alguna de las len(consulta) - minimo + 1 listas más cortas. Se
+            # cuentan esas y las siguientes que quepan en el presupuesto:
+            # cuantas más se cuentan, más trigramas compartidos se le exigen
+            # a cada candidato y menos hay que comprobar en las listas largas.
+            minimo = max(1, math.ceil(umbral * len(consulta)))
+            listas = sorted((self.listas.get(trigrama, ()) for trigrama in consulta), key=len)
+            presupuesto = PRESUPUESTO_CONTEO if np is None else PRESUPUESTO_CONTEO_NUMPY
+            contadas = len(consulta) - minimo + 1
+            elementos = sum(len(lista) for lista in listas[:contadas])
+            while contadas < len(listas) and elementos + len(listas[contadas]) <= presupuesto:
+                elementos += len(listas[contadas])
+                contadas += 1
+            largas = listas[contadas:]
+            # Jaccard >= umbral exige umbral * |A| <= |B| <= |A| / umbral
+            criterio = (len(consulta), umbral, minimo - len(largas))
+            if np is not None:
+                similares = self._similares_numpy(listas[:contadas], largas, *criterio)
+            else:
+                similares = self._similares(listas[:contadas], largas, *criterio)
+            for id_nombre, similitud in similares:
+                encontrados.setdefault(id_nombre, similitud)
+
+            resultado = sorted(((self.nombres[id_nombre], similitud)
+                                for id_nombre, similitud in encontrados.items()
+                                if self.nombres[id_nombre] != nombre),
+                               key=lambda par: -par[1])
+        return resultado[:limite]
+
+    def _similares(self, cortas, largas, tamano_consulta, umbral, exigidas):
+        # Cuenta en C (Counter) y comprueba las listas largas con búsqueda binaria
+        cuenta = Counter()
+        for lista in cortas:
+            cuenta.update(lista)
+        menor, mayor = umbral * tamano_consulta, tamano_consulta / umbral
+        for id_nombre, comunes in cuenta.items():
+            tamano = self.tamanos[id_nombre]
+            if comunes < exigidas or not menor <= tamano <= mayor:
+                continue
+            comunes += sum(1 for lista in largas if _contiene(lista, id_nombre))
+            similitud = comunes / (tamano_consulta + tamano - comunes)
+            if similitud >= umbral:
+                yield id_nombre, similitud
+
+    def _similares_numpy(self, cortas, largas, tamano_consulta, umbral, exigidas):
+        # Lo mismo con bincount y searchsorted sobre las listas sin copiarlas
+        cortas = [np.frombuffer(lista, dtype=np.uint32) for lista in cortas if len(lista)]
+        if not cortas:
+            return []
+        cuenta = np.bincount(np.concatenate(cortas), minlength=len(self.nombres))
+        tamanos = np.frombuffer(self.tamanos, dtype=np.uint16)
+        ids = np.flatnonzero((cuenta >= exigidas)
+                             & (tamanos >= umbral * tamano_consulta)
+                             & (tamanos <= tamano_consulta / umbral))
+        comunes = cuenta[ids]
+        for lista in largas:
+            lista = np.frombuffer(lista, dtype=np.uint32)
+            posiciones = np.minimum(np.searchsorted(lista, ids), len(lista) - 1)
+            comunes += lista[posiciones] == ids
+        similitud = comunes / (tamano_consulta + tamanos[ids].astype(np.int64) - comunes)
+        validos = similitud >= umbral
+        return list(zip(ids[validos].tolist(), similitud[validos].tolist()))
@@ -0,0 +1,191 @@
+"""
+Índice de perfiles para buscar a los personajes más parecidos sin puntuar a todos.
+
+El puntaje de motor_inferencia.comparar_personaje es una similitud de
+Hamming ponderada: cada respuesta "Si"/"No" que no coincide con el rasgo
+resta 2 medios puntos, cada "No lo se"/"Probablemente" que no coincide
+resta 1 y las claves sin responder no cuentan. A esa resta la llamamos 'déficit'.
+
+- Los personajes se agrupan por perfil (sus códigos de rasgo empaquetados en
+  un entero, un byte por clave): con pocas claves hay muchos menos perfiles
+  que personajes.
+- Los perfiles distintos forman un BK-tree con la distancia de Hamming
+  (claves en las que difieren). Por la desigualdad triangular, un subárbol
+  a distancia e de un nodo que está a distancia d de la consulta no puede
+  tener un déficit menor que |d - e| - (claves sin responder), y se poda.
+
+El ganador es el mismo que el de PuntuadorMatricial.mejores: mayor puntaje
+y, en empate, la fila más baja. El índice se construye la primera vez que
+se consulta y luego se mantiene al aprender.
+"""
+
+from bisect import insort
+
+from motor_inferencia import CODIGOS_RESPUESTA, RESPUESTA_SI, RESPUESTA_NO, codificar_rasgos, np
+
+# Personajes a partir de los cuales el índice gana a la fuerza bruta con las
+# claves del juego (ver 'python benchmark_motor.py --vecinos')
+UMBRAL_INDICE = 10000
+
+_CODIGOS_FIRMES = (CODIGOS_RESPUESTA[RESPUESTA_SI], CODIGOS_RESPUESTA[RESPUESTA_NO])
+
+
+def empaquetar(codigos):
+    """Códigos de rasgo (bytes, uno por clave) como entero; la clave j es el byte j."""
+    return int.from_bytes(codigos, "little")
+
+
+class IndicePerfiles:
+    """
+    BK-tree de perfiles sobre la matriz de un PuntuadorMatricial.
+    Nodos en listas paralelas, como ArbolDecision:
+    - perfiles_nodo: perfil empaquetado del nodo.
+    - hijos: {distancia: nodo hijo}.
+    filas_de_perfil guarda las filas de cada perfil en orden ascendente;
+    un perfil que se queda sin filas (al sobrescribir) conserva su nodo.
+    """
+
+    def __init__(self, puntuador):
+        self.puntuador = puntuador
+        self.num_claves = len(puntuador.claves)
+        # Un 1 en el bit bajo de cada byte: marca las claves que difieren
+        self.bits_bajos = int.from_bytes(b"\x01" * self.num_claves, "little")
+        self.perfiles_nodo = []
+        self.hijos = []
+        self.filas_de_perfil = {}
+        self.perfil_de_fila = []
+        self.construido = False
+        # Perfiles evaluados en la última búsqueda (para instrumentación)
+        self.visitados = 0
+
+    # --- Construcción y actualización ---
+
+    def _construir(self):
+        total = len(self.puntuador.nombres)
+        ancho = self.num_claves
+        matriz = self.puntuador.matriz
+        if np is not None:
+            datos = matriz[:total].tobytes()
+            filas = (datos[i * ancho:(i + 1) * ancho] for i in range(total))
+        else:
+            # Lista de filas o FilasBinarias (base .hkb), que no admite cortes
+            filas = (matriz[i] for i in range(total))
+        for fila, codigos in enumerate(filas):
+            self._insertar(fila, empaquetar(codigos))
+        self.construido = True
+
+    def _insertar(self, fila, perfil):
+        self.perfil_de_fila.append(perfil)
+        filas = self.filas_de_perfil.get(perfil)
+        if filas is None:
+            self.filas_de_perfil[perfil] = [fila]
+            self._nuevo_nodo(perfil)
+        else:
+            insort(filas, fila)
+
+    def _nuevo_nodo(self, perfil):
+        nodo = len(self.perfiles_nodo)
+        self.perfiles_nodo.append(perfil)
+        self.hijos.append({})
+        if nodo == 0:
+            return
+        actual = 0
+        while True:
+            distancia = self.distancia(self.perfiles_nodo[actual], perfil)
+            hijo = self.hijos[actual].get(distancia)
+            if hijo is None:
+                self.hijos[actual][distancia] = nodo
+                return
+            actual = hijo
+
+    def agregar(self, fila, rasgos):
+        """Tras 'puntuador.agregar': inserta la fila nueva o mueve la sobrescrita."""
+        if not self.construido:
+            # Se leerá de la matriz al construir
+            return
+        perfil = empaquetar(codificar_rasgos(rasgos, self.puntuador.claves))
+        if fila < len(self.perfil_de_fila):
+            anterior = self.perfil_de_fila[fila]
+            if anterior == perfil:
+                return
+            self.filas_de_perfil[anterior].remove(fila)
+            self.perfil_de_fila[fila] = perfil
+            filas = self.filas_de_perfil.get(perfil)
+            if filas is None:
+                self.filas_de_perfil[perfil] = [fila]
+                self._nuevo_nodo(perfil)
+            else:
+                insort(filas, fila)
+            return
+        self._insertar(fila, perfil)
+
+    # --- Distancias ---
+
+    def distintas(self, a, b):
+        """Bits bajos de los bytes (claves) en los que difieren dos perfiles."""
+        diferencia = a ^ b
+        # Los códigos ocupan 2 bits: un byte difiere si difiere alguno de ellos
+        return (diferencia | (diferencia >> 1)) & self.bits_bajos
+
+    def distancia(self, a, b):
+        return self.distintas(a, b).bit_count()
+
+    # --- Búsqueda ---
+
+    def _consulta(self, respuestas):
+        # (perfil de la consulta, claves respondidas, claves con "Si"/"No")
+        consulta = respondidas = firmes = 0
+        for clave, respuesta in respuestas.items():
+            j = self.puntuador.columnas[clave]
+            codigo = CODIGOS_RESPUESTA[respuesta]
+            consulta |= codigo << (8 * j)
+            respondidas |= 1 << (8 * j)
+            if codigo in _CODIGOS_FIRMES:
+                firmes |= 1 << (8 * j)
+        return consulta, respondidas, firmes
+
+    def mejores(self, respuestas, k=1, compatibles=False):
+        """
+        Los k mejores (nombre, puntaje), igual que PuntuadorMatricial.mejores.
+        Con compatibles=True sólo cuentan los personajes que sobreviven a las
+        respuestas "Si"/"No" (los candidatos de BaseBits tras filtrar).
+        """
+        if not respuestas:
+            return []
+        if not self.construido:
+            self._construir()
+        consulta, respondidas, firmes = self._consulta(respuestas)
+        libres = self.num_claves - len(respuestas)
+        divisor = 2 * len(respuestas)
+
+        # (déficit, fila) de los k mejores hasta ahora, ordenados
+        encontrados = []
+        umbral = divisor + 1
+        self.visitados = 0
+        pila = [0] if self.perfiles_nodo else []
+        while pila:
+            nodo = pila.pop()
+            perfil = self.perfiles_nodo[nodo]
+            distintas = self.distintas(consulta, perfil)
+            filas = self.filas_de_perfil[perfil]
+            self.visitados += 1
+
+            if filas:
+                conocidos = (perfil | (perfil >> 1)) & self.bits_bajos
+                if not (compatibles and distintas & conocidos & firmes):
+                    deficit = (distintas & respondidas).bit_count() + (distintas & firmes).bit_count()
+                    if deficit <= umbral:
+                        for fila in filas[:k]:
+                            insort(encontrados, (deficit, fila))
+                        del encontrados[k:]
+                        if len(encontrados) == k:
+                            umbral = encontrados[-1][0]
+
+            # Déficit >= distancia en las claves respondidas >= |d - e| - libres
+            distancia = distintas.bit_count()
+            for arista, hijo in self.hijos[nodo].items():
+                if abs(distancia - arista) - libres <= umbral:
+                    pila.append(hijo)
+
+        nombres = self.puntuador.nombres
+        return [(nombres[fila], (divisor - deficit) / divisor) for deficit, fila in encontrados]
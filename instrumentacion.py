@@ -0,0 +1,247 @@
+"""
+Instrumentación opcional del motor (tiempos y contadores por fase).
+
+Se activa con la variable de entorno HK_TRAZA, cuyo valor es la ruta del
+archivo de salida (JSON por líneas):
+    HK_TRAZA=traza.jsonl python Adivina_Quien_Hollow_Knight.py
+
+Fases registradas:
+- carga: lectura de la base y construcción del motor.
+- pregunta: elección de la siguiente pregunta.
+- respuesta: aplicación de una respuesta (con los candidatos eliminados).
+- decision: cálculo del resultado al final de la partida.
+- puntuacion: puntuación de los candidatos ambiguos (con cuántos eran, o
+  cuántos perfiles visitó el índice).
+- guardar / diario / compactar: persistencia (con los bytes escritos).
+
+Cada partida se escribe como una línea {"tipo": "sesion", "eventos": [...]}
+al pedir su resultado, y al salir del programa se añade una línea
+{"tipo": "histogramas", ...} con los tiempos agregados por fase en cubetas
+de potencias de dos (microsegundos).
+
+Desactivada no cuesta nada en el motor: 'instrumentar_juego' e
+'instrumentar_diario' no hacen nada y 'medir' devuelve un objeto vacío.
+"""
+
+import atexit
+import json
+import os
+import time
+
+RUTA_TRAZA = os.environ.get("HK_TRAZA")
+
+
+class _MedicionNula:
+    """Lo que devuelve 'medir' con la instrumentación apagada."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def anotar(self, **datos):
+        pass
+
+
+_NULA = _MedicionNula()
+
+
+class Medicion:
+    """Contexto que mide una fase; 'anotar' añade contadores al evento."""
+
+    def __init__(self, registro, fase, clave_sesion, datos):
+        self.registro = registro
+        self.fase = fase
+        self.clave_sesion = clave_sesion
+        self.datos = datos
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.registro.evento(self.fase, time.perf_counter() - self.inicio,
+                             self.clave_sesion, **self.datos)
+        return False
+
+    def anotar(self, **datos):
+        self.datos.update(datos)
+
+
+class Registro:
+    """
+    Eventos de las partidas en curso y histogramas agregados.
+    - sesiones: clave de sesión (la Partida) -> lista de eventos.
+    - histogramas: fase -> {"n", "total_s", "sumas", "cubetas": {potencia: cuenta}};
+      'sumas' acumula los contadores numéricos (bytes, eliminados...).
+    Los eventos sin sesión (carga, guardado) sólo van a los histogramas.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.sesiones = {}
+        self.histogramas = {}
+        self.sesion_actual = None
+        self.num_sesiones = 0
+
+    def medir(self, fase, clave_sesion=None, **datos):
+        return Medicion(self, fase, clave_sesion, datos)
+
+    def evento(self, fase, segundos, clave_sesion=None, **datos):
+        histograma = self.histogramas.setdefault(fase, {"n": 0, "total_s": 0.0, "sumas": {}, "cubetas": {}})
+        histograma["n"] += 1
+        histograma["total_s"] += segundos
+        for nombre, valor in datos.items():
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                histograma["sumas"][nombre] = histograma["sumas"].get(nombre, 0) + valor
+        # Cubeta k: hasta 2^k microsegundos
+        cubeta = int(segundos * 1e6).bit_length()
+        histograma["cubetas"][cubeta] = histograma["cubetas"].get(cubeta, 0) + 1
+
+        if clave_sesion is None:
+            clave_sesion = self.sesion_actual
+        if clave_sesion is not None:
+            self.sesiones.setdefault(clave_sesion, []).append(
+                {"fase": fase, "us": round(segundos * 1e6, 1), **datos})
+
+    def terminar_sesion(self, clave_sesion, **resumen):
+        eventos = self.sesiones.pop(clave_sesion, [])
+        self.num_sesiones += 1
+        self._escribir({"tipo": "sesion", "numero": self.num_sesiones, **resumen, "eventos": eventos})
+
+    def exportar(self):
+        """Vuelca las sesiones sin terminar y los histogramas."""
+        for clave_sesion in list(self.sesiones):
+            self.terminar_sesion(clave_sesion, incompleta=True)
+        histogramas = {
+            fase: {"n": datos["n"], "total_s": datos["total_s"], "sumas": datos["sumas"],
+                   "cubetas_us": {f"<={1 << cubeta}": cuenta
+                                  for cubeta, cuenta in sorted(datos["cubetas"].items())}}
+            for fase, datos in self.histogramas.items()
+        }
+        self._escribir({"tipo": "histogramas", "fases": histogramas})
+
+    def _escribir(self, linea):
+        try:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps(linea, ensure_ascii=False) + "\n")
+        except IOError as e:
+            print(f"Advertencia: No se pudo escribir la traza en {self.ruta}. Error: {e}")
+
+
+REGISTRO = Registro(RUTA_TRAZA) if RUTA_TRAZA else None
+if REGISTRO is not None:
+    atexit.register(REGISTRO.exportar)
+
+
+def medir(fase, **datos):
+    """Contexto para medir una fase fuera del motor (carga, guardado...)."""
+    if REGISTRO is None:
+        return _NULA
+    return REGISTRO.medir(fase, **datos)
+
+
+def instrumentar_juego(juego, registro=None):
+    """
+    Envuelve los métodos públicos de un MotorJuego para registrar cada fase.
+    Sin instrumentación activa deja el objeto intacto.
+    """
+    registro = registro or REGISTRO
+    if registro is None:
+        return juego
+
+    pregunta_actual = juego.pregunta_actual
+    responder = juego.responder
+    resultado = juego.resultado
+    num_posibles = juego.num_posibles
+
+    def pregunta_instrumentada(partida=None):
+        partida = partida or juego.partida
+        with registro.medir("pregunta", partida) as medicion:
+            clave = pregunta_actual(partida)
+            medicion.anotar(clave=clave)
+        return clave
+
+    def responder_instrumentado(respuesta, partida=None):
+        partida = partida or juego.partida
+        clave = partida.clave_actual
+        antes = num_posibles(partida)
+        inicio = time.perf_counter()
+        fallo = responder(respuesta, partida)
+        segundos = time.perf_counter() - inicio
+        registro.evento("respuesta", segundos, partida, clave=clave, respuesta=respuesta,
+                        eliminados=antes - num_posibles(partida), fallo_logico=fallo)
+        return fallo
+
+    def resultado_instrumentado(partida=None):
+        partida = partida or juego.partida
+        # La puntuación que ocurra dentro se atribuye a esta partida
+        registro.sesion_actual = partida
+        try:
+            with registro.medir("decision", partida, candidatos=num_posibles(partida)):
+                nombre, puntaje = resultado(partida)
+        finally:
+            registro.sesion_actual = None
+        registro.terminar_sesion(partida, nombre=nombre, puntaje=puntaje,
+                                 respuestas=len(partida.respuestas))
+        return nombre, puntaje
+
+    juego.pregunta_actual = pregunta_instrumentada
+    juego.responder = responder_instrumentado
+    juego.resultado = resultado_instrumentado
+
+    if juego.puntuador is not None:
+        mejores = juego.puntuador.mejores
+
+        def mejores_instrumentado(respuestas, nombres=None, k=1):
+            total = len(juego.puntuador.nombres) if nombres is None else len(nombres)
+            with registro.medir("puntuacion", candidatos=total):
+                return mejores(respuestas, nombres, k)
+
+        juego.puntuador.mejores = mejores_instrumentado
+
+    if juego.indice is not None:
+        mejores_indice = juego.indice.mejores
+
+        def mejores_indice_instrumentado(respuestas, k=1, compatibles=False):
+            with registro.medir("puntuacion", indice=True) as medicion:
+                resultado = mejores_indice(respuestas, k, compatibles)
+                medicion.anotar(perfiles_visitados=juego.indice.visitados)
+            return resultado
+
+        juego.indice.mejores = mejores_indice_instrumentado
+    return juego
+
+
+def instrumentar_diario(diario, registro=None):
+    """Envuelve 'registrar_varios' (y con ello 'registrar') y 'compactar' de un DiarioConocimiento (bytes escritos)."""
+    registro = registro or REGISTRO
+    if registro is None:
+        return diario
+
+    registrar_varios = diario.registrar_varios
+    compactar = diario.compactar
+
+    def tamano(ruta):
+        return os.path.getsize(ruta) if os.path.exists(ruta) else 0
+
+    def registrar_instrumentado(cambios):
+        antes = tamano(diario.ruta_diario)
+        inicio = time.perf_counter()
+        registrar_varios(cambios)
+        registro.evento("diario", time.perf_counter() - inicio, personajes=len(cambios),
+                        bytes=tamano(diario.ruta_diario) - antes)
+
+    def compactar_instrumentado(base=None):
+        inicio = time.perf_counter()
+        compactado = compactar(base)
+        registro.evento("compactar", time.perf_counter() - inicio, compactado=compactado,
+                        personajes=len(base) if base is not None else None,
+                        bytes=tamano(diario.ruta_instantanea))
+        return compactado
+
+    diario.registrar_varios = registrar_instrumentado
+    diario.compactar = compactar_instrumentado
+    return diario
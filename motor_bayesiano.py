@@ -0,0 +1,194 @@
+"""
+Modo probabilístico del motor (evidencia blanda en espacio logarítmico).
+
+En lugar de descartar candidatos sólo con "Si"/"No" y puntuar al final,
+cada partida guarda el logaritmo de la probabilidad de cada personaje y lo
+actualiza tras cada respuesta sumando log P(respuesta | rasgo). Así
+"Probablemente" y "No lo se" también aportan información, y una respuesta
+equivocada baja a un personaje en vez de eliminarlo.
+
+- Las verosimilitudes P(respuesta | rasgo) son configurables; el rasgo
+  puede ser "Si", "No", "Probablemente" o desconocido ("No lo se" o ausente).
+- Cada actualización recorre una vez a los candidatos y en la misma pasada
+  deja calculados el líder y el total, así que consultar el líder y la
+  confianza (probabilidad del líder) es O(1).
+- MotorJuego puede terminar la partida en cuanto la confianza supera un
+  umbral, sin recorrer todas las preguntas.
+
+Usa la matriz de códigos de PuntuadorMatricial (una fila por personaje),
+así que los personajes aprendidos durante la partida se incorporan solos
+(uno sobrescrito conserva la evidencia que ya se le había sumado).
+"""
+
+import math
+
+from motor_inferencia import (CODIGOS_RESPUESTA, OPCIONES_RESPUESTA, RESPUESTA_SI, RESPUESTA_NO,
+                              RESPUESTA_DESCONOCIDA, RESPUESTA_PROBABLE, np)
+
+# Confianza a partir de la cual se deja de preguntar
+UMBRAL_CONFIANZA = 0.95
+
+# P(respuesta | rasgo del personaje); cada rasgo suma 1 entre las cuatro respuestas
+VEROSIMILITUDES_POR_DEFECTO = {
+    (RESPUESTA_SI, RESPUESTA_SI): 0.80,
+    (RESPUESTA_PROBABLE, RESPUESTA_SI): 0.12,
+    (RESPUESTA_DESCONOCIDA, RESPUESTA_SI): 0.05,
+    (RESPUESTA_NO, RESPUESTA_SI): 0.03,
+
+    (RESPUESTA_NO, RESPUESTA_NO): 0.85,
+    (RESPUESTA_DESCONOCIDA, RESPUESTA_NO): 0.07,
+    (RESPUESTA_PROBABLE, RESPUESTA_NO): 0.05,
+    (RESPUESTA_SI, RESPUESTA_NO): 0.03,
+
+    (RESPUESTA_SI, RESPUESTA_PROBABLE): 0.40,
+    (RESPUESTA_PROBABLE, RESPUESTA_PROBABLE): 0.30,
+    (RESPUESTA_DESCONOCIDA, RESPUESTA_PROBABLE): 0.20,
+    (RESPUESTA_NO, RESPUESTA_PROBABLE): 0.10,
+
+    (RESPUESTA_SI, RESPUESTA_DESCONOCIDA): 0.30,
+    (RESPUESTA_NO, RESPUESTA_DESCONOCIDA): 0.30,
+    (RESPUESTA_PROBABLE, RESPUESTA_DESCONOCIDA): 0.20,
+    (RESPUESTA_DESCONOCIDA, RESPUESTA_DESCONOCIDA): 0.20,
+}
+
+
+def tabla_logaritmica(verosimilitudes):
+    """
+    Convierte {(respuesta, rasgo): probabilidad} en una tabla
+    respuesta -> [log P por código de rasgo]. Las parejas que falten se
+    toman de VEROSIMILITUDES_POR_DEFECTO.
+    """
+    completas = dict(VEROSIMILITUDES_POR_DEFECTO)
+    completas.update(verosimilitudes or {})
+    tabla = {}
+    for respuesta in OPCIONES_RESPUESTA:
+        fila = [0.0] * len(CODIGOS_RESPUESTA)
+        for rasgo, codigo in CODIGOS_RESPUESTA.items():
+            probabilidad = completas[(respuesta, rasgo)]
+            if not 0 < probabilidad <= 1:
+                raise ValueError(f"verosimilitud fuera de (0, 1] para {respuesta!r} / {rasgo!r}: {probabilidad}")
+            fila[codigo] = math.log(probabilidad)
+        tabla[respuesta] = fila
+    return tabla
+
+
+class Posterior:
+    """
+    Estado probabilístico de una partida.
+    - logp: log-probabilidad (sin normalizar) de cada fila del puntuador.
+    - lider: fila con mayor logp (en empate, la primera).
+    - log_total: log de la suma de exp(logp), para normalizar.
+    - log_prior: logp inicial de un personaje en la escala actual (cambia al
+      renormalizar); lo reciben los personajes aprendidos a mitad de partida.
+    """
+
+    __slots__ = ("logp", "lider", "log_total", "log_prior")
+
+    def __init__(self, logp, lider, log_total):
+        self.logp = logp
+        self.lider = lider
+        self.log_total = log_total
+        self.log_prior = 0.0
+
+    def confianza(self):
+        if self.lider is None:
+            return 0.0
+        return math.exp(self.logp[self.lider] - self.log_total)
+
+
+class MotorBayesiano:
+    """
+    Actualiza los Posterior de las partidas sobre la matriz de un PuntuadorMatricial.
+    Parte de una distribución uniforme entre todos los personajes.
+    """
+
+    def __init__(self, puntuador, verosimilitudes=None):
+        self.puntuador = puntuador
+        self.tabla = tabla_logaritmica(verosimilitudes)
+        if np is not None:
+            self.tabla_np = {respuesta: np.asarray(fila) for respuesta, fila in self.tabla.items()}
+
+    def nueva(self):
+        total = len(self.puntuador.nombres)
+        logp = np.zeros(total) if np is not None else [0.0] * total
+        return Posterior(logp, 0 if total else None, math.log(total) if total else -math.inf)
+
+    def actualizar(self, posterior, clave, respuesta, respuestas_previas=None):
+        """
+        Suma log P(respuesta | rasgo) a cada personaje y recalcula líder y total.
+        'respuestas_previas' (las de la partida antes de esta) sirve para
+        incorporar a los personajes aprendidos después de crear el Posterior.
+        """
+        self._incorporar_nuevos(posterior, respuestas_previas or {})
+        total = len(posterior.logp)
+        if total == 0:
+            return
+        columna = self.puntuador.columnas.get(clave)
+
+        if np is not None:
+            if columna is None:
+                # Clave que ningún personaje tiene: todos con rasgo desconocido
+                posterior.logp += self.tabla[respuesta][CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA]]
+            else:
+                codigos = self.puntuador.matriz[:total, columna]
+                posterior.logp += self.tabla_np[respuesta][codigos]
+            lider = int(np.argmax(posterior.logp))
+            maximo = posterior.logp[lider]
+            # Se renormaliza para que los valores no se alejen de cero
+            desplazamiento = maximo + math.log(float(np.exp(posterior.logp - maximo).sum()))
+            posterior.logp -= desplazamiento
+            posterior.log_prior -= desplazamiento
+            posterior.lider = lider
+            posterior.log_total = 0.0
+            return
+
+        # Python puro: una sola pasada con máximo y log-suma-exp en línea
+        pesos = self.tabla[respuesta]
+        desconocido = CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA]
+        logp = posterior.logp
+        matriz = self.puntuador.matriz
+        lider, maximo, suma = 0, -math.inf, 0.0
+        for fila in range(total):
+            valor = logp[fila] + pesos[matriz[fila][columna] if columna is not None else desconocido]
+            logp[fila] = valor
+            if valor > maximo:
+                suma = suma * math.exp(maximo - valor) + 1.0
+                lider, maximo = fila, valor
+            else:
+                suma += math.exp(valor - maximo)
+        posterior.lider = lider
+        posterior.log_total = maximo + math.log(suma)
+
+    def _incorporar_nuevos(self, posterior, respuestas_previas):
+        total = len(self.puntuador.nombres)
+        actuales = len(posterior.logp)
+        if actuales >= total:
+            return
+        # Cada nuevo empieza con el mismo prior que los demás más la
+        # evidencia de las respuestas ya dadas
+        nuevos = []
+        for fila in range(actuales, total):
+            valor = posterior.log_prior
+            for clave, respuesta in respuestas_previas.items():
+                columna = self.puntuador.columnas.get(clave)
+                codigo = (self.puntuador.matriz[fila][columna] if columna is not None
+                          else CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA])
+                valor += self.tabla[respuesta][int(codigo)]
+            nuevos.append(valor)
+        if np is not None:
+            posterior.logp = np.concatenate([posterior.logp, nuevos])
+        else:
+            posterior.logp.extend(nuevos)
+        # Se suman al total y se revisa el líder sin recorrer a los demás
+        maximo = max(posterior.log_total, max(nuevos))
+        posterior.log_total = maximo + math.log(math.exp(posterior.log_total - maximo)
+                                                + sum(math.exp(v - maximo) for v in nuevos))
+        mejor = max(range(len(nuevos)), key=lambda i: nuevos[i])
+        if posterior.lider is None or nuevos[mejor] > posterior.logp[posterior.lider]:
+            posterior.lider = actuales + mejor
+
+    def lider(self, posterior):
+        """(nombre, confianza) del personaje más probable, o (None, 0.0)."""
+        if posterior.lider is None:
+            return None, 0.0
+        return self.puntuador.nombres[posterior.lider], posterior.confianza()
@@ -0,0 +1,431 @@
+"""
+Motor de inferencia del juego, independiente de la interfaz gráfica.
+
+Codifica la base de conocimiento como conjuntos de bits (enteros de Python):
+para cada clave se guarda una máscara con los personajes que tienen "Si",
+otra con los que tienen "No" y otra con los que tienen el rasgo desconocido
+("No lo se" o la clave ausente). El bit i corresponde al personaje i.
+
+Las máscaras son un índice invertido (clave, valor) -> personajes: se
+construyen una sola vez al cargar y se mantienen al aprender. Aplicar una
+respuesta Si/No sobre los candidatos es un único AND entre enteros, y los
+nombres sólo se decodifican cuando la pantalla de resultado los necesita.
+BaseClases hace lo mismo con un bit por perfil distinto en lugar de uno
+por personaje: los personajes idénticos se eliminan y cuentan de una vez.
+
+Para el caso ambiguo (varios candidatos al final) PuntuadorMatricial guarda
+la base como una matriz densa int8 (personajes x claves) y puntúa todas las
+filas de una sola pasada. Usa NumPy si está instalado; si no, recurre a un
+bucle equivalente en Python puro.
+"""
+
+from bisect import insort
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy es opcional: sin él se usa la ruta en Python puro
+    np = None
+
+RESPUESTA_SI = "Si"
+RESPUESTA_NO = "No"
+RESPUESTA_DESCONOCIDA = "No lo se"
+RESPUESTA_PROBABLE = "Probablemente"
+
+OPCIONES_RESPUESTA = [RESPUESTA_SI, RESPUESTA_NO, RESPUESTA_DESCONOCIDA, RESPUESTA_PROBABLE]
+
+
+def rasgos_conocidos(rasgos):
+    """
+    Copia de 'rasgos' sin los "No lo se". Una clave ausente ya significa
+    rasgo desconocido, así que cada personaje sólo guarda lo que se sabe de él.
+    """
+    return {clave: valor for clave, valor in rasgos.items() if valor != RESPUESTA_DESCONOCIDA}
+
+
+def elegir_clave_por_conteos(claves, preguntadas, conteos):
+    """
+    Elige la clave no preguntada que deja, en promedio, menos candidatos
+    vivos tras responder Si o No. 'conteos(clave)' devuelve cuántos
+    candidatos tienen "Si", "No" y rasgo desconocido en esa clave.
+    - Con una respuesta Si quedan los "Si" y los desconocidos; con No,
+      los "No" y los desconocidos.
+    - Cada rama se pondera por su frecuencia entre los candidatos.
+    Si ninguna clave divide a los candidatos (p. ej. tras un fallo lógico)
+    se devuelve la primera no preguntada, en el orden de 'claves'.
+    """
+    mejor_clave = None
+    mejor_esperado = None
+    primera_libre = None
+
+    for clave in claves:
+        if clave in preguntadas:
+            continue
+        if primera_libre is None:
+            primera_libre = clave
+
+        con_si, con_no, desconocidos = conteos(clave)
+        if con_si == 0 or con_no == 0:
+            # La pregunta no separa a nadie (o sólo puede vaciar el conjunto)
+            continue
+        esperado = (con_si * (con_si + desconocidos) + con_no * (con_no + desconocidos)) / (con_si + con_no)
+
+        if mejor_esperado is None or esperado < mejor_esperado:
+            mejor_clave = clave
+            mejor_esperado = esperado
+
+    return mejor_clave if mejor_clave is not None else primera_libre
+
+
+# Códigos de un byte para cada valor de rasgo/respuesta en la matriz
+CODIGOS_RESPUESTA = {
+    RESPUESTA_DESCONOCIDA: 0,
+    RESPUESTA_SI: 1,
+    RESPUESTA_NO: 2,
+    RESPUESTA_PROBABLE: 3,
+}
+
+
+def codificar_rasgos(rasgos, claves):
+    """Rasgos como bytes (un código por clave, en el orden de 'claves')."""
+    return bytes(CODIGOS_RESPUESTA.get(rasgos.get(clave, RESPUESTA_DESCONOCIDA), 0) for clave in claves)
+
+
+class BaseBits:
+    """
+    Representación de la base de conocimiento como máscaras de bits.
+    - nombres: lista de personajes; la posición es el índice de su bit.
+    - mascara_si / mascara_no / mascara_desconocido: un entero por clave.
+    - mascara_todos: máscara con todos los personajes (inicio de partida).
+    Los personajes nuevos se acumulan y se vuelcan en las máscaras de una
+    sola vez cuando hacen falta: cargar N personajes cuesta una pasada por
+    clave en lugar de N reescrituras de enteros de N bits.
+    """
+
+    def __init__(self, base, claves):
+        self.claves = list(claves)
+        self.nombres = []
+        self.indices = {}
+        self.mascara_si = {clave: 0 for clave in self.claves}
+        self.mascara_no = {clave: 0 for clave in self.claves}
+        self.mascara_desconocido = {clave: 0 for clave in self.claves}
+        self._todos = 0
+        # (indice, códigos de sus rasgos) de personajes nuevos aún no volcados
+        # en las máscaras; se guardan codificados para no retener sus diccionarios
+        self._pendientes = []
+
+        for nombre, rasgos in base.items():
+            self.agregar(nombre, rasgos)
+
+    @property
+    def mascara_todos(self):
+        self._consolidar()
+        return self._todos
+
+    @mascara_todos.setter
+    def mascara_todos(self, mascara):
+        self._consolidar()
+        self._todos = mascara
+
+    def _consolidar(self):
+        """Vuelca los personajes pendientes en las máscaras, una pasada por clave."""
+        if not self._pendientes:
+            return
+        pendientes, self._pendientes = self._pendientes, []
+        # Los pendientes llegan en orden de índice: el último es el mayor
+        tam = pendientes[-1][0] // 8 + 1
+
+        todos = bytearray(tam)
+        for indice, _ in pendientes:
+            todos[indice >> 3] |= 1 << (indice & 7)
+        self._todos |= int.from_bytes(todos, "little")
+
+        for j, clave in enumerate(self.claves):
+            si, no, desconocido = bytearray(tam), bytearray(tam), bytearray(tam)
+            # "Probablemente" no entra en ninguna máscara (ver 'agregar')
+            destinos = {CODIGOS_RESPUESTA[RESPUESTA_SI]: si, CODIGOS_RESPUESTA[RESPUESTA_NO]: no,
+                        CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA]: desconocido}
+            for indice, codigos in pendientes:
+                destino = destinos.get(codigos[j])
+                if destino is not None:
+                    destino[indice >> 3] |= 1 << (indice & 7)
+            self.mascara_si[clave] |= int.from_bytes(si, "little")
+            self.mascara_no[clave] |= int.from_bytes(no, "little")
+            self.mascara_desconocido[clave] |= int.from_bytes(desconocido, "little")
+
+    def agregar(self, nombre, rasgos):
+        indice = self.indices.get(nombre)
+        if indice is None:
+            indice = len(self.nombres)
+            self.nombres.append(nombre)
+            self.indices[nombre] = indice
+            self._pendientes.append((indice, codificar_rasgos(rasgos, self.claves)))
+            return
+
+        # Si el personaje ya existe se reutiliza su bit (sobrescritura)
+        self._consolidar()
+        bit = 1 << indice
+
+        for clave in self.claves:
+            # Limpia el bit antes de volver a codificar el rasgo
+            self.mascara_si[clave] &= ~bit
+            self.mascara_no[clave] &= ~bit
+            self.mascara_desconocido[clave] &= ~bit
+
+            rasgo = rasgos.get(clave, RESPUESTA_DESCONOCIDA)
+            if rasgo == RESPUESTA_SI:
+                self.mascara_si[clave] |= bit
+            elif rasgo == RESPUESTA_NO:
+                self.mascara_no[clave] |= bit
+            elif rasgo == RESPUESTA_DESCONOCIDA:
+                self.mascara_desconocido[clave] |= bit
+            # "Probablemente" no entra en ninguna máscara: cualquier
+            # respuesta definitiva lo contradice (igual que el motor original).
+
+    def filtrar(self, mascara, clave, respuesta):
+        """Aplica Modus Ponens: conserva los personajes compatibles con la respuesta."""
+        self._consolidar()
+        if respuesta == RESPUESTA_SI:
+            return mascara & (self.mascara_si[clave] | self.mascara_desconocido[clave])
+        if respuesta == RESPUESTA_NO:
+            return mascara & (self.mascara_no[clave] | self.mascara_desconocido[clave])
+        return mascara
+
+    def elegir_clave(self, mascara, preguntadas):
+        """
+        Elige la siguiente clave a preguntar (ver 'elegir_clave_por_conteos').
+        Devuelve None cuando ya se preguntaron todas.
+        """
+        self._consolidar()
+        def conteos(clave):
+            return (self.contar(mascara & self.mascara_si[clave]),
+                    self.contar(mascara & self.mascara_no[clave]),
+                    self.contar(mascara & self.mascara_desconocido[clave]))
+
+        return elegir_clave_por_conteos(self.claves, preguntadas, conteos)
+
+    @staticmethod
+    def contar(mascara):
+        return mascara.bit_count()
+
+    def decodificar(self, mascara):
+        """Devuelve los nombres de los personajes presentes en la máscara."""
+        nombres = []
+        while mascara:
+            bit_bajo = mascara & -mascara
+            nombres.append(self.nombres[bit_bajo.bit_length() - 1])
+            mascara ^= bit_bajo
+        return nombres
+
+
+class BaseClases(BaseBits):
+    """
+    BaseBits por clases de equivalencia: cada bit es un perfil distinto
+    (los mismos códigos en todas las claves), no un personaje. Los
+    personajes con el mismo perfil no se pueden distinguir con ninguna
+    pregunta, así que se eliminan y cuentan juntos y sólo se expanden a
+    nombres en 'decodificar'.
+    - nombres / indices: personajes en orden de llegada, como en BaseBits.
+    - perfiles: perfil (bytes codificados) de cada clase; clase_de_perfil, al revés.
+    - miembros: índices de los personajes de cada clase, en orden ascendente.
+    - planos: el bit de la clase está en planos[b] si su tamaño tiene el bit
+      b; así 'contar' es una suma de unos pocos bit_count.
+    Una clase que se queda vacía al sobrescribir sale de mascara_todos y su
+    bit se reutiliza si el perfil vuelve a aparecer.
+    """
+
+    def __init__(self, base, claves):
+        self.perfiles = []
+        self.clase_de_perfil = {}
+        self.miembros = []
+        self.clase_de = []
+        self.planos = []
+        super().__init__(base, claves)
+
+    def agregar(self, nombre, rasgos):
+        perfil = codificar_rasgos(rasgos, self.claves)
+        indice = self.indices.get(nombre)
+        if indice is None:
+            indice = len(self.nombres)
+            self.nombres.append(nombre)
+            self.indices[nombre] = indice
+            self.clase_de.append(None)
+        else:
+            anterior = self.clase_de[indice]
+            if self.perfiles[anterior] == perfil:
+                return
+            self.miembros[anterior].remove(indice)
+            self._cambiar_tamano(anterior, len(self.miembros[anterior]) + 1)
+            if not self.miembros[anterior]:
+                self._consolidar()
+                self._todos &= ~(1 << anterior)
+
+        clase = self.clase_de_perfil.get(perfil)
+        if clase is None:
+            clase = len(self.perfiles)
+            self.perfiles.append(perfil)
+            self.clase_de_perfil[perfil] = clase
+            self.miembros.append([])
+            # Las máscaras de la clase no cambian nunca: su perfil es fijo
+            self._pendientes.append((clase, perfil))
+        elif not self.miembros[clase]:
+            self._todos |= 1 << clase
+        insort(self.miembros[clase], indice)
+        self.clase_de[indice] = clase
+        self._cambiar_tamano(clase, len(self.miembros[clase]) - 1)
+
+    def _cambiar_tamano(self, clase, anterior):
+        tamano = len(self.miembros[clase])
+        bit = 1 << clase
+        cambios = anterior ^ tamano
+        while cambios:
+            b = cambios.bit_length() - 1
+            while len(self.planos) <= b:
+                self.planos.append(0)
+            self.planos[b] ^= bit
+            cambios ^= 1 << b
+
+    def contar(self, mascara):
+        """Personajes (no clases) presentes en la máscara."""
+        return sum((mascara & plano).bit_count() << b for b, plano in enumerate(self.planos))
+
+    def decodificar(self, mascara):
+        """Nombres de los personajes de las clases presentes, en orden de llegada."""
+        indices = []
+        while mascara:
+            bit_bajo = mascara & -mascara
+            indices.extend(self.miembros[bit_bajo.bit_length() - 1])
+            mascara ^= bit_bajo
+        indices.sort()
+        return [self.nombres[indice] for indice in indices]
+
+    def gemelos(self, rasgos):
+        """Personajes con exactamente este perfil (indistinguibles de él); O(1) hasta listar."""
+        clase = self.clase_de_perfil.get(codificar_rasgos(rasgos, self.claves))
+        if clase is None:
+            return []
+        return [self.nombres[indice] for indice in self.miembros[clase]]
+
+
+def comparar_personaje(respuestas_usuario, caracteristicas_personaje):
+    """
+    Puntaje de un solo personaje: la referencia de los pesos que aplican
+    PuntuadorMatricial, IndicePerfiles y AlmacenSQLite.mejores de golpe.
+    Las claves ausentes cuentan como "No lo se" sin modificar el personaje.
+    """
+    coincidencias = 0
+    for clave in respuestas_usuario:
+        if respuestas_usuario[clave] == caracteristicas_personaje.get(clave, RESPUESTA_DESCONOCIDA):
+            coincidencias += 1
+        elif respuestas_usuario[clave] in (RESPUESTA_PROBABLE, RESPUESTA_DESCONOCIDA):
+            coincidencias += 0.5
+    return coincidencias / len(respuestas_usuario)
+
+
+class PuntuadorMatricial:
+    """
+    Puntuación por lotes de todos los personajes frente a un vector de respuestas.
+    Aplica los mismos pesos que 'comparar_personaje':
+    - 1 si la respuesta coincide exactamente con el rasgo.
+    - 0.5 si la respuesta es "Probablemente" o "No lo se".
+    - 0 si no coinciden.
+    El puntaje final se divide entre el número de respuestas.
+    """
+
+    def __init__(self, base, claves):
+        self.claves = list(claves)
+        self.columnas = {clave: i for i, clave in enumerate(self.claves)}
+        self.nombres = []
+        self.indices = {}
+        if np is not None:
+            # Matriz con capacidad de reserva para no copiarla en cada 'agregar'
+            self.matriz = np.zeros((max(len(base), 8), len(self.claves)), dtype=np.int8)
+        else:
+            self.matriz = []
+
+        for nombre, rasgos in base.items():
+            self.agregar(nombre, rasgos)
+
+    def codificar_fila(self, rasgos):
+        return codificar_rasgos(rasgos, self.claves)
+
+    def agregar(self, nombre, rasgos):
+        fila = self.codificar_fila(rasgos)
+        indice = self.indices.get(nombre)
+        if indice is None:
+            indice = len(self.nombres)
+            self.nombres.append(nombre)
+            self.indices[nombre] = indice
+            if np is None:
+                self.matriz.append(fila)
+                return
+            if indice >= self.matriz.shape[0]:
+                nueva = np.zeros((self.matriz.shape[0] * 2, len(self.claves)), dtype=np.int8)
+                nueva[:indice] = self.matriz[:indice]
+                self.matriz = nueva
+        if np is None:
+            self.matriz[indice] = fila
+        else:
+            if not self.matriz.flags.writeable:
+                # Matriz de sólo lectura (p. ej. mapeada desde un archivo)
+                self.matriz = self.matriz.copy()
+            self.matriz[indice] = np.frombuffer(fila, dtype=np.int8)
+
+    def puntuar(self, respuestas, filas=None):
+        """
+        Devuelve los puntajes de las filas indicadas (todas si 'filas' es None),
+        en el mismo orden. Con NumPy devuelve un ndarray; sin él, una lista.
+        """
+        if not respuestas:
+            return [] if np is None else np.zeros(0)
+        columnas = [self.columnas[clave] for clave in respuestas]
+        codigos = [CODIGOS_RESPUESTA[respuestas[clave]] for clave in respuestas]
+        # Las respuestas ambiguas suman medio punto aunque no coincidan
+        ambiguas = [codigo in (CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA],
+                               CODIGOS_RESPUESTA[RESPUESTA_PROBABLE]) for codigo in codigos]
+        divisor = 2 * len(codigos)
+
+        if np is not None:
+            total = len(self.nombres)
+            bloque = self.matriz[:total] if filas is None else self.matriz[np.asarray(filas, dtype=np.intp)]
+            iguales = bloque[:, columnas] == np.asarray(codigos, dtype=np.int8)
+            # Medios puntos enteros: 2 por coincidencia, 1 por respuesta ambigua
+            medios = 2 * iguales + (~iguales & np.asarray(ambiguas))
+            return medios.sum(axis=1) / divisor
+
+        if filas is None:
+            filas = range(len(self.nombres))
+        pares = list(zip(columnas, codigos, ambiguas))
+        puntajes = []
+        for fila in filas:
+            valores = self.matriz[fila]
+            medios = 0
+            for columna, codigo, ambigua in pares:
+                if valores[columna] == codigo:
+                    medios += 2
+                elif ambigua:
+                    medios += 1
+            puntajes.append(medios / divisor)
+        return puntajes
+
+    def mejores(self, respuestas, nombres=None, k=1):
+        """
+        Devuelve los k mejores (nombre, puntaje) entre 'nombres' (o toda la base).
+        Ante empates gana el que aparece primero, igual que
+        max(puntajes, key=puntajes.get) sobre un diccionario en ese orden.
+        """
+        filas = None if nombres is None else [self.indices[nombre] for nombre in nombres]
+        puntajes = self.puntuar(respuestas, filas)
+        if len(puntajes) == 0:
+            return []
+        orden_filas = range(len(self.nombres)) if filas is None else filas
+
+        if np is not None:
+            if k == 1:
+                posiciones = [int(np.argmax(puntajes))]
+            else:
+                posiciones = np.argsort(-puntajes, kind="stable")[:k].tolist()
+        else:
+            posiciones = sorted(range(len(puntajes)), key=lambda i: -puntajes[i])[:k]
+
+        return [(self.nombres[orden_filas[i]], float(puntajes[i])) for i in posiciones]
@@ -0,0 +1,336 @@
+"""
+Motor del juego sin interfaz gráfica.
+
+Reúne el estado de la partida (respuestas, nodo del árbol, candidatos,
+fallo lógico) y las estructuras compartidas de la base (máscaras de bits,
+matriz de puntuación, árbol de decisión o almacén SQLite). Lo usan tanto la
+versión gráfica como la de solo texto, y permite jugar miles de partidas
+por lote sin abrir ninguna ventana ('predecir_lote').
+
+Flujo de una partida:
+    juego.iniciar()
+    while not juego.terminado():
+        clave = juego.pregunta_actual()
+        juego.responder(respuesta)
+    nombre, puntaje = juego.resultado()   # nombre None -> hay que aprender
+    # Si no acertó: juego.completar() y el mismo bucle con las preguntas que faltan
+    juego.aprender(nombre_real, juego.respuestas)
+
+Con un MotorBayesiano ('bayesiano') cada partida lleva además un Posterior
+y el árbol sólo elige las preguntas: la partida termina en cuanto la
+confianza del líder llega a 'umbral_confianza' (o se acaban las preguntas),
+y la predicción es ese líder si su confianza llega a 'umbral_puntaje'.
+
+Con tabla=True los resultados se guardan en una TablaResultados por vector
+de respuestas: 'resultado' y 'jugar' sólo repiten la partida la primera vez.
+Con indice=True y al menos UMBRAL_INDICE personajes, el caso ambiguo se
+resuelve con un IndicePerfiles (BK-tree) en lugar de puntuar a todos los
+candidatos, salvo que el puntuador sea un PuntuadorParalelo y haya
+candidatos suficientes para repartirlos entre sus procesos.
+"""
+
+from arbol_decision import ArbolDecision
+from motor_inferencia import rasgos_conocidos
+from formato_binario import crear_motor, crear_puntuador
+from motor_bayesiano import UMBRAL_CONFIANZA
+from tabla_resultados import TablaResultados
+from indice_perfiles import IndicePerfiles, UMBRAL_INDICE
+from puntuacion_paralela import PuntuadorParalelo
+
+# Puntaje mínimo para arriesgar una predicción cuando quedan varios candidatos
+UMBRAL_PUNTAJE = 0.5
+
+
+class Partida:
+    """Estado de una partida; lo mínimo para poder tener muchas a la vez."""
+
+    __slots__ = ("respuestas", "nodo", "mascara", "fallo_logico", "clave_actual", "posterior",
+                 "completando")
+
+    def __init__(self, nodo=0, mascara=0, posterior=None):
+        self.respuestas = {}
+        self.nodo = nodo
+        self.mascara = mascara
+        self.fallo_logico = False
+        self.clave_actual = None
+        self.posterior = posterior
+        # Tras descartar la predicción se preguntan las claves que faltan
+        self.completando = False
+
+
+class MotorJuego:
+    """
+    Motor de inferencia completo.
+    - En memoria: 'base' + 'motor' (BaseClases o BaseBits) + 'puntuador' + 'arbol'.
+    - Con SQLite: sólo 'almacen'; las consultas se derivan de las respuestas.
+    - Opcional: 'bayesiano' (MotorBayesiano) para el modo probabilístico,
+      'tabla' para recordar los resultados por vector e 'indice' para buscar
+      al más parecido sin puntuar a todos; no se usan con SQLite.
+    Los métodos públicos trabajan sobre la partida actual (self.partida) o
+    sobre la que se indique, para atender varias partidas con un solo motor.
+    """
+
+    def __init__(self, claves, base=None, motor=None, puntuador=None, arbol=None,
+                 almacen=None, umbral_puntaje=UMBRAL_PUNTAJE, bayesiano=None,
+                 umbral_confianza=UMBRAL_CONFIANZA, tabla=False, indice=False):
+        self.claves = list(claves)
+        self.base = base
+        self.motor = motor
+        self.puntuador = puntuador
+        self.arbol = arbol
+        self.almacen = almacen
+        self.umbral_puntaje = umbral_puntaje
+        self.bayesiano = bayesiano if almacen is None else None
+        self.umbral_confianza = umbral_confianza
+        # El resultado del modo probabilístico no depende sólo del vector final
+        usar_tabla = tabla and almacen is None and self.bayesiano is None
+        self.tabla = TablaResultados(self) if usar_tabla else None
+        self.indice = IndicePerfiles(puntuador) if indice and almacen is None else None
+        self.partida = None
+        self.iniciar()
+
+    @classmethod
+    def desde_base(cls, base, claves, arbol=None, **opciones):
+        """Construye todas las estructuras en memoria a partir de la base."""
+        motor = crear_motor(base, claves)
+        puntuador = crear_puntuador(base, claves)
+        if arbol is None:
+            arbol = ArbolDecision(motor)
+            arbol.compilar()
+        return cls(claves, base=base, motor=motor, puntuador=puntuador, arbol=arbol, **opciones)
+
+    # --- Partida actual ---
+
+    def nueva_partida(self):
+        if self.almacen is not None:
+            return Partida()
+        # La partida comparte la máscara de todos: empezar no copia nada
+        posterior = self.bayesiano.nueva() if self.bayesiano is not None else None
+        return Partida(self.arbol.raiz, self.motor.mascara_todos, posterior)
+
+    def iniciar(self):
+        self.partida = self.nueva_partida()
+
+    @property
+    def respuestas(self):
+        return self.partida.respuestas
+
+    @property
+    def fallo_logico(self):
+        return self.partida.fallo_logico
+
+    @property
+    def completando(self):
+        return self.partida.completando
+
+    def pregunta_actual(self, partida=None):
+        return self._pregunta(partida or self.partida)
+
+    def responder(self, respuesta, partida=None):
+        """
+        Registra la respuesta a la pregunta actual y aplica Modus Ponens.
+        Devuelve True si con esta respuesta el motor se quedó sin candidatos
+        (sólo la primera vez).
+        """
+        return self._responder(partida or self.partida, respuesta)
+
+    def num_posibles(self, partida=None):
+        return self._num_posibles(partida or self.partida)
+
+    def terminado(self, partida=None):
+        return self._terminado(partida or self.partida)
+
+    def completar(self, partida=None):
+        """
+        La predicción no era correcta: la partida sigue hasta responder todas
+        las claves, para aprender al personaje con un perfil completo (pudo
+        terminar en cuanto quedó un solo candidato). Las respuestas que
+        faltan sólo se anotan, ya no eliminan a nadie.
+        """
+        (partida or self.partida).completando = True
+
+    def lider(self, partida=None):
+        """(nombre, confianza) del más probable en el modo probabilístico; O(1)."""
+        partida = partida or self.partida
+        if partida.posterior is None:
+            return None, 0.0
+        return self.bayesiano.lider(partida.posterior)
+
+    def resultado(self, partida=None):
+        """
+        (nombre, puntaje) de la predicción final, o (None, puntaje) si hay
+        que aprender un personaje nuevo.
+        """
+        return self._resultado(partida or self.partida)
+
+    # --- Lógica sobre una partida cualquiera ---
+
+    def _pregunta(self, partida):
+        # La pregunta que mejor divide a los candidatos ya está en el árbol.
+        # Tras un fallo lógico se sale del árbol y se sigue en orden de CLAVES.
+        if partida.completando:
+            clave = next((clave for clave in self.claves if clave not in partida.respuestas), None)
+        elif self.almacen is not None:
+            clave = self.almacen.elegir_clave(partida.respuestas)
+        elif partida.fallo_logico:
+            clave = self.motor.elegir_clave(partida.mascara, partida.respuestas)
+        else:
+            clave = self.arbol.clave(partida.nodo)
+            if clave is None and partida.posterior is not None:
+                # El árbol ya no separa a nadie, pero el líder aún no convence
+                clave = self.motor.elegir_clave(partida.mascara, partida.respuestas)
+        partida.clave_actual = clave
+        return clave
+
+    def _responder(self, partida, respuesta):
+        if partida.clave_actual is None:
+            self._pregunta(partida)
+        if partida.completando:
+            partida.respuestas[partida.clave_actual] = respuesta
+            partida.clave_actual = None
+            return False
+        if partida.posterior is not None:
+            # Evidencia blanda: también cuentan "Probablemente" y "No lo se"
+            self.bayesiano.actualizar(partida.posterior, partida.clave_actual, respuesta,
+                                      partida.respuestas)
+        partida.respuestas[partida.clave_actual] = respuesta
+
+        # Con SQLite la respuesta ya queda aplicada como condición en las respuestas
+        if (not partida.fallo_logico and self.almacen is None
+                and partida.clave_actual == self.arbol.clave(partida.nodo)):
+            # Un AND con el índice (clave, respuesta); el árbol da la siguiente pregunta
+            partida.mascara = self.motor.filtrar(partida.mascara, partida.clave_actual, respuesta)
+            partida.nodo = self.arbol.avanzar(partida.nodo, respuesta, partida.respuestas, partida.mascara)
+        partida.clave_actual = None
+
+        if not partida.fallo_logico and self._num_posibles(partida) == 0:
+            partida.fallo_logico = True
+            return True
+        return False
+
+    def _num_posibles(self, partida):
+        if self.almacen is not None:
+            return self.almacen.contar_candidatos(partida.respuestas)
+        return self.motor.contar(partida.mascara)
+
+    def _terminado(self, partida):
+        # Con un único candidato ya no hace falta preguntar más
+        if len(partida.respuestas) >= len(self.claves):
+            return True
+        if partida.completando:
+            return False
+        if partida.posterior is not None:
+            # Sin eliminar a nadie: se pregunta hasta estar seguro del líder
+            return partida.posterior.confianza() >= self.umbral_confianza
+        return not partida.fallo_logico and self._num_posibles(partida) == 1
+
+    def _resultado(self, partida):
+        if self.tabla is not None and partida.posterior is None:
+            # Las claves no preguntadas no cambian la partida: cuentan como "No lo se"
+            return self.tabla.buscar(partida.respuestas)
+        return self._resolver(partida)
+
+    def _resolver(self, partida):
+        if partida.posterior is not None:
+            # El líder gana aunque haya habido fallo lógico
+            nombre, confianza = self.bayesiano.lider(partida.posterior)
+            if confianza < self.umbral_puntaje:
+                return None, confianza
+            return nombre, confianza
+
+        if partida.fallo_logico:
+            return None, 0.0
+
+        num_posibles = self._num_posibles(partida)
+        if num_posibles == 0:
+            return None, 0.0
+        if num_posibles == 1:
+            # CONCLUSIÓN LÓGICA: se decodifica el único candidato
+            if self.almacen is not None:
+                return self.almacen.candidatos(partida.respuestas, limite=1)[0], 1.0
+            return self.motor.decodificar(partida.mascara)[0], 1.0
+
+        # Ambigüedad: gana el mejor puntaje entre los candidatos
+        if self.almacen is not None:
+            mejores = self.almacen.mejores(partida.respuestas)
+        elif self._usar_indice(num_posibles):
+            # Sin fallo lógico los candidatos son justo los compatibles con los "Si"/"No"
+            mejores = self.indice.mejores(partida.respuestas, compatibles=True)
+        else:
+            mejores = self.puntuador.mejores(partida.respuestas, self.motor.decodificar(partida.mascara))
+        nombre, puntaje = mejores[0]
+        if puntaje < self.umbral_puntaje:
+            return None, puntaje
+        return nombre, puntaje
+
+    def _usar_indice(self, num_posibles):
+        if self.indice is None or len(self.puntuador.nombres) < UMBRAL_INDICE:
+            return False
+        # Con muchos candidatos el grupo de procesos se encarga de puntuarlos
+        paralelo = isinstance(self.puntuador, PuntuadorParalelo)
+        return not paralelo or num_posibles < self.puntuador.umbral
+
+    # --- Aprendizaje ---
+
+    def existe(self, nombre):
+        if self.almacen is not None:
+            return self.almacen.existe(nombre)
+        return nombre in self.base
+
+    def gemelos(self, rasgos):
+        """
+        Personajes con exactamente el perfil de 'rasgos': nunca se les podrá
+        distinguir de él. Con BaseClases es una búsqueda en un diccionario;
+        los motores sin clases (binario, SQLite) no avisan.
+        """
+        if self.almacen is not None or not hasattr(self.motor, "gemelos"):
+            return []
+        return self.motor.gemelos(rasgos)
+
+    def aprender(self, nombre, rasgos):
+        """
+        Añade o sobrescribe un personaje en las estructuras del motor.
+        Sólo se guardan los rasgos conocidos (los "No lo se" se omiten).
+        La persistencia (JSON/diario/árbol) queda a cargo de quien llama.
+        Devuelve True si el personaje ya existía.
+        """
+        rasgos = rasgos_conocidos(rasgos)
+        sobrescribe = self.existe(nombre)
+        if self.almacen is not None:
+            self.almacen.guardar(nombre, rasgos)
+            return sobrescribe
+
+        self.base[nombre] = rasgos
+        self.motor.agregar(nombre, rasgos)
+        self.puntuador.agregar(nombre, rasgos)
+        if self.indice is not None:
+            self.indice.agregar(self.puntuador.indices[nombre], rasgos)
+        # Parchea sólo los caminos del árbol por los que pasa el personaje
+        self.arbol.agregar(nombre, rasgos, sobrescribe)
+        if self.tabla is not None:
+            if sobrescribe:
+                # Sobrescribir es raro y su perfil anterior pudo cambiar
+                # cualquier partida: se vuelve a calcular todo
+                self.tabla.vaciar()
+            else:
+                self.tabla.invalidar(rasgos)
+        return sobrescribe
+
+    # --- Lotes ---
+
+    def jugar(self, vector):
+        """
+        Juega una partida completa respondiendo con 'vector' (clave -> respuesta;
+        las claves que falten se responden "No lo se"). Devuelve (nombre, puntaje).
+        """
+        if self.tabla is not None:
+            return self.tabla.buscar(vector)
+        partida = self.nueva_partida()
+        while not self._terminado(partida):
+            clave = self._pregunta(partida)
+            self._responder(partida, vector.get(clave, "No lo se"))
+        return self._resultado(partida)
+
+    def predecir_lote(self, vectores):
+        """Predicción (nombre o None) para cada vector de respuestas, en orden."""
+        return [self.jugar(vector)[0] for vector in vectores]
@@ -0,0 +1,128 @@
+"""
+Puntuación en paralelo para el caso ambiguo del final de la partida.
+
+'PuntuadorParalelo' envuelve a un PuntuadorMatricial: reparte los
+candidatos en bloques entre un grupo de procesos y cada proceso devuelve
+sólo su mejor puntaje local y la posición del primero que lo alcanza.
+El ganador se elige por mayor puntaje y, en empate, por menor posición,
+así que el resultado es idéntico al de max(puntajes, key=puntajes.get).
+
+Es opcional: por debajo de 'umbral' candidatos (o si se piden varios
+mejores) se puntúa en serie con el puntuador envuelto, porque repartir
+el trabajo cuesta más que hacerlo.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from motor_inferencia import (CODIGOS_RESPUESTA, RESPUESTA_DESCONOCIDA, RESPUESTA_PROBABLE, np)
+
+# Candidatos a partir de los cuales compensa repartir la puntuación
+UMBRAL_PARALELO = 200000
+
+
+def _mejor_de_bloque(trabajo):
+    """
+    Se ejecuta en un proceso del grupo.
+    'filas' son las filas codificadas del bloque, seguidas y de 'ancho' bytes.
+    Devuelve (medios_puntos, posicion) del mejor; 'posicion' es global.
+    """
+    filas, ancho, inicio, columnas, codigos, ambiguas = trabajo
+    cantidad = len(filas) // ancho
+    if np is not None:
+        bloque = np.frombuffer(filas, dtype=np.int8).reshape(cantidad, ancho)
+        iguales = bloque[:, columnas] == np.asarray(codigos, dtype=np.int8)
+        medios = (2 * iguales + (~iguales & np.asarray(ambiguas))).sum(axis=1)
+        posicion = int(np.argmax(medios))
+        return int(medios[posicion]), inicio + posicion
+
+    pares = list(zip(columnas, codigos, ambiguas))
+    mejor, posicion = -1, 0
+    for i in range(cantidad):
+        base = i * ancho
+        medios = 0
+        for columna, codigo, ambigua in pares:
+            if filas[base + columna] == codigo:
+                medios += 2
+            elif ambigua:
+                medios += 1
+        if medios > mejor:
+            mejor, posicion = medios, i
+    return mejor, inicio + posicion
+
+
+class PuntuadorParalelo:
+    """
+    Misma interfaz que PuntuadorMatricial (agregar, puntuar, mejores).
+    - procesos: tamaño del grupo (por defecto, el número de CPUs).
+    - umbral: candidatos mínimos para puntuar en paralelo.
+    El grupo de procesos se crea la primera vez que se necesita.
+    """
+
+    def __init__(self, puntuador, procesos=None, umbral=UMBRAL_PARALELO):
+        self.puntuador = puntuador
+        self.procesos = procesos or os.cpu_count() or 1
+        self.umbral = umbral
+        self._grupo = None
+
+    @property
+    def nombres(self):
+        return self.puntuador.nombres
+
+    @property
+    def indices(self):
+        return self.puntuador.indices
+
+    @property
+    def claves(self):
+        return self.puntuador.claves
+
+    @property
+    def columnas(self):
+        return self.puntuador.columnas
+
+    @property
+    def matriz(self):
+        return self.puntuador.matriz
+
+    def agregar(self, nombre, rasgos):
+        self.puntuador.agregar(nombre, rasgos)
+
+    def puntuar(self, respuestas, filas=None):
+        return self.puntuador.puntuar(respuestas, filas)
+
+    def cerrar(self):
+        if self._grupo is not None:
+            self._grupo.shutdown()
+            self._grupo = None
+
+    def _filas_codificadas(self, filas):
+        matriz = self.puntuador.matriz
+        if np is not None:
+            return matriz[np.asarray(filas, dtype=np.intp)].tobytes()
+        return b"".join(matriz[fila] for fila in filas)
+
+    def mejores(self, respuestas, nombres=None, k=1):
+        total = len(self.nombres) if nombres is None else len(nombres)
+        if k != 1 or not respuestas or total < self.umbral or self.procesos < 2:
+            return self.puntuador.mejores(respuestas, nombres, k)
+
+        filas = range(total) if nombres is None else [self.indices[nombre] for nombre in nombres]
+        columnas = [self.puntuador.columnas[clave] for clave in respuestas]
+        codigos = [CODIGOS_RESPUESTA[respuestas[clave]] for clave in respuestas]
+        ambiguas = [codigo in (CODIGOS_RESPUESTA[RESPUESTA_DESCONOCIDA],
+                               CODIGOS_RESPUESTA[RESPUESTA_PROBABLE]) for codigo in codigos]
+        ancho = len(self.puntuador.claves)
+
+        tam_bloque = -(-total // self.procesos)
+        trabajos = [(self._filas_codificadas(filas[inicio:inicio + tam_bloque]), ancho, inicio,
+                     columnas, codigos, ambiguas)
+                    for inicio in range(0, total, tam_bloque)]
+        if self._grupo is None:
+            self._grupo = ProcessPoolExecutor(max_workers=self.procesos)
+
+        # Mayor puntaje; en empate, la menor posición (el primero en el orden)
+        medios, posicion = max(self._grupo.map(_mejor_de_bloque, trabajos),
+                               key=lambda mejor: (mejor[0], -mejor[1]))
+        nombre = self.nombres[filas[posicion]]
+        return [(nombre, medios / (2 * len(codigos)))]
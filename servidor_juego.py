@@ -0,0 +1,352 @@
+"""
+Servidor local de partidas simultáneas (asyncio, TCP con JSON por líneas).
+
+Todas las sesiones comparten un único MotorJuego cargado en memoria; cada
+sesión sólo guarda su Partida (respuestas, nodo del árbol, candidatos y
+fallo lógico), no una copia de la base. No necesita ningún servicio externo.
+
+Protocolo: cada petición es una línea JSON y cada respuesta también.
+    {"accion": "iniciar"}
+        -> {"ok": true, "sesion": 1, "pregunta": {"clave": ..., "texto": ...}}
+    {"accion": "responder", "sesion": 1, "respuesta": "Si"}
+        -> {"ok": true, "fallo_logico": false, "posibles": 3, "pregunta": {...} | null}
+    {"accion": "resultado", "sesion": 1}
+        -> {"ok": true, "nombre": "Hornet" | null, "puntaje": 1.0}
+    {"accion": "aprender", "sesion": 1, "nombre": "Zote", "rasgos": {...}}
+        -> {"ok": true, "sobrescrito": false, "gemelos": [...]}
+           ('rasgos' por defecto: las respuestas; 'gemelos': personajes con el
+           mismo perfil, de los que no se le podrá distinguir)
+    {"accion": "terminar", "sesion": 1}
+        -> {"ok": true}
+Los errores se devuelven como {"ok": false, "error": "..."}.
+
+Los aprendizajes se aplican de uno en uno (con un candado) y se guardan en
+el diario desde un hilo aparte, así que las demás sesiones siguen jugando
+mientras se escribe en disco. Lo que aprenden otros procesos con la misma
+base (quioscos, versión de texto u otro servidor) se incorpora antes de
+cada aprendizaje y cada INTERVALO_SINCRONIZACION segundos. Si el diario rotó
+varias veces entretanto se vuelve a cargar la base en un motor nuevo; las
+partidas empezadas con el anterior reciben un error y hay que iniciar otras.
+
+Uso:
+    python servidor_juego.py --puerto 8765
+    python servidor_juego.py --prueba-carga 200   (arranca y lanza 200 clientes)
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+
+from motor_inferencia import OPCIONES_RESPUESTA, rasgos_conocidos
+from motor_juego import MotorJuego
+from almacenamiento import DiarioConocimiento, LectorIncremental
+from formato_binario import claves_con_catalogo
+from instrumentacion import instrumentar_diario, instrumentar_juego
+from catalogo import cargar_catalogo
+from motor_bayesiano import MotorBayesiano
+from base_compacta import BaseCompacta
+
+HOST = "127.0.0.1"
+PUERTO = 8765
+# Cada cuántos segundos se miran los cambios de otros procesos en el diario
+INTERVALO_SINCRONIZACION = 2.0
+ARCHIVO_CONOCIMIENTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hollow_knight_data.json")
+
+CLAVES, PREGUNTAS = cargar_catalogo()
+PREGUNTA_POR_CLAVE = dict(zip(CLAVES, PREGUNTAS))
+
+
+class ErrorPeticion(Exception):
+    """Petición mal formada o sobre una sesión que no existe."""
+
+
+def cargar_base(ruta, diario):
+    """Instantánea + diario. Sin archivo se empieza con una base vacía."""
+    base = BaseCompacta(CLAVES)
+    # Con el candado, ningún otro proceso compacta entre la instantánea y el diario
+    with diario.candado:
+        if os.path.exists(ruta):
+            lector = LectorIncremental(ruta)
+            for nombre, rasgos in lector:
+                base[nombre] = rasgos_conocidos(rasgos)
+            if lector.truncado:
+                print(f"Advertencia: {ruta} está incompleto; se recuperaron {len(base)} personajes.")
+        else:
+            print(f"Advertencia: No existe {ruta}; se empieza con una base vacía.")
+        return diario.reproducir(base)
+
+
+def crear_juego(base, bayesiano=False):
+    """MotorJuego del servidor para la base (instrumentado si se pide con HK_TRAZA)."""
+    claves = claves_con_catalogo(base, CLAVES)
+    # Las partidas repetidas se resuelven con la tabla de resultados
+    juego = MotorJuego.desde_base(base, claves, tabla=not bayesiano, indice=True)
+    if bayesiano:
+        juego.bayesiano = MotorBayesiano(juego.puntuador)
+    return instrumentar_juego(juego)
+
+
+class ServidorJuego:
+    """
+    Sesiones (id -> Partida) sobre un MotorJuego compartido.
+    Las sesiones abiertas por una conexión se cierran al desconectarse.
+    - recargar: función que lee la base de disco y devuelve un MotorJuego
+      nuevo; se usa cuando el diario rotó demasiado para ponerse al día.
+    - caducadas: sesiones del motor anterior a la última recarga.
+    """
+
+    def __init__(self, juego, diario=None, recargar=None):
+        self.juego = juego
+        self.diario = diario
+        self.recargar = recargar
+        self.sesiones = {}
+        self.caducadas = set()
+        self._ids = itertools.count(1)
+        self._candado_aprender = asyncio.Lock()
+
+    def _pregunta(self, partida):
+        if self.juego.terminado(partida):
+            return None
+        clave = self.juego.pregunta_actual(partida)
+        return {"clave": clave, "texto": PREGUNTA_POR_CLAVE.get(clave, clave)}
+
+    def _partida(self, peticion):
+        sesion = peticion.get("sesion")
+        if not isinstance(sesion, int):
+            raise ErrorPeticion("sesión inexistente")
+        partida = self.sesiones.get(sesion)
+        if partida is None:
+            if sesion in self.caducadas:
+                self.caducadas.discard(sesion)
+                raise ErrorPeticion("la base se volvió a cargar; inicia una partida nueva")
+            raise ErrorPeticion("sesión inexistente")
+        return partida
+
+    # --- Acciones ---
+
+    def iniciar(self, peticion, propias):
+        sesion = next(self._ids)
+        partida = self.juego.nueva_partida()
+        self.sesiones[sesion] = partida
+        propias.add(sesion)
+        return {"sesion": sesion, "pregunta": self._pregunta(partida)}
+
+    def responder(self, peticion, propias):
+        partida = self._partida(peticion)
+        respuesta = peticion.get("respuesta")
+        if respuesta not in OPCIONES_RESPUESTA:
+            raise ErrorPeticion(f"respuesta inválida: {respuesta!r}")
+        if self.juego.terminado(partida):
+            raise ErrorPeticion("la partida ya terminó")
+        fallo = self.juego.responder(respuesta, partida)
+        return {"fallo_logico": fallo, "posibles": self.juego.num_posibles(partida),
+                "pregunta": self._pregunta(partida)}
+
+    def resultado(self, peticion, propias):
+        nombre, puntaje = self.juego.resultado(self._partida(peticion))
+        return {"nombre": nombre, "puntaje": puntaje}
+
+    async def aprender(self, peticion, propias):
+        nombre = peticion.get("nombre")
+        nombre = nombre.strip() if isinstance(nombre, str) else ""
+        if not nombre:
+            raise ErrorPeticion("falta el nombre")
+        rasgos = peticion.get("rasgos")
+        if rasgos is None:
+            rasgos = self._partida(peticion).respuestas
+        if not isinstance(rasgos, dict):
+            raise ErrorPeticion("'rasgos' debe ser un objeto")
+        # Se valida todo antes de tocar el motor compartido por las sesiones
+        for clave, valor in rasgos.items():
+            if clave not in self.juego.claves:
+                raise ErrorPeticion(f"clave desconocida: {clave!r}")
+            if not isinstance(valor, str) or valor not in OPCIONES_RESPUESTA:
+                raise ErrorPeticion(f"valor inválido para {clave!r}: {valor!r}")
+
+        async with self._candado_aprender:
+            # El motor se modifica en el bucle (no hay otro hilo tocándolo);
+            # sólo la escritura en disco se delega a un hilo.
+            await self._incorporar_pendientes()
+            gemelos = [otro for otro in self.juego.gemelos(rasgos) if otro != nombre]
+            sobrescrito = self.juego.aprender(nombre, rasgos)
+            if self.diario is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self._guardar, nombre)
+        return {"sobrescrito": sobrescrito, "gemelos": gemelos}
+
+    def _guardar(self, nombre):
+        try:
+            self.diario.registrar(nombre, self.juego.base[nombre])
+            if self.diario.necesita_compactar():
+                self.diario.compactar(self.juego.base)
+        except IOError as e:
+            print(f"Advertencia: No se pudo guardar a {nombre}. Error: {e}")
+
+    async def _incorporar_pendientes(self):
+        # Sin cambios sólo cuesta un stat; la lectura (con candado) va en un hilo
+        if self.diario is None or not self.diario.hay_cambios():
+            return
+        try:
+            cambios = await asyncio.get_running_loop().run_in_executor(None, self.diario.pendientes)
+        except IOError as e:
+            print(f"Advertencia: No se pudieron leer los cambios de otros procesos. Error: {e}")
+            return
+        if cambios is None:
+            await self._recargar()
+            return
+        for nombre, rasgos in cambios:
+            self.juego.aprender(nombre, rasgos_conocidos(rasgos))
+
+    async def _recargar(self):
+        # El diario rotó varias veces desde la última lectura: base entera
+        if self.recargar is None:
+            print("Advertencia: El diario rotó varias veces desde la última lectura; "
+                  "reinicia el servidor para ver todos los personajes.")
+            return
+        try:
+            juego = await asyncio.get_running_loop().run_in_executor(None, self.recargar)
+        except (IOError, ValueError) as e:
+            print(f"Advertencia: No se pudo volver a cargar la base. Error: {e}")
+            return
+        self.juego = juego
+        # Las partidas en curso guardan nodos y máscaras del motor anterior
+        self.caducadas.update(self.sesiones)
+        self.sesiones.clear()
+
+    async def sincronizar(self, intervalo=INTERVALO_SINCRONIZACION):
+        """Incorpora periódicamente lo que aprenden otros procesos."""
+        while True:
+            await asyncio.sleep(intervalo)
+            async with self._candado_aprender:
+                await self._incorporar_pendientes()
+
+    def terminar(self, peticion, propias):
+        sesion = peticion.get("sesion")
+        if not isinstance(sesion, int):
+            raise ErrorPeticion("sesión inexistente")
+        self.sesiones.pop(sesion, None)
+        self.caducadas.discard(sesion)
+        propias.discard(sesion)
+        return {}
+
+    # --- Conexiones ---
+
+    async def atender(self, lector, escritor):
+        acciones = {"iniciar": self.iniciar, "responder": self.responder,
+                    "resultado": self.resultado, "aprender": self.aprender,
+                    "terminar": self.terminar}
+        propias = set()
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    peticion = json.loads(linea)
+                    if not isinstance(peticion, dict):
+                        raise ErrorPeticion("la petición debe ser un objeto JSON")
+                    accion = acciones.get(peticion.get("accion"))
+                    if accion is None:
+                        raise ErrorPeticion(f"acción desconocida: {peticion.get('accion')!r}")
+                    respuesta = accion(peticion, propias)
+                    if asyncio.iscoroutine(respuesta):
+                        respuesta = await respuesta
+                    respuesta = {"ok": True, **respuesta}
+                except (ValueError, TypeError, ErrorPeticion) as e:
+                    # TypeError: tipos inesperados en la petición (listas como claves...)
+                    respuesta = {"ok": False, "error": str(e)}
+                escritor.write(json.dumps(respuesta, ensure_ascii=False).encode("utf-8") + b"\n")
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for sesion in propias:
+                self.sesiones.pop(sesion, None)
+                self.caducadas.discard(sesion)
+            escritor.close()
+
+    async def iniciar_servidor(self, host=HOST, puerto=PUERTO):
+        if self.diario is not None:
+            self._sincronizacion = asyncio.create_task(self.sincronizar())
+        return await asyncio.start_server(self.atender, host, puerto)
+
+
+# --- Prueba de carga ---
+
+async def cliente_prueba(host, puerto, partidas, azar):
+    """Juega 'partidas' partidas con respuestas al azar. Devuelve las latencias."""
+    lector, escritor = await asyncio.open_connection(host, puerto)
+
+    async def pedir(peticion):
+        escritor.write(json.dumps(peticion).encode("utf-8") + b"\n")
+        await escritor.drain()
+        return json.loads(await lector.readline())
+
+    latencias = []
+    for _ in range(partidas):
+        datos = await pedir({"accion": "iniciar"})
+        sesion = datos["sesion"]
+        while datos["pregunta"] is not None:
+            inicio = time.perf_counter()
+            datos = await pedir({"accion": "responder", "sesion": sesion,
+                                 "respuesta": azar.choice(OPCIONES_RESPUESTA)})
+            latencias.append(time.perf_counter() - inicio)
+        await pedir({"accion": "resultado", "sesion": sesion})
+        await pedir({"accion": "terminar", "sesion": sesion})
+    escritor.close()
+    return latencias
+
+
+async def prueba_carga(servidor, clientes, partidas, host=HOST, puerto=PUERTO):
+    tcp = await servidor.iniciar_servidor(host, puerto)
+    inicio = time.perf_counter()
+    async with tcp:
+        resultados = await asyncio.gather(*(cliente_prueba(host, puerto, partidas, random.Random(i))
+                                            for i in range(clientes)))
+    total = time.perf_counter() - inicio
+    latencias = sorted(l for lista in resultados for l in lista)
+    if latencias:
+        print(f"{clientes} clientes x {partidas} partidas: {len(latencias)} respuestas en {total:.2f}s | "
+              f"mediana {latencias[len(latencias) // 2] * 1e3:.2f}ms | "
+              f"p99 {latencias[int(len(latencias) * 0.99)] * 1e3:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de Adivina Quién")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--base", default=ARCHIVO_CONOCIMIENTO, help="archivo JSON de la base")
+    parser.add_argument("--prueba-carga", type=int, metavar="CLIENTES",
+                        help="lanza CLIENTES clientes simultáneos y termina")
+    parser.add_argument("--partidas", type=int, default=20, help="partidas por cliente en la prueba")
+    parser.add_argument("--bayesiano", action="store_true",
+                        help="modo probabilístico: termina cuando el líder es lo bastante probable")
+    args = parser.parse_args()
+
+    diario = instrumentar_diario(DiarioConocimiento(args.base))
+    base = cargar_base(args.base, diario)
+    juego = crear_juego(base, args.bayesiano)
+    servidor = ServidorJuego(juego, diario,
+                             recargar=lambda: crear_juego(cargar_base(args.base, diario), args.bayesiano))
+
+    if args.prueba_carga:
+        asyncio.run(prueba_carga(servidor, args.prueba_carga, args.partidas, args.host, args.puerto))
+        return
+
+    async def servir():
+        tcp = await servidor.iniciar_servidor(args.host, args.puerto)
+        print(f"Servidor escuchando en {args.host}:{args.puerto} ({len(base)} personajes)")
+        async with tcp:
+            await tcp.serve_forever()
+
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        print("\nServidor detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Tabla de resultados por vector de respuestas.
+
+Con K preguntas y 4 respuestas posibles sólo hay 4^K vectores distintos
+(1024 con las 5 claves del juego), y el resultado de una partida depende
+únicamente del vector y de la base. 'TablaResultados' guarda, para cada
+vector, la predicción final (fila del personaje o "aprender") y su puntaje
+en arreglos compactos:
+- filas: array('i'), la fila del personaje en el puntuador, APRENDER o SIN_CALCULAR.
+- puntajes: array('d').
+- filtradas: array('H'), bits de las claves que filtraron candidatos en esa
+  partida (las preguntadas antes de un fallo lógico).
+
+Cada entrada se calcula la primera vez que se consulta, jugando la partida
+con el motor. Al aprender un personaje nuevo sólo se invalidan las entradas
+en las que podía seguir siendo candidato: las demás partidas no pasan por
+ningún nodo del árbol que cambie ni lo puntúan al final. Al sobrescribir
+uno se vacía la tabla: su perfil anterior pudo mantener viva una partida
+que sin él habría terminado antes, con otro resultado.
+
+Si 4^K supera 'limite' la tabla no se reserva entera y se usa una memoria
+LRU de los vectores que de verdad aparecen.
+"""
+
+from array import array
+from collections import OrderedDict
+
+from motor_inferencia import CODIGOS_RESPUESTA, RESPUESTA_DESCONOCIDA, RESPUESTA_SI, RESPUESTA_NO
+from base_compacta import VALOR_POR_CODIGO
+
+# Mayor número de entradas para reservar la tabla completa (4^8)
+LIMITE_TABLA = 4 ** 8
+# Vectores recordados cuando la tabla completa no cabe
+TAM_MEMO = 4096
+
+APRENDER = -1
+SIN_CALCULAR = -2
+
+_CODIGO_SI = CODIGOS_RESPUESTA[RESPUESTA_SI]
+_CODIGO_NO = CODIGOS_RESPUESTA[RESPUESTA_NO]
+
+
+class TablaResultados:
+    """
+    Resultados de un MotorJuego indexados por vector de respuestas.
+    El índice de un vector es sum(código de la respuesta j * 4^j) en el
+    orden de 'juego.claves'; las claves sin responder cuentan como "No lo se".
+    """
+
+    def __init__(self, juego, limite=LIMITE_TABLA, tam_memo=TAM_MEMO):
+        self.juego = juego
+        self.claves = list(juego.claves)
+        self.posiciones = {clave: j for j, clave in enumerate(self.claves)}
+        total = 4 ** len(self.claves)
+        self.completa = total <= limite
+        self.tam_memo = tam_memo
+        if self.completa:
+            self.filas = array("i", [SIN_CALCULAR]) * total
+            self.puntajes = array("d", [0.0]) * total
+            self.filtradas = array("H", [0]) * total
+        else:
+            # indice -> (fila, puntaje, filtradas), del menos al más reciente
+            self.memo = OrderedDict()
+
+    def indice(self, respuestas):
+        indice = 0
+        for j, clave in enumerate(self.claves):
+            indice |= CODIGOS_RESPUESTA[respuestas.get(clave, RESPUESTA_DESCONOCIDA)] << (2 * j)
+        return indice
+
+    def vector(self, indice):
+        return {clave: VALOR_POR_CODIGO[(indice >> (2 * j)) & 3] for j, clave in enumerate(self.claves)}
+
+    def buscar(self, respuestas):
+        """(nombre, puntaje) de la partida con estas respuestas; None si hay que aprender."""
+        indice = self.indice(respuestas)
+        if self.completa:
+            fila = self.filas[indice]
+            if fila == SIN_CALCULAR:
+                fila, puntaje, filtradas = self._calcular(indice)
+                self.filas[indice] = fila
+                self.puntajes[indice] = puntaje
+                self.filtradas[indice] = filtradas
+            puntaje = self.puntajes[indice]
+        else:
+            entrada = self.memo.get(indice)
+            if entrada is None:
+                entrada = self._calcular(indice)
+                self.memo[indice] = entrada
+                if len(self.memo) > self.tam_memo:
+                    self.memo.popitem(last=False)
+            else:
+                self.memo.move_to_end(indice)
+            fila, puntaje, _filtradas = entrada
+
+        if fila == APRENDER:
+            return None, puntaje
+        return self.juego.puntuador.nombres[fila], puntaje
+
+    def completar(self):
+        """Calcula todas las entradas pendientes de la tabla completa."""
+        if not self.completa:
+            return
+        for indice in range(len(self.filas)):
+            if self.filas[indice] == SIN_CALCULAR:
+                self.filas[indice], self.puntajes[indice], self.filtradas[indice] = self._calcular(indice)
+
+    def _calcular(self, indice):
+        # Misma partida que MotorJuego.jugar, anotando qué claves filtraron
+        juego = self.juego
+        vector = self.vector(indice)
+        partida = juego.nueva_partida()
+        filtradas = 0
+        while not juego._terminado(partida):
+            clave = juego._pregunta(partida)
+            if not partida.fallo_logico:
+                filtradas |= 1 << self.posiciones[clave]
+            juego._responder(partida, vector[clave])
+        nombre, puntaje = juego._resolver(partida)
+        fila = APRENDER if nombre is None else juego.puntuador.indices[nombre]
+        return fila, puntaje, filtradas
+
+    # --- Invalidación al aprender ---
+
+    def vaciar(self):
+        """Olvida todas las entradas (al sobrescribir un personaje)."""
+        if self.completa:
+            self.filas = array("i", [SIN_CALCULAR]) * len(self.filas)
+        else:
+            self.memo.clear()
+
+    def invalidar(self, *rasgos_afectados):
+        """
+        Olvida las entradas en las que algún personaje nuevo con estos rasgos
+        sobrevive a todas las respuestas que filtraron ('None' se ignora).
+        No sirve para el perfil anterior de uno sobrescrito (ver 'vaciar').
+        Devuelve cuántas se invalidaron.
+        """
+        codigos = [[CODIGOS_RESPUESTA.get(rasgos.get(clave, RESPUESTA_DESCONOCIDA), 0) for clave in self.claves]
+                   for rasgos in rasgos_afectados if rasgos is not None]
+
+        def afectada(indice, filtradas):
+            return any(self._compatible(indice, filtradas, fila) for fila in codigos)
+
+        invalidadas = 0
+        if self.completa:
+            for indice, fila in enumerate(self.filas):
+                if fila != SIN_CALCULAR and afectada(indice, self.filtradas[indice]):
+                    self.filas[indice] = SIN_CALCULAR
+                    invalidadas += 1
+        else:
+            for indice in [indice for indice, (_fila, _puntaje, filtradas) in self.memo.items()
+                           if afectada(indice, filtradas)]:
+                del self.memo[indice]
+                invalidadas += 1
+        return invalidadas
+
+    @staticmethod
+    def _compatible(indice, filtradas, codigos):
+        # Igual que BaseBits.filtrar: un "Si"/"No" descarta a quien tiene otro
+        # rasgo conocido (incluido "Probablemente"); el resto no descarta
+        j = 0
+        while filtradas:
+            if filtradas & 1:
+                respuesta = (indice >> (2 * j)) & 3
+                rasgo = codigos[j]
+                if (respuesta == _CODIGO_SI or respuesta == _CODIGO_NO) and rasgo and rasgo != respuesta:
+                    return False
+            filtradas >>= 1
+            j += 1
+        return True
@@ -0,0 +1,121 @@
+"""
+DiarioConocimiento compartido por varios procesos (aquí, varias instancias
+sobre los mismos archivos): mezcla de cambios ajenos, líneas propias,
+rotación con .anterior y recarga cuando el registro rotó dos veces.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from almacenamiento import DiarioConocimiento
+
+HORNET = {"rol_jefe": "Si"}
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    ruta = str(tmp_path / "hollow_knight_data.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"Hornet": HORNET}, f)
+    return ruta
+
+
+def abrir(ruta):
+    """(diario, base en memoria) como los carga una instancia al arrancar."""
+    diario = DiarioConocimiento(ruta)
+    with open(ruta, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    return diario, diario.reproducir(base)
+
+
+def test_cada_uno_recibe_solo_lo_ajeno(ruta):
+    a, _ = abrir(ruta)
+    b, _ = abrir(ruta)
+    a.registrar("Zote", {"rol_jefe": "No"})
+    b.registrar("Quirrel", {"es_enemigo": "No"})
+
+    assert a.pendientes() == [("Quirrel", {"es_enemigo": "No"})]
+    assert b.pendientes() == [("Zote", {"rol_jefe": "No"})]
+    assert a.pendientes() == [] and b.pendientes() == []
+
+
+def test_gana_el_ultimo_cambio(ruta):
+    a, _ = abrir(ruta)
+    b, _ = abrir(ruta)
+    a.registrar("Zote", {"rol_jefe": "No"})
+    b.registrar("Zote", {"rol_jefe": "Si"})
+
+    assert a.pendientes() == [("Zote", {"rol_jefe": "Si"})]
+    # El último cambio de Zote es de b: ya lo tiene en memoria
+    assert b.pendientes() == []
+
+
+def test_compactar_rota_y_conserva_el_anterior(ruta):
+    a, memoria_a = abrir(ruta)
+    b, _ = abrir(ruta)
+    b.registrar("Quirrel", {"es_enemigo": "No"})
+    memoria_a["Zote"] = {"rol_jefe": "No"}
+    a.registrar("Zote", memoria_a["Zote"])
+
+    assert a.compactar(memoria_a)
+    assert os.path.exists(a.ruta_anterior)
+    with open(ruta, "r", encoding="utf-8") as f:
+        assert set(json.load(f)) == {"Hornet", "Zote", "Quirrel"}
+    # Lo de b leído al compactar llega después por 'pendientes'
+    assert a.pendientes() == [("Quirrel", {"es_enemigo": "No"})]
+    # b termina el registro anterior (sólo tenía lo suyo) y sigue en el nuevo
+    assert b.pendientes() == [("Zote", {"rol_jefe": "No"})]
+    a.registrar("Hollow", HORNET)
+    assert b.pendientes() == [("Hollow", HORNET)]
+    # Ahora compacta b; a termina su .anterior sin recibir nada repetido
+    assert b.compactar()
+    assert a.pendientes() == []
+    assert a.generacion == b.generacion == 2
+
+
+def test_dos_rotaciones_obligan_a_recargar(ruta):
+    a, memoria_a = abrir(ruta)
+    b, _ = abrir(ruta)
+    for nombre in ("Zote", "Quirrel"):
+        memoria_a[nombre] = {"rol_jefe": "No"}
+        a.registrar(nombre, memoria_a[nombre])
+        assert a.compactar(memoria_a)
+
+    assert b.hay_cambios()
+    assert b.pendientes() is None
+    # Recarga: instantánea + registro, y desde ahí se sigue al día
+    b, memoria_b = abrir(ruta)
+    assert set(memoria_b) == {"Hornet", "Zote", "Quirrel"}
+    assert b.pendientes() == []
+    a.registrar("Hollow", HORNET)
+    assert b.pendientes() == [("Hollow", HORNET)]
+
+
+def test_compactar_sin_base_parte_del_disco(ruta):
+    a, _ = abrir(ruta)
+    b, _ = abrir(ruta)
+    a.registrar("Zote", {"rol_jefe": "No"})
+    b.registrar("Quirrel", {"es_enemigo": "No"})
+
+    assert a.compactar()
+    with open(ruta, "r", encoding="utf-8") as f:
+        assert set(json.load(f)) == {"Hornet", "Zote", "Quirrel"}
+    # La rotación no repite lo que cada uno ya tenía
+    assert b.pendientes() == [("Zote", {"rol_jefe": "No"})]
+
+
+def test_linea_incompleta_se_descarta(ruta):
+    a, _ = abrir(ruta)
+    a.registrar("Zote", {"rol_jefe": "No"})
+    with open(a.ruta_diario, "ab") as f:
+        f.write(b'{"nombre": "Quirrel", "ras')
+
+    b, memoria_b = abrir(ruta)
+    assert set(memoria_b) == {"Hornet", "Zote"}
+    b.registrar("Hollow", HORNET)
+    assert a.pendientes() == [("Hollow", HORNET)]
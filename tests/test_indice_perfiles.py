@@ -0,0 +1,37 @@
+"""
+IndicePerfiles sobre una base binaria (.hkb) sin numpy: la matriz es
+entonces un FilasBinarias y el índice debe recorrerla fila a fila.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import formato_binario
+import indice_perfiles
+import motor_inferencia
+from benchmark_motor import generar_base, generar_vectores
+from formato_binario import BaseBinaria, FilasBinarias, crear_puntuador, escribir_binario
+from indice_perfiles import IndicePerfiles
+
+
+def test_indice_sobre_base_binaria_sin_numpy(tmp_path, monkeypatch):
+    for modulo in (motor_inferencia, formato_binario, indice_perfiles):
+        monkeypatch.setattr(modulo, "np", None)
+
+    base, claves = generar_base(300, num_claves=6, semilla=1)
+    ruta = str(tmp_path / "base.hkb")
+    escribir_binario(ruta, base, claves)
+    puntuador = crear_puntuador(BaseBinaria(ruta), claves)
+    assert isinstance(puntuador.matriz, FilasBinarias)
+
+    indice = IndicePerfiles(puntuador)
+    for vector in generar_vectores(base, claves, 50, semilla=2):
+        assert indice.mejores(vector, k=3) == puntuador.mejores(vector, k=3)
+
+    # Lo aprendido después de construir el índice también se encuentra
+    nuevo = {clave: "Si" for clave in claves}
+    puntuador.agregar("Nuevo", nuevo)
+    indice.agregar(len(puntuador.nombres) - 1, nuevo)
+    assert indice.mejores(nuevo) == puntuador.mejores(nuevo)
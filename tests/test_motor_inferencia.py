@@ -0,0 +1,25 @@
+"""
+PuntuadorMatricial frente a comparar_personaje, la referencia de los pesos.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor_inferencia import OPCIONES_RESPUESTA, PuntuadorMatricial, comparar_personaje
+
+CLAVES = ["a", "b", "c", "d"]
+
+
+def test_puntuador_aplica_los_pesos_de_referencia():
+    azar = random.Random(0)
+    base = {f"P{i}": {clave: azar.choice(OPCIONES_RESPUESTA) for clave in CLAVES if azar.random() < 0.7}
+            for i in range(40)}
+    puntuador = PuntuadorMatricial(base, CLAVES)
+    for _ in range(50):
+        respuestas = {clave: azar.choice(OPCIONES_RESPUESTA) for clave in azar.sample(CLAVES, 3)}
+        esperados = {nombre: comparar_personaje(respuestas, rasgos) for nombre, rasgos in base.items()}
+        mejor = max(esperados, key=esperados.get)
+        assert puntuador.mejores(respuestas) == [(mejor, esperados[mejor])]
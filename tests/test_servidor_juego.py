@@ -0,0 +1,55 @@
+"""
+ServidorJuego cuando otro proceso hace rotar el diario dos veces: debe
+volver a cargar la base en lugar de quedarse sin sincronizar.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacenamiento import DiarioConocimiento
+from servidor_juego import CLAVES, ErrorPeticion, ServidorJuego, cargar_base, crear_juego
+
+HORNET = {clave: "Si" for clave in CLAVES}
+ZOTE = {clave: "No" for clave in CLAVES}
+
+
+def test_recarga_tras_dos_rotaciones(tmp_path):
+    ruta = str(tmp_path / "hollow_knight_data.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"Hornet": HORNET}, f)
+
+    diario = DiarioConocimiento(ruta)
+    servidor = ServidorJuego(crear_juego(cargar_base(ruta, diario)), diario,
+                             recargar=lambda: crear_juego(cargar_base(ruta, diario)))
+    anterior = servidor.juego
+    sesion = servidor.iniciar({}, set())["sesion"]
+
+    # Otro proceso aprende y compacta dos veces
+    otro = DiarioConocimiento(ruta)
+    memoria = otro.reproducir({"Hornet": HORNET})
+    for nombre, rasgos in (("Zote", ZOTE), ("Quirrel", {CLAVES[0]: "No"})):
+        memoria[nombre] = rasgos
+        otro.registrar(nombre, rasgos)
+        assert otro.compactar(memoria)
+
+    assert diario.pendientes() is None
+    asyncio.run(servidor._incorporar_pendientes())
+
+    assert servidor.juego is not anterior
+    assert set(servidor.juego.base) == {"Hornet", "Zote", "Quirrel"}
+    try:
+        servidor.responder({"sesion": sesion, "respuesta": "Si"}, set())
+        raise AssertionError("la sesión del motor anterior debería caducar")
+    except ErrorPeticion as e:
+        assert "inicia una partida nueva" in str(e)
+
+    # Ya al día: lo siguiente que aprende el otro proceso llega sin recargar
+    otro.registrar("Hollow", HORNET)
+    recargado = servidor.juego
+    asyncio.run(servidor._incorporar_pendientes())
+    assert servidor.juego is recargado
+    assert "Hollow" in servidor.juego.base
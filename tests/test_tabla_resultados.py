@@ -0,0 +1,103 @@
+"""
+TablaResultados frente al motor sin tabla: para cada vector de respuestas
+el resultado guardado debe ser el de jugar la partida de nuevo, también
+después de aprender o sobrescribir personajes.
+"""
+
+import copy
+import itertools
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base_compacta import BaseCompacta
+from motor_inferencia import OPCIONES_RESPUESTA
+from motor_juego import MotorJuego
+from tabla_resultados import TablaResultados
+
+CLAVES = ["a", "b", "c", "d", "e"]
+
+
+def motores(base):
+    """(motor con tabla completa, motor sin tabla) sobre copias de la base."""
+    con_tabla = MotorJuego.desde_base(copy.deepcopy(base), CLAVES, tabla=True)
+    con_tabla.tabla.completar()
+    return con_tabla, MotorJuego.desde_base(copy.deepcopy(base), CLAVES)
+
+
+def aprender(juegos, nombre, rasgos):
+    for juego in juegos:
+        juego.aprender(nombre, rasgos)
+
+
+def diferencias(con_tabla, sin_tabla):
+    distintos = []
+    for valores in itertools.product(OPCIONES_RESPUESTA, repeat=len(CLAVES)):
+        vector = dict(zip(CLAVES, valores))
+        if con_tabla.tabla.buscar(vector) != sin_tabla.jugar(vector):
+            distintos.append(vector)
+    return distintos
+
+
+def test_sobrescribir_no_deja_resultados_viejos():
+    base = {
+        "P0": {"a": "Probablemente", "b": "Si", "d": "No"},
+        "P1": {"a": "Si", "b": "No", "c": "Si", "d": "No", "e": "No"},
+        "P2": {"a": "Si", "b": "Si", "d": "Si", "e": "Si"},
+    }
+    juegos = motores(base)
+    aprender(juegos, "P0", {"a": "Si", "b": "No", "c": "No", "d": "Si", "e": "Si"})
+
+    vector = {"a": "No", "b": "Si", "c": "Si", "d": "No lo se", "e": "Si"}
+    assert juegos[0].tabla.buscar(vector) == juegos[1].jugar(vector) == ("P2", 1.0)
+    assert diferencias(*juegos) == []
+
+
+def test_tabla_igual_al_motor_al_aprender():
+    azar = random.Random(0)
+
+    def perfil():
+        return {clave: azar.choice(OPCIONES_RESPUESTA) for clave in CLAVES if azar.random() < 0.8}
+
+    base = {f"P{i}": perfil() for i in range(6)}
+    juegos = motores(base)
+    for paso in range(12):
+        # Se alternan personajes nuevos y sobrescritos
+        nombre = f"P{azar.randrange(len(base))}" if paso % 2 else f"Nuevo {paso}"
+        base[nombre] = perfil()
+        aprender(juegos, nombre, base[nombre])
+        assert diferencias(*juegos) == []
+        juegos[0].tabla.completar()
+
+
+def test_memoria_lru_igual_al_motor():
+    # Con más de 'limite' vectores la tabla no se reserva entera
+    azar = random.Random(1)
+    base = {f"P{i}": {clave: azar.choice(OPCIONES_RESPUESTA) for clave in CLAVES} for i in range(8)}
+    con_tabla = MotorJuego.desde_base(copy.deepcopy(base), CLAVES)
+    con_tabla.tabla = TablaResultados(con_tabla, limite=64, tam_memo=50)
+    sin_tabla = MotorJuego.desde_base(copy.deepcopy(base), CLAVES)
+    assert not con_tabla.tabla.completa
+
+    vectores = [dict(zip(CLAVES, valores)) for valores in itertools.product(OPCIONES_RESPUESTA, repeat=len(CLAVES))]
+    for paso in range(3):
+        azar.shuffle(vectores)
+        muestra = vectores[:300]
+        assert con_tabla.predecir_lote(muestra) == sin_tabla.predecir_lote(muestra)
+        assert len(con_tabla.tabla.memo) <= 50
+        nombre = "P0" if paso == 1 else f"Nuevo {paso}"
+        aprender((con_tabla, sin_tabla), nombre, {clave: azar.choice(OPCIONES_RESPUESTA) for clave in CLAVES})
+
+
+def test_base_compacta_como_en_los_juegos():
+    # Los tres juegos usan BaseCompacta con los rasgos "No lo se" omitidos
+    base = BaseCompacta(CLAVES, {"P0": {"a": "Si", "b": "No"}, "P1": {"a": "Si", "c": "Si"},
+                                 "P2": {"b": "Si", "d": "Probablemente"}})
+    con_tabla = MotorJuego.desde_base(base, CLAVES, tabla=True, indice=True)
+    sin_tabla = MotorJuego.desde_base(BaseCompacta(CLAVES, base), CLAVES)
+    assert diferencias(con_tabla, sin_tabla) == []
+    aprender((con_tabla, sin_tabla), "P1", {"a": "No", "e": "Si"})
+    aprender((con_tabla, sin_tabla), "P3", {"a": "Si", "c": "Si", "e": "No"})
+    assert diferencias(con_tabla, sin_tabla) == []